@@ -9,8 +9,11 @@ from app.database import Base
 from app.database import DATABASE_URL
 from app.users.models import User
 from app.products.models import Product, Product_Category, FacetPrice, EdgeProcessingPrice, TemperingPrice
-from app.cart.models import Cart
+from app.cart.models import Cart, DeliveryOrigin, DeliveryZone, GeocodeCache, RoadDistance, SavedAddress
 from app.payments.models import Order
+from app.mail.models import EmailOutbox
+from app.jobs.models import Job
+from app.rate_limit.models import RateLimitBucket
 
 from alembic import context
 
@@ -0,0 +1,50 @@
+"""add delivery origins
+
+Revision ID: a4d8e2c6f915
+Revises: f3a9c1e7b254
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a4d8e2c6f915"
+down_revision: Union[str, Sequence[str], None] = "f3a9c1e7b254"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "delivery_origins",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=100), nullable=False),
+        sa.Column("lat", sa.Float(), nullable=False),
+        sa.Column("lon", sa.Float(), nullable=False),
+        sa.Column("max_radius_km", sa.Float(), nullable=False),
+        sa.Column("price_per_km", sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column("min_price", sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+    op.add_column("orders", sa.Column("delivery_origin_id", sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        "fk_orders_delivery_origin_id",
+        "orders",
+        "delivery_origins",
+        ["delivery_origin_id"],
+        ["id"],
+        ondelete="SET NULL",
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("fk_orders_delivery_origin_id", "orders", type_="foreignkey")
+    op.drop_column("orders", "delivery_origin_id")
+
+    op.drop_table("delivery_origins")
@@ -0,0 +1,28 @@
+"""add order delivery coordinates
+
+Revision ID: a8f2d4c6e193
+Revises: c2f6a8d3e417
+Create Date: 2026-10-19 19:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a8f2d4c6e193"
+down_revision: Union[str, Sequence[str], None] = "c2f6a8d3e417"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("orders", sa.Column("delivery_lat", sa.Float(), nullable=True))
+    op.add_column("orders", sa.Column("delivery_lon", sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("orders", "delivery_lon")
+    op.drop_column("orders", "delivery_lat")
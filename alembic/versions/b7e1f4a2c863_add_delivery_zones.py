@@ -0,0 +1,38 @@
+"""add delivery zones
+
+Revision ID: b7e1f4a2c863
+Revises: a4d8e2c6f915
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b7e1f4a2c863"
+down_revision: Union[str, Sequence[str], None] = "a4d8e2c6f915"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "delivery_zones",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=100), nullable=False),
+        sa.Column("geometry", sa.JSON(), nullable=False),
+        sa.Column("price_per_km", sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column("min_price", sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column("priority", sa.Integer(), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("name"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("delivery_zones")
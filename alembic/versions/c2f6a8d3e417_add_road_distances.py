@@ -0,0 +1,35 @@
+"""add road distances
+
+Revision ID: c2f6a8d3e417
+Revises: b7e1f4a2c863
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c2f6a8d3e417"
+down_revision: Union[str, Sequence[str], None] = "b7e1f4a2c863"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "road_distances",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("origin_key", sa.String(length=40), nullable=False),
+        sa.Column("cell_key", sa.String(length=60), nullable=False),
+        sa.Column("distance_km", sa.Float(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("origin_key", "cell_key", name="uq_road_distances_origin_cell"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("road_distances")
@@ -0,0 +1,26 @@
+"""add order idempotence key
+
+Revision ID: d5b9e3f1a726
+Revises: a8f2d4c6e193
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d5b9e3f1a726"
+down_revision: Union[str, Sequence[str], None] = "a8f2d4c6e193"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("orders", sa.Column("yookassa_idempotence_key", sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("orders", "yookassa_idempotence_key")
@@ -0,0 +1,38 @@
+"""add carts updated_at
+
+Revision ID: d9b4f2c6e815
+Revises: c5a1e7d39f02
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d9b4f2c6e815"
+down_revision: Union[str, Sequence[str], None] = "c5a1e7d39f02"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "carts",
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.text("now()"),
+        ),
+    )
+    op.create_index(op.f("ix_carts_updated_at"), "carts", ["updated_at"], unique=False)
+    op.create_index("ix_orders_status_created_at", "orders", ["status", "created_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_orders_status_created_at", table_name="orders")
+    op.drop_index(op.f("ix_carts_updated_at"), table_name="carts")
+    op.drop_column("carts", "updated_at")
@@ -0,0 +1,55 @@
+"""add order delivery zone
+
+Revision ID: e1c7a9b3d528
+Revises: d5b9e3f1a726
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e1c7a9b3d528"
+down_revision: Union[str, Sequence[str], None] = "d5b9e3f1a726"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("orders", sa.Column("delivery_zone_id", sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        "fk_orders_delivery_zone_id",
+        "orders",
+        "delivery_zones",
+        ["delivery_zone_id"],
+        ["id"],
+        ondelete="SET NULL",
+    )
+    # Заказ можно было оформить только по расчету внутри зоны доставки.
+    op.add_column(
+        "orders",
+        sa.Column("delivery_within_radius", sa.Boolean(), nullable=False, server_default=sa.true()),
+    )
+    op.alter_column("orders", "delivery_within_radius", server_default=None)
+
+    op.add_column("saved_addresses", sa.Column("zone_id", sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        "fk_saved_addresses_zone_id",
+        "saved_addresses",
+        "delivery_zones",
+        ["zone_id"],
+        ["id"],
+        ondelete="SET NULL",
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("fk_saved_addresses_zone_id", "saved_addresses", type_="foreignkey")
+    op.drop_column("saved_addresses", "zone_id")
+
+    op.drop_column("orders", "delivery_within_radius")
+    op.drop_constraint("fk_orders_delivery_zone_id", "orders", type_="foreignkey")
+    op.drop_column("orders", "delivery_zone_id")
@@ -0,0 +1,38 @@
+"""add geocode cache
+
+Revision ID: e7c3a5b1d942
+Revises: d9b4f2c6e815
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e7c3a5b1d942"
+down_revision: Union[str, Sequence[str], None] = "d9b4f2c6e815"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "geocode_cache",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("query", sa.Text(), nullable=False),
+        sa.Column("bounded", sa.Boolean(), nullable=False),
+        sa.Column("result_limit", sa.Integer(), nullable=False),
+        sa.Column("points", sa.JSON(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("query", "bounded", name="uq_geocode_cache_query_bounded"),
+    )
+    op.create_index(op.f("ix_geocode_cache_updated_at"), "geocode_cache", ["updated_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_geocode_cache_updated_at"), table_name="geocode_cache")
+    op.drop_table("geocode_cache")
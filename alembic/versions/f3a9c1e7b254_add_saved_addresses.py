@@ -0,0 +1,44 @@
+"""add saved addresses
+
+Revision ID: f3a9c1e7b254
+Revises: e7c3a5b1d942
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f3a9c1e7b254"
+down_revision: Union[str, Sequence[str], None] = "e7c3a5b1d942"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "saved_addresses",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("address", sa.String(length=300), nullable=False),
+        sa.Column("normalized_address", sa.String(length=300), nullable=False),
+        sa.Column("lat", sa.Float(), nullable=False),
+        sa.Column("lon", sa.Float(), nullable=False),
+        sa.Column("distance_km", sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column("within_radius", sa.Boolean(), nullable=False),
+        sa.Column("orders_count", sa.Integer(), nullable=False),
+        sa.Column("last_used_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("user_id", "normalized_address", name="uq_saved_addresses_user_address"),
+    )
+    op.create_index(op.f("ix_saved_addresses_user_id"), "saved_addresses", ["user_id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_saved_addresses_user_id"), table_name="saved_addresses")
+    op.drop_table("saved_addresses")
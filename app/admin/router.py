@@ -1,8 +1,29 @@
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+import json
+from datetime import date, timedelta
+
+from fastapi import APIRouter, Depends, File, HTTPException, Path, Query, Request, Response, UploadFile
 
 from app.admin.dependencies import user_is_admin
 from app.admin.service import parse_categories_of_products, parse_products_by_names
+from app.cart.coverage import MAX_ZOOM, coverage_cache_stats, coverage_tile, current_coverage_map
+from app.cart.dao import DeliveryOriginsDAO, DeliveryZonesDAO
+from app.cart.schemas import (
+    SDeliveryCoverageOut,
+    SDeliveryOriginOut,
+    SDeliveryOriginUpdate,
+    SDeliveryZoneOut,
+    SDeliveryZoneUpdate,
+)
+from app.cart.service import geocoder_cache_stats, refresh_delivery_settings
+from app.cart.zones import parse_zone_features, zones_geojson
+from app.config import settings
 from app.database import new_session
+from app.jobs.dao import JobsDAO
+from app.payments.dao import OrdersDAO
+from app.payments.nesting import plan_order_cuts
+from app.payments.route_planner import plan_delivery_day
+from app.payments.schemas import SDeliveryPlanOut, SNestingPlanOut
+from app.payments.service import paid_orders_for_day
 from app.products.dao import CategoriesDAO, EdgesDAO, FacetsDAO, ProductsDAO, TemperingDAO
 from app.products.schemas import (
     SEdgeOut,
@@ -12,6 +33,7 @@ from app.products.schemas import (
     STemperingOut,
     STemperingUpdate,
 )
+from app.resilience import circuit_breaker_stats
 
 
 router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(user_is_admin)])
@@ -192,3 +214,224 @@ async def delete_tempering(tempering_id: int):
         raise HTTPException(status_code=404, detail="Закалка не найдена")
 
     await TemperingDAO.delete_by(id=tempering_id)
+
+
+@router.get("/delivery-origins", response_model=list[SDeliveryOriginOut])
+async def get_delivery_origins():
+    return sorted(await DeliveryOriginsDAO.get_all(), key=lambda origin: origin.id)
+
+
+@router.post("/delivery-origins", response_model=SDeliveryOriginOut, status_code=201)
+async def add_delivery_origin(data: SDeliveryOriginUpdate):
+    origin = await DeliveryOriginsDAO.add_and_return(**data.model_dump())
+    await refresh_delivery_settings(force=True)
+    return origin
+
+
+@router.get("/delivery-origins/{origin_id}", response_model=SDeliveryOriginOut)
+async def get_delivery_origin_data(origin_id: int):
+    origin = await DeliveryOriginsDAO.find_one_or_none(id=origin_id)
+
+    if not origin:
+        raise HTTPException(status_code=404, detail="Точка отправки не найдена")
+
+    return origin
+
+
+@router.put("/delivery-origins/{origin_id}", response_model=SDeliveryOriginOut)
+async def update_delivery_origin(origin_id: int, data: SDeliveryOriginUpdate):
+    origin = await DeliveryOriginsDAO.find_one_or_none(id=origin_id)
+
+    if not origin:
+        raise HTTPException(status_code=404, detail="Точка отправки не найдена")
+
+    origin = await DeliveryOriginsDAO.update({"id": origin_id}, **data.model_dump())
+    await refresh_delivery_settings(force=True)
+    return origin
+
+
+@router.delete("/delivery-origins/{origin_id}", status_code=204)
+async def delete_delivery_origin(origin_id: int):
+    origin = await DeliveryOriginsDAO.find_one_or_none(id=origin_id)
+
+    if not origin:
+        raise HTTPException(status_code=404, detail="Точка отправки не найдена")
+
+    await DeliveryOriginsDAO.delete_by(id=origin_id)
+    await refresh_delivery_settings(force=True)
+
+
+@router.get("/delivery-zones", response_model=list[SDeliveryZoneOut])
+async def get_delivery_zones():
+    return sorted(await DeliveryZonesDAO.get_all(), key=lambda zone: zone.id)
+
+
+@router.get("/delivery-zones/geojson")
+async def export_delivery_zones():
+    return zones_geojson(sorted(await DeliveryZonesDAO.get_all(), key=lambda zone: zone.id))
+
+
+@router.post("/delivery-zones/import", response_model=list[SDeliveryZoneOut])
+async def import_delivery_zones(file: UploadFile = File(...)):
+    """Загружает зоны из GeoJSON: зоны с тем же именем заменяются, остальные не трогаются."""
+    if not file.filename.endswith((".geojson", ".json")):
+        raise HTTPException(status_code=400, detail="Нужен .geojson файл")
+
+    try:
+        zones = parse_zone_features(json.loads(await file.read()))
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        raise HTTPException(status_code=400, detail="Файл не является корректным JSON")
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+    async with new_session() as session:
+        async with session.begin():
+            for zone in zones:
+                existing_zone = await DeliveryZonesDAO.find_one_or_none(session=session, name=zone["name"])
+                if existing_zone:
+                    await DeliveryZonesDAO.update({"id": existing_zone.id}, session=session, **zone)
+                else:
+                    await DeliveryZonesDAO.add(session=session, **zone)
+
+    await refresh_delivery_settings(force=True)
+    return sorted(await DeliveryZonesDAO.get_all(), key=lambda zone: zone.id)
+
+
+@router.put("/delivery-zones/{zone_id}", response_model=SDeliveryZoneOut)
+async def update_delivery_zone(zone_id: int, data: SDeliveryZoneUpdate):
+    zone = await DeliveryZonesDAO.find_one_or_none(id=zone_id)
+
+    if not zone:
+        raise HTTPException(status_code=404, detail="Зона доставки не найдена")
+
+    zone = await DeliveryZonesDAO.update({"id": zone_id}, **data.model_dump())
+    await refresh_delivery_settings(force=True)
+    return zone
+
+
+@router.delete("/delivery-zones/{zone_id}", status_code=204)
+async def delete_delivery_zone(zone_id: int):
+    zone = await DeliveryZonesDAO.find_one_or_none(id=zone_id)
+
+    if not zone:
+        raise HTTPException(status_code=404, detail="Зона доставки не найдена")
+
+    await DeliveryZonesDAO.delete_by(id=zone_id)
+    await refresh_delivery_settings(force=True)
+
+
+@router.get("/delivery/routes", response_model=SDeliveryPlanOut)
+async def get_delivery_routes(
+    day: date | None = None,
+    vehicles: int | None = Query(default=None, ge=1, le=50),
+    capacity_area_m2: float | None = Query(default=None, gt=0),
+    capacity_weight_kg: float | None = Query(default=None, gt=0),
+):
+    return await plan_delivery_day(
+        day,
+        vehicles=vehicles or settings.DELIVERY_VEHICLES,
+        capacity_area_m2=capacity_area_m2 or settings.DELIVERY_VEHICLE_CAPACITY_AREA_M2,
+        capacity_weight_kg=capacity_weight_kg or settings.DELIVERY_VEHICLE_CAPACITY_WEIGHT_KG,
+    )
+
+
+@router.get("/delivery/coverage", response_model=SDeliveryCoverageOut)
+async def get_delivery_coverage():
+    coverage_map = await current_coverage_map()
+    return {
+        **coverage_map.summary(),
+        "png_tiles": "/admin/delivery/coverage/{z}/{x}/{y}.png",
+        "json_tiles": "/admin/delivery/coverage/{z}/{x}/{y}.json",
+    }
+
+
+def _check_tile(z: int, x: int, y: int) -> None:
+    if not (0 <= x < 2**z and 0 <= y < 2**z):
+        raise HTTPException(status_code=404, detail="Плитка не найдена")
+
+
+def _tile_response(request: Request, version: str, content: bytes, media_type: str) -> Response:
+    # Плитка меняется только вместе с настройками доставки, так что их версия и есть ETag.
+    headers = {
+        "ETag": f'"{version}"',
+        "Cache-Control": f"private, max-age={settings.DELIVERY_SETTINGS_REFRESH_SECONDS}",
+    }
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=content, media_type=media_type, headers=headers)
+
+
+@router.get("/delivery/coverage/{z}/{x}/{y}.png", response_class=Response)
+async def get_delivery_coverage_png(
+    request: Request,
+    z: int = Path(ge=0, le=MAX_ZOOM),
+    x: int = Path(ge=0),
+    y: int = Path(ge=0),
+):
+    _check_tile(z, x, y)
+    version, tile = await coverage_tile(z, x, y, fmt="png")
+    return _tile_response(request, version, tile, "image/png")
+
+
+@router.get("/delivery/coverage/{z}/{x}/{y}.json")
+async def get_delivery_coverage_json(
+    request: Request,
+    z: int = Path(ge=0, le=MAX_ZOOM),
+    x: int = Path(ge=0),
+    y: int = Path(ge=0),
+    size: int = Query(default=32, ge=1, le=256),
+):
+    _check_tile(z, x, y)
+    version, tile = await coverage_tile(z, x, y, fmt="json", size=size)
+    return _tile_response(request, version, json.dumps(tile).encode(), "application/json")
+
+
+@router.get("/orders/{order_id}/nesting", response_model=SNestingPlanOut)
+async def get_order_nesting(
+    order_id: int,
+    kerf_mm: int | None = Query(default=None, ge=0, le=20),
+    time_limit_ms: int | None = Query(default=None, ge=10, le=10_000),
+    allow_rotation: bool = True,
+):
+    order = await OrdersDAO.find_one_or_none(id=order_id)
+    if not order:
+        raise HTTPException(status_code=404, detail="Заказ не найден")
+
+    return await plan_order_cuts(
+        [order],
+        kerf_mm=settings.NESTING_KERF_MM if kerf_mm is None else kerf_mm,
+        time_limit_ms=time_limit_ms or settings.NESTING_TIME_LIMIT_MS,
+        allow_rotation=allow_rotation,
+    )
+
+
+@router.get("/nesting/day", response_model=SNestingPlanOut)
+async def get_day_nesting(
+    day: date | None = None,
+    kerf_mm: int | None = Query(default=None, ge=0, le=20),
+    time_limit_ms: int | None = Query(default=None, ge=10, le=30_000),
+    allow_rotation: bool = True,
+):
+    day, orders = await paid_orders_for_day(day)
+    plan = await plan_order_cuts(
+        orders,
+        kerf_mm=settings.NESTING_KERF_MM if kerf_mm is None else kerf_mm,
+        time_limit_ms=time_limit_ms or settings.NESTING_TIME_LIMIT_MS,
+        allow_rotation=allow_rotation,
+    )
+    return {"day": day, **plan}
+
+
+@router.get("/jobs/stats")
+async def get_jobs_stats():
+    return await JobsDAO.stats(window=timedelta(hours=1))
+
+
+@router.get("/geocoder/stats")
+async def get_geocoder_stats():
+    return {**geocoder_cache_stats(), "delivery_coverage": coverage_cache_stats()}
+
+
+@router.get("/upstreams/stats")
+async def get_upstreams_stats():
+    return circuit_breaker_stats()
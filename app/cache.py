@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Generic, Hashable, TypeVar
+
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache(Generic[K, V]):
+    """Ограниченный по размеру LRU-кэш с временем жизни записей.
+
+    Кэш живет в памяти процесса, поэтому подходит только для данных,
+    которые допустимо держать устаревшими не дольше `ttl` секунд.
+
+    С `stale_ttl` запись после истечения `ttl` еще столько же секунд считается
+    устаревшей, но пригодной: `get_or_load` отдает ее сразу и обновляет в фоне.
+    """
+
+    def __init__(self, *, maxsize: int, ttl: float, stale_ttl: float = 0.0) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._refreshing: dict[K, asyncio.Task] = {}
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _lookup(self, key: K) -> tuple[V, bool] | None:
+        """Возвращает `(value, is_fresh)` либо `None`, если записи нет или она совсем истекла."""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+
+        fresh_until, value = entry
+        now = time.monotonic()
+        if now >= fresh_until + self.stale_ttl:
+            del self._data[key]
+            self.expirations += 1
+            return None
+
+        self._data.move_to_end(key)
+        return value, now < fresh_until
+
+    def get(self, key: K, default: V | None = None) -> V | None:
+        found = self._lookup(key)
+        if found is None or not found[1]:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        return found[0]
+
+    def peek(self, key: K, default: V | None = None) -> V | None:
+        """Как `get`, но не трогает счетчики: для служебных поисков по кэшу."""
+        found = self._lookup(key)
+        if found is None or not found[1]:
+            return default
+
+        return found[0]
+
+    def set(self, key: K, value: V, *, ttl: float | None = None) -> None:
+        fresh_until = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (fresh_until, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: K) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    async def get_or_load(self, key: K, loader: Callable[[], Awaitable[V]]) -> V:
+        """Отдает значение из кэша, при промахе загружает его через `loader`.
+
+        Устаревшая запись отдается сразу, а обновляется одной фоновой загрузкой на ключ.
+        """
+        found = self._lookup(key)
+
+        if found is not None:
+            value, is_fresh = found
+            if is_fresh:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+                self._refresh_in_background(key, loader)
+            return value
+
+        self.misses += 1
+        value = await loader()
+        self.set(key, value)
+        return value
+
+    def _refresh_in_background(self, key: K, loader: Callable[[], Awaitable[V]]) -> None:
+        if key in self._refreshing:
+            return
+
+        async def refresh() -> None:
+            try:
+                self.set(key, await loader())
+            except Exception:
+                logger.warning("Background cache refresh failed for %r", key, exc_info=True)
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.create_task(refresh())
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "refreshing": len(self._refreshing),
+        }
+
+
+@dataclass(slots=True)
+class _InFlightCall:
+    task: asyncio.Task
+    waiters: int = 0
+
+
+class SingleFlight(Generic[K, V]):
+    """Склеивает одновременные одинаковые вызовы в один.
+
+    Все ожидающие одного ключа получают один и тот же результат или ту же ошибку.
+    Отмена одного ожидающего не трогает остальных; общий вызов отменяется,
+    только когда его больше никто не ждет.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[K, _InFlightCall] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def run(self, key: K, factory: Callable[[], Awaitable[V]]) -> V:
+        call = self._calls.get(key)
+
+        if call is None:
+            call = _InFlightCall(task=asyncio.create_task(factory()))
+            self._calls[key] = call
+            self.calls += 1
+            call.task.add_done_callback(lambda _, call=call: self._forget(key, call))
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                self._forget(key, call)
+                call.task.cancel()
+
+    def _forget(self, key: K, call: _InFlightCall) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._calls), "calls": self.calls, "coalesced": self.coalesced}
@@ -0,0 +1,290 @@
+"""Карта покрытия доставки: расстояние и цена доставки для каждой ячейки растра.
+
+Плитки нарезаны как у OSM (Web Mercator, z/x/y), поэтому ложатся на любую
+карту в админке. Для ячеек плитки применяются те же правила, что в
+`build_delivery_quote()`: зоны, если они заданы, иначе самая дешевая точка
+отправки в радиусе. Все считается по прямой и векторно: плитка 256x256 - это
+несколько операций numpy, без геокодера и маршрутизатора. Плитки кэшируются
+по `delivery_settings_version()` и перестраиваются только после правки точек
+отправки или зон.
+"""
+from __future__ import annotations
+
+import asyncio
+import math
+import struct
+import zlib
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.cache import SingleFlight, TTLCache
+from app.cart.origins import DeliveryOrigins
+from app.cart.service import (
+    current_delivery_origins,
+    current_delivery_zones,
+    delivery_settings_version,
+    refresh_delivery_settings,
+)
+from app.cart.zones import DeliveryZones
+from app.config import settings
+
+
+TILE_SIZE = 256
+MAX_ZOOM = 18
+_OVERVIEW_SIZE = 512
+_TILE_CACHE_TTL_SECONDS = 24 * 60 * 60
+# Цвета ценовых полос от дешевой к дорогой; вне доставки пиксель прозрачный.
+_BAND_COLORS = np.array(
+    [(46, 125, 50), (124, 179, 66), (253, 216, 53), (251, 140, 0), (229, 57, 53)],
+    dtype=np.uint8,
+)
+_ALPHA = 150
+
+_COVERAGE_TILES: TTLCache[tuple, bytes | dict] = TTLCache(
+    maxsize=settings.DELIVERY_COVERAGE_TILE_CACHE_SIZE,
+    ttl=_TILE_CACHE_TTL_SECONDS,
+)
+_COVERAGE_IN_FLIGHT: SingleFlight[tuple, object] = SingleFlight()
+_coverage_map: CoverageMap | None = None
+
+
+@dataclass(slots=True)
+class CoverageRaster:
+    # Индекс в `origins.origins` / `zones.zones`; -1 - нет.
+    origin: np.ndarray
+    zone: np.ndarray
+    distance_km: np.ndarray
+    # NaN там, куда доставки нет.
+    price: np.ndarray
+
+
+def coverage_raster(
+    origins: DeliveryOrigins,
+    zones: DeliveryZones | None,
+    lat: np.ndarray,
+    lon: np.ndarray,
+) -> CoverageRaster:
+    """Векторный аналог `_serving_origin()` и тарифа из `build_delivery_quote()` для массива точек."""
+    shape = lat.shape
+    lat = lat.ravel()
+    lon = lon.ravel()
+
+    if zones is None:
+        origin, distance_km, price = origins.cheapest_many(lat, lon)
+        zone = np.full(len(lat), -1)
+    else:
+        origin, distance_km = origins.nearest_many(lat, lon)
+        zone = zones.find_many(lat, lon)
+        price_per_km = np.array([float(area.price_per_km) for area in zones.zones])
+        min_price = np.array([float(area.min_price) for area in zones.zones])
+        billed_km = np.maximum(1.0, np.ceil(distance_km))
+        inside = zone >= 0
+        price = np.full(len(lat), np.nan)
+        price[inside] = np.maximum(min_price[zone[inside]], price_per_km[zone[inside]] * billed_km[inside])
+
+    return CoverageRaster(
+        origin=origin.reshape(shape),
+        zone=zone.reshape(shape),
+        distance_km=distance_km.reshape(shape),
+        price=price.reshape(shape),
+    )
+
+
+def _tile_lon(x: np.ndarray | float, zoom: int) -> np.ndarray | float:
+    return x / 2**zoom * 360.0 - 180.0
+
+
+def _tile_lat(y: np.ndarray | float, zoom: int) -> np.ndarray | float:
+    return np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * np.asarray(y) / 2**zoom))))
+
+
+def tile_bounds(zoom: int, x: int, y: int) -> tuple[float, float, float, float]:
+    """Границы плитки как (left, top, right, bottom) в градусах."""
+    return (
+        float(_tile_lon(x, zoom)),
+        float(_tile_lat(y, zoom)),
+        float(_tile_lon(x + 1, zoom)),
+        float(_tile_lat(y + 1, zoom)),
+    )
+
+
+def tile_grid(zoom: int, x: int, y: int, size: int) -> tuple[np.ndarray, np.ndarray]:
+    """Широты и долготы центров ячеек плитки, массивы `size` x `size` (строка 0 - север)."""
+    offsets = (np.arange(size) + 0.5) / size
+    lat = _tile_lat(y + offsets, zoom)
+    lon = _tile_lon(x + offsets, zoom)
+    return np.broadcast_to(lat[:, None], (size, size)), np.broadcast_to(lon[None, :], (size, size))
+
+
+def encode_png(rgba: np.ndarray) -> bytes:
+    """RGBA-массив (высота, ширина, 4) uint8 в PNG без фильтров строк."""
+    height, width, _ = rgba.shape
+    scanlines = np.zeros((height, width * 4 + 1), dtype=np.uint8)
+    scanlines[:, 1:] = rgba.reshape(height, width * 4)
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(scanlines.tobytes(), 6))
+        + chunk(b"IEND", b"")
+    )
+
+
+class CoverageMap:
+    """Покрытие для одной версии настроек доставки: обзорный растр, шкала цен и отрисовка плиток."""
+
+    def __init__(self, origins: DeliveryOrigins, zones: DeliveryZones | None, *, version: str) -> None:
+        self.origins = origins
+        self.zones = zones
+        self.version = version
+        self.bounds = zones.bounds() if zones is not None else origins.viewbox()
+
+        # Обзорный растр по всей области доставки задает шкалу цветов, общую для всех плиток.
+        left, top, right, bottom = self.bounds
+        mid_lat = math.radians((top + bottom) / 2)
+        width_km = (right - left) * 111.32 * math.cos(mid_lat)
+        height_km = (top - bottom) * 111.32
+        cell_km = max(width_km, height_km) / _OVERVIEW_SIZE
+        rows = max(1, math.ceil(height_km / cell_km))
+        cols = max(1, math.ceil(width_km / cell_km))
+        lat = top - (np.arange(rows) + 0.5) * (top - bottom) / rows
+        lon = left + (np.arange(cols) + 0.5) * (right - left) / cols
+        overview = coverage_raster(origins, zones, *np.meshgrid(lat, lon, indexing="ij"))
+
+        deliverable = np.isfinite(overview.price)
+        cell_area_km2 = ((top - bottom) / rows * 111.32) * ((right - left) / cols * 111.32 * np.cos(np.radians(lat)))
+        self.covered_km2 = float((deliverable * cell_area_km2[:, None]).sum())
+        if deliverable.any():
+            self.price_min = float(np.min(overview.price[deliverable]))
+            # Верх шкалы по 98-му перцентилю, чтобы дальние углы не сжимали остальные полосы.
+            self.price_max = float(np.percentile(overview.price[deliverable], 98))
+        else:
+            self.price_min = self.price_max = 0.0
+
+    def legend(self) -> list[dict]:
+        step = (self.price_max - self.price_min) / len(_BAND_COLORS)
+        return [
+            {"price_from": round(self.price_min + step * band, 2), "color": "#{:02x}{:02x}{:02x}".format(*color)}
+            for band, color in enumerate(_BAND_COLORS.tolist())
+        ]
+
+    def intersects(self, zoom: int, x: int, y: int) -> bool:
+        left, top, right, bottom = tile_bounds(zoom, x, y)
+        area_left, area_top, area_right, area_bottom = self.bounds
+        return left < area_right and right > area_left and bottom < area_top and top > area_bottom
+
+    def raster(self, zoom: int, x: int, y: int, size: int) -> CoverageRaster | None:
+        if not self.intersects(zoom, x, y):
+            return None
+        return coverage_raster(self.origins, self.zones, *tile_grid(zoom, x, y, size))
+
+    def render_png(self, zoom: int, x: int, y: int) -> bytes:
+        rgba = np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8)
+        raster = self.raster(zoom, x, y, TILE_SIZE)
+        if raster is not None:
+            deliverable = np.isfinite(raster.price)
+            spread = max(self.price_max - self.price_min, 1e-9)
+            band = np.floor((np.nan_to_num(raster.price) - self.price_min) / spread * len(_BAND_COLORS))
+            band = np.clip(band, 0, len(_BAND_COLORS) - 1).astype(np.int64)
+            rgba[..., :3] = _BAND_COLORS[band]
+            rgba[..., 3] = np.where(deliverable, _ALPHA, 0)
+            rgba[~deliverable, :3] = 0
+
+        return encode_png(rgba)
+
+    def render_json(self, zoom: int, x: int, y: int, size: int) -> dict:
+        raster = self.raster(zoom, x, y, size)
+        if raster is None:
+            empty = [[None] * size for _ in range(size)]
+            price, distance_km, origin, zone = empty, empty, empty, empty
+        else:
+            deliverable = np.isfinite(raster.price)
+            price = [
+                [value if ok else None for value, ok in zip(row, ok_row)]
+                for row, ok_row in zip(np.round(raster.price, 2).tolist(), deliverable.tolist())
+            ]
+            distance_km = np.round(raster.distance_km, 2).tolist()
+            origin = [[value if value >= 0 else None for value in row] for row in raster.origin.tolist()]
+            zone = [[value if value >= 0 else None for value in row] for row in raster.zone.tolist()]
+
+        return {
+            "z": zoom,
+            "x": x,
+            "y": y,
+            "size": size,
+            "version": self.version,
+            "bounds": list(tile_bounds(zoom, x, y)),
+            "origins": [{"id": origin.id, "name": origin.name} for origin in self.origins.origins],
+            "zones": [{"id": area.id, "name": area.name} for area in self.zones.zones] if self.zones else [],
+            "price": price,
+            "distance_km": distance_km,
+            "origin": origin,
+            "zone": zone,
+        }
+
+    def summary(self) -> dict:
+        return {
+            "version": self.version,
+            "bounds": list(self.bounds),
+            "covered_km2": round(self.covered_km2, 1),
+            "price_min": round(self.price_min, 2),
+            "price_max": round(self.price_max, 2),
+            "legend": self.legend(),
+            "origins": len(self.origins),
+            "zones": len(self.zones) if self.zones else 0,
+        }
+
+
+async def current_coverage_map() -> CoverageMap:
+    """Карта покрытия для текущих настроек; после их изменения строится заново, а кэш плиток сбрасывается."""
+    global _coverage_map
+
+    await refresh_delivery_settings()
+    version = delivery_settings_version()
+    if _coverage_map is not None and _coverage_map.version == version:
+        return _coverage_map
+
+    async def build() -> CoverageMap:
+        return await asyncio.to_thread(
+            CoverageMap,
+            current_delivery_origins(),
+            current_delivery_zones(),
+            version=version,
+        )
+
+    coverage_map = await _COVERAGE_IN_FLIGHT.run(("map", version), build)
+    if _coverage_map is None or _coverage_map.version != coverage_map.version:
+        _coverage_map = coverage_map
+        _COVERAGE_TILES.clear()
+
+    return coverage_map
+
+
+async def coverage_tile(zoom: int, x: int, y: int, *, fmt: str, size: int = TILE_SIZE) -> tuple[str, bytes | dict]:
+    """Плитка покрытия в формате "png" или "json" и версия настроек, по которой она построена."""
+    coverage_map = await current_coverage_map()
+    key = (coverage_map.version, fmt, zoom, x, y, size)
+    tile = _COVERAGE_TILES.get(key)
+    if tile is not None:
+        return coverage_map.version, tile
+
+    async def render() -> bytes | dict:
+        if fmt == "png":
+            return await asyncio.to_thread(coverage_map.render_png, zoom, x, y)
+        return await asyncio.to_thread(coverage_map.render_json, zoom, x, y, size)
+
+    tile = await _COVERAGE_IN_FLIGHT.run(key, render)
+    _COVERAGE_TILES.set(key, tile)
+    return coverage_map.version, tile
+
+
+def coverage_cache_stats() -> dict:
+    return {
+        "tiles": _COVERAGE_TILES.stats(),
+        "in_flight": _COVERAGE_IN_FLIGHT.stats(),
+        "version": _coverage_map.version if _coverage_map is not None else None,
+    }
@@ -1,6 +1,9 @@
-from sqlalchemy import delete
+from datetime import datetime
 
-from app.cart.models import Cart
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.cart.models import Cart, DeliveryOrigin, DeliveryZone, GeocodeCache, RoadDistance, SavedAddress, utc_now
 from app.database import new_session
 from app.dao import BaseDAO
 
@@ -21,3 +24,150 @@ class CartsDAO(BaseDAO):
                 )
             )
             await session.commit()
+
+
+    @classmethod
+    async def cart_version(cls, *, user_id: int) -> str | None:
+        """Версия корзины пользователя: меняется при любом добавлении, изменении или удалении позиции.
+
+        **Результат:**
+            - `Строка версии`, либо `None`, если корзина пуста.
+        """
+        async with new_session() as session:
+            res = await session.execute(
+                select(
+                    func.count(cls.model.id),
+                    func.max(cls.model.id),
+                    func.max(cls.model.updated_at),
+                ).where(cls.model.user_id == user_id)
+            )
+            items_count, last_id, last_updated_at = res.one()
+
+        if not items_count:
+            return None
+
+        return f"{items_count}:{last_id}:{last_updated_at.timestamp():.6f}"
+
+
+class GeocodeCacheDAO(BaseDAO):
+    model = GeocodeCache
+
+    @classmethod
+    async def find_by_query(cls, *, query: str, bounded: bool) -> GeocodeCache | None:
+        async with new_session() as session:
+            res = await session.execute(
+                select(cls.model).where(
+                    cls.model.query == query,
+                    cls.model.bounded == bounded,
+                )
+            )
+            return res.scalar_one_or_none()
+
+    @classmethod
+    async def upsert(cls, *, query: str, bounded: bool, result_limit: int, points: list[dict]) -> None:
+        values = {
+            "query": query,
+            "bounded": bounded,
+            "result_limit": result_limit,
+            "points": points,
+            "updated_at": utc_now(),
+        }
+        statement = insert(cls.model).values(**values)
+        statement = statement.on_conflict_do_update(
+            constraint="uq_geocode_cache_query_bounded",
+            set_={key: statement.excluded[key] for key in ("result_limit", "points", "updated_at")},
+        )
+
+        async with new_session() as session:
+            await session.execute(statement)
+            await session.commit()
+
+
+class SavedAddressesDAO(BaseDAO):
+    model = SavedAddress
+
+    @classmethod
+    async def list_for_user(cls, *, user_id: int, limit: int) -> list[SavedAddress]:
+        async with new_session() as session:
+            res = await session.execute(
+                select(cls.model)
+                .where(cls.model.user_id == user_id)
+                .order_by(cls.model.last_used_at.desc())
+                .limit(limit)
+            )
+            return list(res.scalars().all())
+
+    @classmethod
+    async def remember(
+        cls,
+        *,
+        user_id: int,
+        address: str,
+        normalized_address: str,
+        lat: float,
+        lon: float,
+        distance_km,
+        within_radius: bool,
+        zone_id: int | None,
+    ) -> None:
+        """Добавляет адрес в адресную книгу или обновляет уже сохраненный."""
+        now = utc_now()
+        statement = insert(cls.model).values(
+            user_id=user_id,
+            address=address,
+            normalized_address=normalized_address,
+            lat=lat,
+            lon=lon,
+            distance_km=distance_km,
+            within_radius=within_radius,
+            zone_id=zone_id,
+            orders_count=1,
+            last_used_at=now,
+            created_at=now,
+        )
+        statement = statement.on_conflict_do_update(
+            constraint="uq_saved_addresses_user_address",
+            set_={
+                "address": statement.excluded.address,
+                "lat": statement.excluded.lat,
+                "lon": statement.excluded.lon,
+                "distance_km": statement.excluded.distance_km,
+                "within_radius": statement.excluded.within_radius,
+                "zone_id": statement.excluded.zone_id,
+                "orders_count": cls.model.orders_count + 1,
+                "last_used_at": now,
+            },
+        )
+
+        async with new_session() as session:
+            await session.execute(statement)
+            await session.commit()
+
+
+class DeliveryOriginsDAO(BaseDAO):
+    model = DeliveryOrigin
+
+
+class DeliveryZonesDAO(BaseDAO):
+    model = DeliveryZone
+
+
+class RoadDistancesDAO(BaseDAO):
+    model = RoadDistance
+
+    @classmethod
+    async def upsert(cls, *, origin_key: str, cell_key: str, distance_km: float) -> None:
+        statement = insert(cls.model).values(
+            origin_key=origin_key,
+            cell_key=cell_key,
+            distance_km=distance_km,
+            updated_at=utc_now(),
+        )
+        statement = statement.on_conflict_do_update(
+            constraint="uq_road_distances_origin_cell",
+            set_={key: statement.excluded[key] for key in ("distance_km", "updated_at")},
+        )
+
+        async with new_session() as session:
+            await session.execute(statement)
+            await session.commit()
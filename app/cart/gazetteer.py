@@ -0,0 +1,281 @@
+"""Локальный справочник населенных пунктов и улиц зоны доставки.
+
+Справочник строится из выгрузки OSM в формате XML (`.osm`) и отвечает на подсказки
+без обращения к Nominatim. Для продакшена выгрузку лучше один раз сжать в JSON:
+
+    python -m app.cart.gazetteer region.osm gazetteer.json
+
+и указать путь к результату в `GEOCODER_GAZETTEER_PATH`.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+import xml.etree.ElementTree as ElementTree
+from array import array
+from bisect import bisect_left
+from dataclasses import astuple, dataclass
+from pathlib import Path
+from typing import Callable, Iterable
+
+from app.cart.dao import DeliveryOriginsDAO
+from app.cart.origins import haversine_km
+from app.config import settings
+from app.database import engine
+
+
+SAMPLE_EXTRACT_PATH = Path(__file__).resolve().parent / "data" / "gazetteer_sample.osm"
+
+# Вес населенного пункта в ранжировании подсказок, как importance у Nominatim.
+_PLACE_IMPORTANCE = {
+    "city": 0.6,
+    "town": 0.5,
+    "village": 0.4,
+    "hamlet": 0.3,
+    "suburb": 0.3,
+    "quarter": 0.25,
+    "neighbourhood": 0.2,
+    "isolated_dwelling": 0.15,
+}
+# Только к этим местам привязываются улицы.
+_SETTLEMENT_KINDS = frozenset({"city", "town", "village", "hamlet"})
+_STREET_HIGHWAYS = frozenset(
+    {
+        "living_street",
+        "pedestrian",
+        "primary",
+        "residential",
+        "secondary",
+        "service",
+        "tertiary",
+        "unclassified",
+    }
+)
+_STREET_IMPORTANCE = 0.1
+# Сокращения типов улиц, как их пишут в адресах, и полные слова из OSM.
+_STREET_TYPE_ABBREVIATIONS = {
+    "ул": "улица",
+    "пр": "проспект",
+    "просп": "проспект",
+    "пер": "переулок",
+    "пл": "площадь",
+    "ш": "шоссе",
+    "бул": "бульвар",
+    "наб": "набережная",
+    "мкр": "микрорайон",
+}
+_STREET_TYPES = frozenset(_STREET_TYPE_ABBREVIATIONS.values())
+
+
+@dataclass(frozen=True, slots=True)
+class GazetteerEntry:
+    name: str
+    context: str | None
+    kind: str
+    lat: float
+    lon: float
+    importance: float
+
+    @property
+    def display_name(self) -> str:
+        return f"{self.name}, {self.context}" if self.context else self.name
+
+
+class Gazetteer:
+    """Префиксный индекс в виде отсортированного массива ключей.
+
+    Ключи - нормализованное полное имя с населенным пунктом и все хвосты
+    собственного имени с начала слова, поэтому "ленина" находит "улица Ленина".
+    Тип улицы в конце имени дублируется в начало ("красная улица" -> "улица красная"),
+    а сокращения ("ул.", "пер.") в ключах и запросах раскрываются в полные слова.
+    Поиск - один bisect и последовательный проход по совпадающим ключам.
+    """
+
+    def __init__(self, entries: Iterable[GazetteerEntry], *, normalize: Callable[[str], str]) -> None:
+        self._normalize = normalize
+        self.entries = list(entries)
+
+        pairs: set[tuple[str, int]] = set()
+        for index, entry in enumerate(self.entries):
+            pairs.add((self._key(entry.display_name), index))
+            words = self._key(entry.name).split()
+            for start in range(len(words)):
+                pairs.add((" ".join(words[start:]), index))
+            if len(words) > 1 and words[-1] in _STREET_TYPES:
+                pairs.add((" ".join([words[-1], *words[:-1]]), index))
+
+        ordered = sorted(pairs)
+        self._keys = [key for key, _ in ordered]
+        self._indexes = array("I", (index for _, index in ordered))
+        self._settlements = [self._key(entry.context) if entry.context else None for entry in self.entries]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _key(self, value: str, *, typing: bool = False) -> str:
+        # Пока пользователь печатает, последнее слово - префикс: "пер" может стать "Первомайской".
+        words = self._normalize(value).split()
+        expand = len(words) - 1 if typing and not value.rstrip().endswith(".") else len(words)
+        return " ".join(
+            _STREET_TYPE_ABBREVIATIONS.get(word, word) if position < expand else word
+            for position, word in enumerate(words)
+        )
+
+    def _scan(self, prefix: str, *, limit: int, found: dict[int, None], accept: Callable[[int], bool]) -> None:
+        position = bisect_left(self._keys, prefix)
+        while position < len(self._keys) and len(found) < limit and self._keys[position].startswith(prefix):
+            index = self._indexes[position]
+            if accept(index):
+                found.setdefault(index)
+            position += 1
+
+    def search(self, query: str, *, limit: int) -> list[GazetteerEntry]:
+        normalized_query = self._key(query, typing=True)
+        if not normalized_query:
+            return []
+
+        found: dict[int, None] = {}
+
+        # "Майкоп, ул. Пуш": улицы с таким началом имени в населенном пункте из первой части.
+        settlement, _, street = query.partition(",")
+        settlement = self._key(settlement)
+        street = self._key(street, typing=True)
+        if settlement and street:
+            self._scan(
+                street,
+                limit=limit,
+                found=found,
+                accept=lambda index: (self._settlements[index] or "").startswith(settlement),
+            )
+
+        self._scan(normalized_query, limit=limit, found=found, accept=lambda index: True)
+        return [self.entries[index] for index in found]
+
+
+def _distance_filter(areas: list[tuple[float, float, float]] | None) -> Callable[[float, float], bool]:
+    """Проверка, что точка попадает хотя бы в один круг (lat, lon, радиус в км)."""
+    if areas is None:
+        return lambda lat, lon: True
+
+    return lambda lat, lon: any(
+        haversine_km(area_lat, area_lon, lat, lon) <= radius_km for area_lat, area_lon, radius_km in areas
+    )
+
+
+def parse_osm_extract(
+    path: Path,
+    *,
+    areas: list[tuple[float, float, float]] | None = None,
+) -> list[GazetteerEntry]:
+    """Достает из выгрузки OSM места (`place=*`) и именованные улицы.
+
+    Улица - это все линии `highway=*` с одним именем, привязанные к ближайшему
+    населенному пункту; координаты улицы - среднее центров ее линий.
+    """
+    within = _distance_filter(areas)
+    node_coords: dict[str, tuple[float, float]] = {}
+    places: list[GazetteerEntry] = []
+    street_centers: dict[str, list[tuple[float, float]]] = {}
+
+    for _, element in ElementTree.iterparse(path, events=("end",)):
+        if element.tag == "node":
+            lat, lon = float(element.get("lat")), float(element.get("lon"))
+            node_coords[element.get("id")] = (lat, lon)
+
+            tags = {tag.get("k"): tag.get("v") for tag in element.iter("tag")}
+            kind = tags.get("place")
+            name = tags.get("name:ru") or tags.get("name")
+            if kind in _PLACE_IMPORTANCE and name and within(lat, lon):
+                places.append(GazetteerEntry(name, None, kind, lat, lon, _PLACE_IMPORTANCE[kind]))
+        elif element.tag == "way":
+            tags = {tag.get("k"): tag.get("v") for tag in element.iter("tag")}
+            name = tags.get("name:ru") or tags.get("name")
+            if tags.get("highway") in _STREET_HIGHWAYS and name:
+                coords = [node_coords[nd.get("ref")] for nd in element.iter("nd") if nd.get("ref") in node_coords]
+                if coords:
+                    center = (
+                        sum(lat for lat, _ in coords) / len(coords),
+                        sum(lon for _, lon in coords) / len(coords),
+                    )
+                    street_centers.setdefault(name, []).append(center)
+        else:
+            continue
+
+        element.clear()
+
+    settlements = [place for place in places if place.kind in _SETTLEMENT_KINDS]
+    streets: dict[tuple[str, str | None], list[tuple[float, float]]] = {}
+    for name, centers in street_centers.items():
+        for lat, lon in centers:
+            if not within(lat, lon):
+                continue
+
+            settlement = min(
+                settlements,
+                key=lambda place: (place.lat - lat) ** 2 + (place.lon - lon) ** 2,
+                default=None,
+            )
+            streets.setdefault((name, settlement.name if settlement else None), []).append((lat, lon))
+
+    entries = list(places)
+    for (name, context), centers in streets.items():
+        entries.append(
+            GazetteerEntry(
+                name=name,
+                context=context,
+                kind="road",
+                lat=sum(lat for lat, _ in centers) / len(centers),
+                lon=sum(lon for _, lon in centers) / len(centers),
+                importance=_STREET_IMPORTANCE,
+            )
+        )
+
+    return entries
+
+
+def read_entries(
+    path: Path,
+    *,
+    areas: list[tuple[float, float, float]] | None = None,
+) -> list[GazetteerEntry]:
+    """Читает справочник из `.osm` или из JSON, собранного `python -m app.cart.gazetteer`."""
+    if path.suffix == ".osm":
+        return parse_osm_extract(path, areas=areas)
+
+    within = _distance_filter(areas)
+    raw_entries = json.loads(path.read_text(encoding="utf-8"))["entries"]
+    entries = [GazetteerEntry(*raw_entry) for raw_entry in raw_entries]
+    return [entry for entry in entries if within(entry.lat, entry.lon)]
+
+
+def write_entries(entries: list[GazetteerEntry], path: Path) -> None:
+    payload = {"entries": [astuple(entry) for entry in entries]}
+    path.write_text(json.dumps(payload, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+
+
+async def _delivery_areas() -> list[tuple[float, float, float]]:
+    """Круги активных точек отправки из БД; пока их нет - точка DELIVERY_ORIGIN_* из настроек."""
+    try:
+        rows = await DeliveryOriginsDAO.get_all_by(is_active=True)
+    finally:
+        await engine.dispose()
+
+    if rows:
+        return [(row.lat, row.lon, row.max_radius_km) for row in rows]
+
+    return [(settings.DELIVERY_ORIGIN_LAT, settings.DELIVERY_ORIGIN_LON, settings.DELIVERY_MAX_RADIUS_KM)]
+
+
+def main(argv: list[str]) -> None:
+    if len(argv) != 2:
+        raise SystemExit("usage: python -m app.cart.gazetteer <extract.osm> <gazetteer.json>")
+
+    source, target = (Path(arg) for arg in argv)
+    entries = parse_osm_extract(source, areas=asyncio.run(_delivery_areas()))
+    write_entries(entries, target)
+    print(f"{len(entries)} entries written to {target}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,28 @@
+import logging
+from datetime import timedelta
+
+from app.cart.dao import CartsDAO, GeocodeCacheDAO
+from app.config import settings
+from app.jobs.models import utc_now
+from app.jobs.service import job_handler, run_in_batches
+
+
+logger = logging.getLogger(__name__)
+
+
+@job_handler("cart.purge_abandoned", every=timedelta(minutes=settings.RETENTION_INTERVAL_MINUTES))
+async def purge_abandoned_carts(payload: dict) -> None:
+    cutoff = utc_now() - timedelta(days=settings.RETENTION_CART_DAYS)
+    deleted = await run_in_batches(
+        lambda limit: CartsDAO.delete_batch(CartsDAO.model.updated_at < cutoff, limit=limit)
+    )
+    logger.info("Purged %s abandoned cart items", deleted)
+
+
+@job_handler("cart.purge_geocode_cache", every=timedelta(minutes=settings.RETENTION_INTERVAL_MINUTES))
+async def purge_geocode_cache(payload: dict) -> None:
+    cutoff = utc_now() - timedelta(days=settings.GEOCODER_DB_CACHE_TTL_DAYS)
+    deleted = await run_in_batches(
+        lambda limit: GeocodeCacheDAO.delete_batch(GeocodeCacheDAO.model.updated_at < cutoff, limit=limit)
+    )
+    logger.info("Purged %s expired geocode cache rows", deleted)
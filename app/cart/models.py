@@ -1,5 +1,6 @@
+from datetime import datetime, timezone
 from decimal import Decimal
-from sqlalchemy import ForeignKey, Numeric
+from sqlalchemy import JSON, DateTime, Float, ForeignKey, Numeric, String, Text, UniqueConstraint, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -7,6 +8,10 @@ from app.products.models import EdgeProcessingPrice, FacetPrice, Product, Temper
 from app.users.models import User
 
 
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
 class Cart(Base):
     __tablename__ = "carts"
 
@@ -26,8 +31,97 @@ class Cart(Base):
     facet_id: Mapped[int | None] = mapped_column(ForeignKey("facet_prices.id"), nullable=True)
     tempering_id: Mapped[int | None] = mapped_column(ForeignKey("tempering_prices.id"), nullable=True)
 
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=utc_now,
+        onupdate=utc_now,
+        server_default=func.now(),
+        index=True,
+    )
+
     user: Mapped["User"] = relationship()
     product: Mapped["Product"] = relationship()
     edge: Mapped["EdgeProcessingPrice"] = relationship()
     facet: Mapped["FacetPrice"] = relationship()
-    tempering: Mapped["TemperingPrice"] = relationship()
\ No newline at end of file
+    tempering: Mapped["TemperingPrice"] = relationship()
+
+
+class GeocodeCache(Base):
+    __tablename__ = "geocode_cache"
+    __table_args__ = (UniqueConstraint("query", "bounded", name="uq_geocode_cache_query_bounded"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    query: Mapped[str] = mapped_column(Text, nullable=False)
+    bounded: Mapped[bool] = mapped_column(nullable=False)
+    result_limit: Mapped[int] = mapped_column(nullable=False)
+    points: Mapped[list[dict]] = mapped_column(JSON, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=utc_now, index=True)
+
+
+class SavedAddress(Base):
+    """Адрес доставки из оплаченных заказов пользователя с уже известными координатами."""
+
+    __tablename__ = "saved_addresses"
+    __table_args__ = (UniqueConstraint("user_id", "normalized_address", name="uq_saved_addresses_user_address"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    address: Mapped[str] = mapped_column(String(300), nullable=False)
+    normalized_address: Mapped[str] = mapped_column(String(300), nullable=False)
+    lat: Mapped[float] = mapped_column(Float, nullable=False)
+    lon: Mapped[float] = mapped_column(Float, nullable=False)
+    distance_km: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
+    within_radius: Mapped[bool] = mapped_column(nullable=False)
+    zone_id: Mapped[int | None] = mapped_column(ForeignKey("delivery_zones.id", ondelete="SET NULL"), nullable=True)
+    orders_count: Mapped[int] = mapped_column(nullable=False, default=1)
+    last_used_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=utc_now)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=utc_now)
+
+
+class DeliveryOrigin(Base):
+    """Точка отправки доставки (цех или склад) со своим радиусом и тарифом."""
+
+    __tablename__ = "delivery_origins"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str] = mapped_column(String(100), nullable=False)
+    lat: Mapped[float] = mapped_column(Float, nullable=False)
+    lon: Mapped[float] = mapped_column(Float, nullable=False)
+    max_radius_km: Mapped[float] = mapped_column(Float, nullable=False)
+    price_per_km: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
+    min_price: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
+    is_active: Mapped[bool] = mapped_column(nullable=False, default=True)
+
+
+class DeliveryZone(Base):
+    """Полигон зоны доставки (GeoJSON MultiPolygon) со своим тарифом."""
+
+    __tablename__ = "delivery_zones"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str] = mapped_column(String(100), nullable=False, unique=True)
+    geometry: Mapped[dict] = mapped_column(JSON, nullable=False)
+    price_per_km: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
+    min_price: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
+    priority: Mapped[int] = mapped_column(nullable=False, default=0)
+    is_active: Mapped[bool] = mapped_column(nullable=False, default=True)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=utc_now,
+        onupdate=utc_now,
+    )
+
+
+class RoadDistance(Base):
+    """Расстояние по дорогам от точки отправки до центра ячейки назначения."""
+
+    __tablename__ = "road_distances"
+    __table_args__ = (UniqueConstraint("origin_key", "cell_key", name="uq_road_distances_origin_cell"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    origin_key: Mapped[str] = mapped_column(String(40), nullable=False)
+    cell_key: Mapped[str] = mapped_column(String(60), nullable=False)
+    distance_km: Mapped[float] = mapped_column(Float, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=utc_now)
@@ -0,0 +1,182 @@
+"""Точки отправки доставки (цеха и склады) и выбор той, что обслуживает адрес.
+
+Расстояния до всех точек считаются одним векторным проходом numpy: точек
+единицы или десятки, и такой проход быстрее любого пространственного индекса.
+"""
+from __future__ import annotations
+
+import hashlib
+import math
+from dataclasses import dataclass
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Iterable
+
+import numpy as np
+
+
+EARTH_RADIUS_KM = 6371.0
+_MONEY_PRECISION = Decimal("0.01")
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Расстояние по большому кругу между двумя точками в км."""
+    lat1_rad = math.radians(lat1)
+    lat2_rad = math.radians(lat2)
+    delta_lat = math.radians(lat2 - lat1)
+    delta_lon = math.radians(lon2 - lon1)
+
+    inner = (
+        math.sin(delta_lat / 2) ** 2
+        + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon / 2) ** 2
+    )
+    return EARTH_RADIUS_KM * 2 * math.atan2(math.sqrt(inner), math.sqrt(1 - inner))
+
+
+def delivery_price(distance_km: float, *, price_per_km: Decimal, min_price: Decimal) -> Decimal:
+    """Цена по тарифу: каждый начатый километр, но не меньше минимальной суммы."""
+    billed_km = Decimal(max(1, math.ceil(distance_km)))
+    price = max(min_price, price_per_km * billed_km)
+    return price.quantize(_MONEY_PRECISION, rounding=ROUND_HALF_UP)
+
+
+@dataclass(frozen=True, slots=True)
+class DeliveryOriginOption:
+    # `None` - точка из настроек DELIVERY_ORIGIN_*, когда таблица пуста.
+    id: int | None
+    name: str
+    lat: float
+    lon: float
+    max_radius_km: float
+    price_per_km: Decimal
+    min_price: Decimal
+
+    def price_for(self, distance_km: float) -> Decimal:
+        return delivery_price(distance_km, price_per_km=self.price_per_km, min_price=self.min_price)
+
+
+@dataclass(frozen=True, slots=True)
+class OriginMatch:
+    origin: DeliveryOriginOption
+    distance_km: float
+    within_radius: bool
+
+
+class DeliveryOrigins:
+    """Неизменяемый набор активных точек отправки с координатами в массивах numpy."""
+
+    def __init__(self, origins: Iterable[DeliveryOriginOption]) -> None:
+        self.origins = list(origins)
+        if not self.origins:
+            raise ValueError("Нужна хотя бы одна точка отправки.")
+
+        self._lat = np.radians([origin.lat for origin in self.origins])
+        self._lon = np.radians([origin.lon for origin in self.origins])
+        self._cos_lat = np.cos(self._lat)
+        self._radius = np.array([origin.max_radius_km for origin in self.origins])
+        self._price_per_km = np.array([float(origin.price_per_km) for origin in self.origins])
+        self._min_price = np.array([float(origin.min_price) for origin in self.origins])
+
+        raw = "|".join(
+            f"{origin.id}:{origin.name}:{origin.lat}:{origin.lon}:"
+            f"{origin.max_radius_km}:{origin.price_per_km}:{origin.min_price}"
+            for origin in self.origins
+        )
+        self.version = hashlib.sha1(raw.encode()).hexdigest()[:12]
+
+    def __len__(self) -> int:
+        return len(self.origins)
+
+    def distances_km(self, lat: float, lon: float) -> np.ndarray:
+        lat_rad = math.radians(lat)
+        lon_rad = math.radians(lon)
+
+        inner = (
+            np.sin((lat_rad - self._lat) / 2) ** 2
+            + self._cos_lat * math.cos(lat_rad) * np.sin((lon_rad - self._lon) / 2) ** 2
+        )
+        inner = np.clip(inner, 0.0, 1.0)
+        return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(inner), np.sqrt(1 - inner))
+
+    def nearest(self, lat: float, lon: float) -> OriginMatch:
+        distances = self.distances_km(lat, lon)
+        index = int(np.argmin(distances))
+        return OriginMatch(self.origins[index], float(distances[index]), bool(distances[index] <= self._radius[index]))
+
+    def cheapest(self, lat: float, lon: float) -> OriginMatch:
+        """Самая дешевая точка, в радиус которой попадает адрес; при равной цене - ближайшая.
+
+        Если адрес не входит ни в один радиус, возвращается ближайшая точка.
+        """
+        distances = self.distances_km(lat, lon)
+        eligible = np.flatnonzero(distances <= self._radius)
+
+        if eligible.size == 0:
+            index = int(np.argmin(distances))
+            return OriginMatch(self.origins[index], float(distances[index]), within_radius=False)
+
+        billed_km = np.maximum(1.0, np.ceil(distances[eligible]))
+        prices = np.maximum(self._min_price[eligible], self._price_per_km[eligible] * billed_km)
+        # lexsort сортирует по последнему ключу: сначала цена, затем расстояние.
+        index = int(eligible[np.lexsort((distances[eligible], prices))[0]])
+        return OriginMatch(self.origins[index], float(distances[index]), within_radius=True)
+
+    def _distances_km_many(self, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+        """Расстояния от каждой точки до каждой точки отправки, форма (точки, точки отправки)."""
+        lat_rad = np.radians(lat)[:, None]
+        lon_rad = np.radians(lon)[:, None]
+
+        inner = (
+            np.sin((lat_rad - self._lat) / 2) ** 2
+            + self._cos_lat * np.cos(lat_rad) * np.sin((lon_rad - self._lon) / 2) ** 2
+        )
+        inner = np.clip(inner, 0.0, 1.0)
+        return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(inner), np.sqrt(1 - inner))
+
+    def nearest_many(self, lat: np.ndarray, lon: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Векторный `nearest()`: индекс ближайшей точки отправки и расстояние до нее."""
+        distances = self._distances_km_many(lat, lon)
+        index = np.argmin(distances, axis=1)
+        return index, distances[np.arange(len(index)), index]
+
+    def cheapest_many(self, lat: np.ndarray, lon: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Векторный `cheapest()`: индекс точки отправки, расстояние и цена.
+
+        Где адрес не входит ни в один радиус, индекс -1, цена NaN, а расстояние -
+        до ближайшей точки.
+        """
+        distances = self._distances_km_many(lat, lon)
+        billed_km = np.maximum(1.0, np.ceil(distances))
+        prices = np.maximum(self._min_price, self._price_per_km * billed_km)
+        prices = np.where(distances <= self._radius, prices, np.inf)
+
+        best_price = prices.min(axis=1)
+        deliverable = np.isfinite(best_price)
+        # При равной цене - ближайшая точка, как в `cheapest()`.
+        tied = prices == best_price[:, None]
+        cheapest = np.argmin(np.where(tied, distances, np.inf), axis=1)
+        index = np.where(deliverable, cheapest, np.argmin(distances, axis=1))
+        rows = np.arange(len(index))
+
+        return (
+            np.where(deliverable, index, -1),
+            distances[rows, index],
+            np.where(deliverable, best_price, np.nan),
+        )
+
+    def viewbox(self) -> tuple[float, float, float, float]:
+        """Прямоугольник (left, top, right, bottom), накрывающий радиусы всех точек."""
+        lat_delta = self._radius / 111.0
+        lon_delta = self._radius / (111.0 * np.maximum(0.2, self._cos_lat))
+        lat_deg = np.degrees(self._lat)
+        lon_deg = np.degrees(self._lon)
+
+        return (
+            float(np.min(lon_deg - lon_delta)),
+            float(np.max(lat_deg + lat_delta)),
+            float(np.max(lon_deg + lon_delta)),
+            float(np.min(lat_deg - lat_delta)),
+        )
+
+    def areas(self) -> list[tuple[float, float, float]]:
+        """Круги зон доставки как (lat, lon, радиус в км)."""
+        return [(origin.lat, origin.lon, origin.max_radius_km) for origin in self.origins]
@@ -1,8 +1,9 @@
+import asyncio
 from decimal import Decimal
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 
-from app.cart.dao import CartsDAO
+from app.cart.dao import CartsDAO, SavedAddressesDAO
 from app.cart.schemas import (
     SCartAdd,
     SCartChangeQty,
@@ -10,22 +11,35 @@ from app.cart.schemas import (
     SCartDeliveryQuoteOut,
     SCartDeliverySuggestionOut,
     SCartItemResponse,
+    SSavedAddressOut,
 )
 from app.cart.service import (
     GeoPoint,
     build_delivery_quote,
+    cache_delivery_quote,
     check_edge_facet_tempering,
+    create_delivery_quote_token,
+    delivery_quote_cache_key,
+    get_cached_delivery_quote,
+    refresh_delivery_settings,
     resolve_delivery_address,
+    saved_delivery_point,
     suggest_delivery_addresses,
     validate_item_in_cart,
 )
 from app.products.dao import ProductsDAO
+from app.rate_limit.service import RateLimit, client_ip, enforce_rate_limits
 from app.products.service import calc_price
 from app.users.dependencies import get_current_user
 
 
 router = APIRouter(prefix="/cart", tags=["Cart"])
 
+SUGGEST_IP_LIMIT = RateLimit("cart:suggest:ip", capacity=60, period_seconds=60)
+SUGGEST_USER_LIMIT = RateLimit("cart:suggest:user", capacity=30, period_seconds=60)
+SUGGEST_DISCONNECT_POLL_SECONDS = 0.1
+SAVED_ADDRESSES_LIMIT = 20
+
 
 @router.post("", response_model=SCartItemResponse, status_code=201)
 async def products_cart(data: SCartAdd, user=Depends(get_current_user)) -> dict:
@@ -153,13 +167,29 @@ async def get_cart(user=Depends(get_current_user)):
 
 
 @router.get("/delivery/suggest", response_model=list[SCartDeliverySuggestionOut])
-async def get_delivery_suggestions(q: str, user=Depends(get_current_user)):
-    return await suggest_delivery_addresses(q)
+async def get_delivery_suggestions(q: str, request: Request, user=Depends(get_current_user)):
+    await enforce_rate_limits(
+        (SUGGEST_IP_LIMIT, client_ip(request)),
+        (SUGGEST_USER_LIMIT, str(user.id)),
+    )
 
+    suggestions = asyncio.create_task(suggest_delivery_addresses(q))
+    try:
+        while True:
+            done, _ = await asyncio.wait({suggestions}, timeout=SUGGEST_DISCONNECT_POLL_SECONDS)
+            if done:
+                return suggestions.result()
 
-@router.post("/delivery/quote", response_model=SCartDeliveryQuoteOut)
-async def quote_delivery(data: SCartDeliveryQuoteIn, user=Depends(get_current_user)):
-    items = sorted(await CartsDAO.get_all_by(user_id=user.id), key=lambda item: item.id)
+            # Фронтенд бросает устаревшие запросы подсказок при наборе текста:
+            # незачем ждать Nominatim ради ответа, который никто не прочитает.
+            if await request.is_disconnected():
+                return []
+    finally:
+        suggestions.cancel()
+
+
+async def _build_cart_delivery_quote(*, address: str, point: GeoPoint | None, user_id: int) -> dict:
+    items = sorted(await CartsDAO.get_all_by(user_id=user_id), key=lambda item: item.id)
 
     if not items:
         raise HTTPException(status_code=400, detail="Корзина пуста. Сначала добавь товары.")
@@ -173,26 +203,66 @@ async def quote_delivery(data: SCartDeliveryQuoteIn, user=Depends(get_current_us
         if not is_available:
             items_available = False
 
-    if (data.lat is None) != (data.lon is None):
-        raise HTTPException(status_code=400, detail="Передай либо обе координаты адреса, либо не передавай их вовсе.")
+    if point is None:
+        point = await resolve_delivery_address(address)
 
-    if data.lat is not None and data.lon is not None:
-        point = GeoPoint(
-            display_name=(data.normalized_address or data.address).strip(),
-            lat=data.lat,
-            lon=data.lon,
-        )
-    else:
-        point = await resolve_delivery_address(data.address)
-
-    return build_delivery_quote(
-        address=data.address.strip(),
+    return await build_delivery_quote(
+        address=address.strip(),
         point=point,
         subtotal=subtotal,
         items_available=items_available,
     )
 
 
+@router.post("/delivery/quote", response_model=SCartDeliveryQuoteOut)
+async def quote_delivery(data: SCartDeliveryQuoteIn, user=Depends(get_current_user)):
+    cart_version = await CartsDAO.cart_version(user_id=user.id)
+
+    if cart_version is None:
+        raise HTTPException(status_code=400, detail="Корзина пуста. Сначала добавь товары.")
+
+    await refresh_delivery_settings()
+
+    # Расчет подписывается в quote_token, поэтому точку находит только сервер: геокодером
+    # по адресу или из адресной книги. Координатам от клиента верить нельзя.
+    point = None
+    if data.saved_address_id is not None:
+        point = await saved_delivery_point(user_id=user.id, saved_address_id=data.saved_address_id)
+
+    quote_key = delivery_quote_cache_key(
+        user_id=user.id,
+        cart_version=cart_version,
+        address=data.address,
+        normalized_address=point.display_name if point else None,
+        lat=point.lat if point else None,
+        lon=point.lon if point else None,
+    )
+    quote = get_cached_delivery_quote(quote_key, address=data.address.strip())
+    if quote is None:
+        quote = await _build_cart_delivery_quote(address=data.address, point=point, user_id=user.id)
+        cache_delivery_quote(quote_key, quote)
+
+    return {
+        **quote,
+        "quote_token": create_delivery_quote_token(user_id=user.id, cart_version=cart_version, quote=quote),
+    }
+
+
+@router.get("/delivery/addresses", response_model=list[SSavedAddressOut])
+async def get_saved_addresses(user=Depends(get_current_user)):
+    return await SavedAddressesDAO.list_for_user(user_id=user.id, limit=SAVED_ADDRESSES_LIMIT)
+
+
+@router.delete("/delivery/addresses/{saved_address_id}", status_code=204)
+async def delete_saved_address(saved_address_id: int, user=Depends(get_current_user)):
+    saved_address = await SavedAddressesDAO.find_one_or_none(id=saved_address_id, user_id=user.id)
+
+    if not saved_address:
+        raise HTTPException(status_code=404, detail="Сохраненный адрес не найден.")
+
+    await SavedAddressesDAO.delete_by(id=saved_address_id, user_id=user.id)
+
+
 @router.delete("/{cart_item_id}", status_code=204)
 async def delete_from_cart(cart_item_id: int, user=Depends(get_current_user)):
     item = await CartsDAO.find_one_or_none(id=cart_item_id, user_id=user.id)
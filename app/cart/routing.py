@@ -0,0 +1,137 @@
+"""Расстояние по дорогам для расчета доставки.
+
+Маршрутизатор спрятан за протоколом `RoadRouter`: в продакшене это OSRM, а в
+тестах и при разработке без сети его заменяет `StraightLineRouter`. Результаты
+кэшируются по ячейкам назначения (см. `destination_cell`), поэтому маршрут
+считается один раз на точку отправки и квартал, а не на каждый расчет.
+"""
+from __future__ import annotations
+
+import math
+from typing import Protocol
+
+import httpx
+
+from app.cart.origins import haversine_km
+from app.config import settings
+from app.http_client import SharedAsyncClient
+from app.resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded, remaining_timeout
+
+
+_METERS_PER_DEGREE = 111_320.0
+_OSRM_TIMEOUT_SECONDS = 5.0
+# Коды OSRM, которые значат "пути по дорогам нет", а не сбой сервиса.
+_OSRM_NO_ROUTE_CODES = frozenset({"NoRoute", "NoSegment"})
+
+
+class RoutingUnavailable(Exception):
+    """Маршрутизатор не ответил или не нашел пути; вызывающий берет расстояние по прямой."""
+
+
+class NoRoadRoute(Exception):
+    """Маршрутизатор ответил, но проезда по дорогам до точки нет: доставить туда нельзя."""
+
+
+class RoadRouter(Protocol):
+    async def route_km(self, origin: tuple[float, float], destination: tuple[float, float]) -> float:
+        """Длина пути по дорогам между точками (lat, lon) в км.
+
+        Бросает `NoRoadRoute`, если пути нет, и `RoutingUnavailable` при сбое.
+        """
+        ...
+
+
+class StraightLineRouter:
+    """Локальная замена маршрутизатора: расстояние по прямой, умноженное на коэффициент извилистости."""
+
+    def __init__(self, *, detour_factor: float = 1.0) -> None:
+        self.detour_factor = detour_factor
+        self.calls = 0
+
+    async def route_km(self, origin: tuple[float, float], destination: tuple[float, float]) -> float:
+        self.calls += 1
+        return haversine_km(*origin, *destination) * self.detour_factor
+
+
+routing_http_client = SharedAsyncClient(
+    timeout=httpx.Timeout(_OSRM_TIMEOUT_SECONDS, connect=2.0, pool=2.0),
+    limits=httpx.Limits(max_connections=10, max_keepalive_connections=5, keepalive_expiry=60.0),
+    headers={"User-Agent": "GlassSelling/1.0 delivery-route", "Accept": "application/json"},
+)
+
+
+class OsrmRouter:
+    """Маршрут по API OSRM (`/route/v1/driving`)."""
+
+    def __init__(self, base_url: str, *, client: SharedAsyncClient, breaker: CircuitBreaker) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.client = client
+        self.breaker = breaker
+
+    async def route_km(self, origin: tuple[float, float], destination: tuple[float, float]) -> float:
+        coordinates = f"{origin[1]},{origin[0]};{destination[1]},{destination[0]}"
+
+        try:
+            async with self.breaker.guard():
+                response = await self.client.get().get(
+                    f"{self.base_url}/route/v1/driving/{coordinates}",
+                    params={"overview": "false", "alternatives": "false", "steps": "false"},
+                    timeout=remaining_timeout(_OSRM_TIMEOUT_SECONDS),
+                )
+                # 400 с кодом NoRoute - нормальный ответ, а не сбой сервиса.
+                if response.status_code >= 500:
+                    response.raise_for_status()
+        except (httpx.HTTPError, CircuitOpenError, DeadlineExceeded) as error:
+            raise RoutingUnavailable(str(error)) from error
+
+        try:
+            payload = response.json()
+            code = payload.get("code")
+            if code in _OSRM_NO_ROUTE_CODES:
+                raise NoRoadRoute(code)
+
+            routes = payload.get("routes") if code == "Ok" else None
+            if not routes:
+                raise RoutingUnavailable(code or "no route")
+            return float(routes[0]["distance"]) / 1000
+        except (ValueError, KeyError, TypeError, AttributeError) as error:
+            raise RoutingUnavailable("bad OSRM response") from error
+
+
+def build_road_router() -> RoadRouter | None:
+    """Маршрутизатор из `ROAD_DISTANCE_PROVIDER`; `None` - считать по прямой."""
+    if settings.ROAD_DISTANCE_PROVIDER == "osrm":
+        breaker = CircuitBreaker(
+            "osrm",
+            failure_exceptions=(httpx.HTTPError,),
+            window=settings.CIRCUIT_BREAKER_WINDOW,
+            min_calls=settings.CIRCUIT_BREAKER_MIN_CALLS,
+            failure_rate=settings.CIRCUIT_BREAKER_FAILURE_RATE,
+            slow_call_seconds=_OSRM_TIMEOUT_SECONDS / 2,
+            open_seconds=settings.CIRCUIT_BREAKER_OPEN_SECONDS,
+        )
+        return OsrmRouter(settings.ROAD_DISTANCE_OSRM_URL, client=routing_http_client, breaker=breaker)
+
+    if settings.ROAD_DISTANCE_PROVIDER == "straight_line":
+        return StraightLineRouter(detour_factor=settings.ROAD_DISTANCE_DETOUR_FACTOR)
+
+    return None
+
+
+def destination_cell(lat: float, lon: float, *, cell_meters: float) -> tuple[int, int]:
+    """Номер ячейки сетки примерно `cell_meters` x `cell_meters`, в которую попадает точка.
+
+    Ширина ячейки по долготе берется по широте центра ее ряда, чтобы у всех точек
+    ряда была одна и та же сетка.
+    """
+    dlat = cell_meters / _METERS_PER_DEGREE
+    row = math.floor(lat / dlat)
+    dlon = cell_meters / (_METERS_PER_DEGREE * max(0.01, math.cos(math.radians((row + 0.5) * dlat))))
+    return row, math.floor(lon / dlon)
+
+
+def cell_center(row: int, col: int, *, cell_meters: float) -> tuple[float, float]:
+    dlat = cell_meters / _METERS_PER_DEGREE
+    lat = (row + 0.5) * dlat
+    dlon = cell_meters / (_METERS_PER_DEGREE * max(0.01, math.cos(math.radians(lat))))
+    return lat, (col + 0.5) * dlon
@@ -43,9 +43,7 @@ class SCartChangeQty(BaseModel):
 
 class SCartDeliveryQuoteIn(BaseModel):
     address: str = Field(..., min_length=5, max_length=300)
-    normalized_address: str | None = Field(default=None, max_length=300)
-    lat: float | None = None
-    lon: float | None = None
+    saved_address_id: int | None = Field(default=None, ge=1)
 
 
 class SCartDeliveryQuoteOut(BaseModel):
@@ -58,6 +56,10 @@ class SCartDeliveryQuoteOut(BaseModel):
     within_radius: bool
     can_order: bool
     message: str | None = None
+    origin_id: int | None = None
+    origin_name: str | None = None
+    zone_name: str | None = None
+    quote_token: str | None = None
 
 
 class SCartDeliverySuggestionOut(BaseModel):
@@ -66,5 +68,82 @@ class SCartDeliverySuggestionOut(BaseModel):
     full_address: str
     distance_km: Decimal = Field(..., ge=Decimal("0.00"))
     within_radius: bool
+    origin_id: int | None = None
+    origin_name: str | None = None
+    zone_name: str | None = None
     lat: float
     lon: float
+
+
+class SSavedAddressOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    address: str
+    normalized_address: str
+    lat: float
+    lon: float
+    distance_km: Decimal
+    within_radius: bool
+    zone_id: int | None = None
+    orders_count: int
+
+
+class SDeliveryOriginUpdate(BaseModel):
+    name: str = Field(..., min_length=1, max_length=100)
+    lat: float = Field(..., ge=-90, le=90)
+    lon: float = Field(..., ge=-180, le=180)
+    max_radius_km: float = Field(..., gt=0)
+    price_per_km: Decimal = Field(..., ge=Decimal("0.00"))
+    min_price: Decimal = Field(..., ge=Decimal("0.00"))
+    is_active: bool = True
+
+
+class SDeliveryOriginOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    name: str
+    lat: float
+    lon: float
+    max_radius_km: float
+    price_per_km: Decimal
+    min_price: Decimal
+    is_active: bool
+
+
+class SDeliveryZoneUpdate(BaseModel):
+    name: str = Field(..., min_length=1, max_length=100)
+    price_per_km: Decimal = Field(..., ge=Decimal("0.00"))
+    min_price: Decimal = Field(..., ge=Decimal("0.00"))
+    priority: int = 0
+    is_active: bool = True
+
+
+class SDeliveryZoneOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    name: str
+    price_per_km: Decimal
+    min_price: Decimal
+    priority: int
+    is_active: bool
+
+
+class SDeliveryCoverageBandOut(BaseModel):
+    price_from: float
+    color: str
+
+
+class SDeliveryCoverageOut(BaseModel):
+    version: str
+    bounds: list[float]
+    covered_km2: float
+    price_min: float
+    price_max: float
+    legend: list[SDeliveryCoverageBandOut]
+    origins: int
+    zones: int
+    png_tiles: str
+    json_tiles: str
@@ -1,21 +1,59 @@
 from __future__ import annotations
 
+import asyncio
+import logging
 import math
 import re
-from dataclasses import dataclass
+import time
+import xml.etree.ElementTree as ElementTree
+from dataclasses import asdict, dataclass
+from datetime import timedelta
 from decimal import Decimal, ROUND_HALF_UP
+from pathlib import Path
+from typing import Callable
 
 import httpx
 from fastapi import HTTPException
-
+from jose import JWTError, jwt
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.cache import SingleFlight, TTLCache
+from app.cart.dao import DeliveryOriginsDAO, DeliveryZonesDAO, GeocodeCacheDAO, RoadDistancesDAO, SavedAddressesDAO
+from app.cart.gazetteer import Gazetteer, read_entries
+from app.cart.models import utc_now
+from app.cart.origins import DeliveryOriginOption, DeliveryOrigins, OriginMatch
+from app.cart.routing import (
+    NoRoadRoute,
+    RoadRouter,
+    RoutingUnavailable,
+    build_road_router,
+    cell_center,
+    destination_cell,
+)
+from app.cart.zones import DeliveryZoneArea, DeliveryZones, zone_area
 from app.config import settings
+from app.http_client import SharedAsyncClient
 from app.products.dao import EdgesDAO, FacetsDAO, ProductsDAO, TemperingDAO
 from app.products.service import calc_price
+from app.rate_limit.service import RateLimit, UpstreamGovernor
+from app.resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded, deadline, remaining_timeout
 
 
+logger = logging.getLogger(__name__)
+
 MONEY_PRECISION = Decimal("0.01")
 _GEOCODER_URL = "https://nominatim.openstreetmap.org/search"
 
+geocoder_http_client = SharedAsyncClient(
+    timeout=httpx.Timeout(10.0, connect=3.0, pool=2.0),
+    limits=httpx.Limits(max_connections=10, max_keepalive_connections=5, keepalive_expiry=60.0),
+    follow_redirects=True,
+    headers={
+        "User-Agent": "GlassSelling/1.0 delivery-check",
+        "Accept": "application/json",
+    },
+)
+
 
 @dataclass(slots=True)
 class GeoPoint:
@@ -26,9 +64,78 @@ class GeoPoint:
     addresstype: str | None = None
 
 
-_GEOCODER_CACHE: dict[str, GeoPoint] = {}
-_GEOCODER_SUGGEST_CACHE: dict[str, list[GeoPoint]] = {}
+_GEOCODER_CACHE: TTLCache[str, GeoPoint] = TTLCache(
+    maxsize=settings.GEOCODER_CACHE_SIZE,
+    ttl=settings.GEOCODER_CACHE_TTL_SECONDS,
+    stale_ttl=settings.GEOCODER_CACHE_STALE_SECONDS,
+)
+_GEOCODER_SUGGEST_CACHE: TTLCache[str, list[GeoPoint]] = TTLCache(
+    maxsize=settings.GEOCODER_SUGGEST_CACHE_SIZE,
+    ttl=settings.GEOCODER_SUGGEST_CACHE_TTL_SECONDS,
+    stale_ttl=settings.GEOCODER_CACHE_STALE_SECONDS,
+)
+_DELIVERY_QUOTE_TOKEN_TYPE = "delivery_quote"
+_DELIVERY_QUOTE_CACHE: TTLCache[tuple, dict] = TTLCache(
+    maxsize=settings.DELIVERY_QUOTE_CACHE_SIZE,
+    ttl=settings.DELIVERY_QUOTE_CACHE_TTL_SECONDS,
+)
+# Ответы геокодера на отдельные запросы: (запрос, bounded) -> (limit, точки).
+# Это ближний слой перед общей таблицей geocode_cache.
+_GEOCODER_QUERY_CACHE: TTLCache[tuple[str, bool], tuple[int, list[GeoPoint]]] = TTLCache(
+    maxsize=settings.GEOCODER_CACHE_SIZE,
+    ttl=settings.GEOCODER_QUERY_CACHE_TTL_SECONDS,
+)
+# Политика Nominatim - около 1 запроса в секунду на всё приложение.
+_GEOCODER_GOVERNOR = UpstreamGovernor(
+    RateLimit(
+        "upstream:nominatim",
+        capacity=1,
+        period_seconds=1 / settings.GEOCODER_MAX_REQUESTS_PER_SECOND,
+    ),
+    unavailable_detail="Сервис расчета доставки перегружен. Попробуйте через несколько секунд.",
+)
+_GEOCODER_BREAKER = CircuitBreaker(
+    "nominatim",
+    failure_exceptions=(httpx.HTTPError,),
+    window=settings.CIRCUIT_BREAKER_WINDOW,
+    min_calls=settings.CIRCUIT_BREAKER_MIN_CALLS,
+    failure_rate=settings.CIRCUIT_BREAKER_FAILURE_RATE,
+    slow_call_seconds=settings.GEOCODER_SLOW_CALL_SECONDS,
+    open_seconds=settings.CIRCUIT_BREAKER_OPEN_SECONDS,
+)
+_GEOCODER_TIMEOUT_SECONDS = 10.0
+_GEOCODER_PRIORITY_RESOLVE = 10
+_GEOCODER_PRIORITY_SUGGEST = 0
+
+# Одновременные одинаковые запросы (запрос, bounded, limit) ждут один вызов Nominatim.
+_GEOCODER_IN_FLIGHT: SingleFlight[tuple[str, bool, int], list[GeoPoint]] = SingleFlight()
+# Запросы к Nominatim, которые дочитываются после ухода вызывающего.
+_GEOCODER_BACKGROUND_TASKS: set[asyncio.Task] = set()
 _SUGGESTION_LIMIT = 8
+# Сколько совпадений по префиксу брать из локального справочника до ранжирования.
+_GAZETTEER_CANDIDATES = 64
+_GAZETTEER: Gazetteer | None = None
+_GAZETTEER_LOADED = False
+_SUGGEST_MIN_QUERY_LENGTH = 3
+_suggest_prefix_reuses = 0
+_DELIVERY_SETTINGS_IN_FLIGHT: SingleFlight[str, None] = SingleFlight()
+_delivery_origins: DeliveryOrigins | None = None
+# None - зон нет, доставка ограничена радиусами точек отправки.
+_delivery_zones: DeliveryZones | None = None
+_delivery_zones_key: tuple | None = None
+_delivery_settings_loaded_at: float | None = None
+
+_road_router: RoadRouter | None = build_road_router()
+# (точка отправки, ячейка назначения) -> км по дорогам; ближний слой перед таблицей road_distances.
+_ROAD_DISTANCE_CACHE: TTLCache[tuple[str, str], float] = TTLCache(
+    maxsize=settings.ROAD_DISTANCE_CACHE_SIZE,
+    ttl=24 * 3600,
+)
+# Расстояние "пути нет": кэшируется на ROAD_DISTANCE_NO_ROUTE_TTL_SECONDS, чтобы не спрашивать
+# маршрутизатор на каждый расчет, но и не запоминать надолго - дорогу могут достроить.
+NO_ROAD_ROUTE = math.inf
+_ROAD_DISTANCE_IN_FLIGHT: SingleFlight[tuple[str, str], float | None] = SingleFlight()
+_road_distance_fallbacks = 0
 _LOCALITY_ADDRESS_TYPES = frozenset(
     {
         "administrative",
@@ -61,38 +168,150 @@ def _distance_decimal(value: float) -> Decimal:
     return Decimal(str(value)).quantize(MONEY_PRECISION, rounding=ROUND_HALF_UP)
 
 
-def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    radius_km = 6371.0
-    lat1_rad = math.radians(lat1)
-    lat2_rad = math.radians(lat2)
-    delta_lat = math.radians(lat2 - lat1)
-    delta_lon = math.radians(lon2 - lon1)
-
-    inner = (
-        math.sin(delta_lat / 2) ** 2
-        + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon / 2) ** 2
+def _settings_delivery_origin() -> DeliveryOriginOption:
+    return DeliveryOriginOption(
+        id=None,
+        name=settings.DELIVERY_ORIGIN_NAME,
+        lat=settings.DELIVERY_ORIGIN_LAT,
+        lon=settings.DELIVERY_ORIGIN_LON,
+        max_radius_km=settings.DELIVERY_MAX_RADIUS_KM,
+        price_per_km=settings.DELIVERY_PRICE_PER_KM,
+        min_price=settings.DELIVERY_MIN_PRICE,
     )
-    return radius_km * 2 * math.atan2(math.sqrt(inner), math.sqrt(1 - inner))
 
 
-def _distance_from_origin_km(point: GeoPoint) -> float:
-    return _haversine_km(
-        settings.DELIVERY_ORIGIN_LAT,
-        settings.DELIVERY_ORIGIN_LON,
-        point.lat,
-        point.lon,
-    )
+def current_delivery_origins() -> DeliveryOrigins:
+    """Точки отправки, загруженные последним `refresh_delivery_settings()`, или точка из настроек."""
+    global _delivery_origins
+
+    if _delivery_origins is None:
+        _delivery_origins = DeliveryOrigins([_settings_delivery_origin()])
+
+    return _delivery_origins
+
+
+def current_delivery_zones() -> DeliveryZones | None:
+    return _delivery_zones
+
+
+async def _load_delivery_zones() -> None:
+    global _delivery_zones, _delivery_zones_key
+
+    rows = sorted(await DeliveryZonesDAO.get_all_by(is_active=True), key=lambda row: row.id)
+    key = tuple((row.id, row.updated_at) for row in rows)
+    if key == _delivery_zones_key:
+        return
+
+    if not rows:
+        _delivery_zones = None
+    else:
+        areas = [
+            zone_area(
+                id=row.id,
+                name=row.name,
+                geometry=row.geometry,
+                price_per_km=row.price_per_km,
+                min_price=row.min_price,
+                priority=row.priority,
+            )
+            for row in rows
+        ]
+        # Растрирование занимает десятки миллисекунд, цикл событий на это время не блокируем.
+        _delivery_zones = await asyncio.to_thread(
+            DeliveryZones,
+            areas,
+            cell_meters=settings.DELIVERY_ZONE_GRID_CELL_METERS,
+            max_cells=settings.DELIVERY_ZONE_GRID_MAX_CELLS,
+        )
+        logger.info("Built delivery zone grid: %s", _delivery_zones.stats())
+
+    _delivery_zones_key = key
+
+
+async def _forget_bounded_geocodes() -> None:
+    """Сбрасывает ответы геокодера, найденные в рамке старых точек отправки.
+
+    Строки `bounded=True` в geocode_cache удаляются для всех воркеров; кэши в памяти
+    хранят bounded и обычные ответы вместе, поэтому очищаются целиком.
+    """
+    _GEOCODER_QUERY_CACHE.clear()
+    _GEOCODER_CACHE.clear()
+    _GEOCODER_SUGGEST_CACHE.clear()
+
+    try:
+        await GeocodeCacheDAO.delete_by(bounded=True)
+    except (SQLAlchemyError, OSError):
+        logger.warning("Geocode cache purge failed", exc_info=True)
+
+
+async def _load_delivery_settings() -> None:
+    global _delivery_origins, _delivery_settings_loaded_at
+
+    reload = _delivery_settings_loaded_at is not None
+    _delivery_settings_loaded_at = time.monotonic()
+    try:
+        rows = await DeliveryOriginsDAO.get_all_by(is_active=True)
+        await _load_delivery_zones()
+    except (SQLAlchemyError, OSError, ValueError):
+        logger.exception("Failed to load delivery origins and zones, keeping the previous ones")
+        return
+
+    options = [
+        DeliveryOriginOption(
+            id=row.id,
+            name=row.name,
+            lat=row.lat,
+            lon=row.lon,
+            max_radius_km=row.max_radius_km,
+            price_per_km=row.price_per_km,
+            min_price=row.min_price,
+        )
+        for row in sorted(rows, key=lambda row: row.id)
+    ]
+    previous_viewbox = _delivery_origins.viewbox() if _delivery_origins is not None else None
+    _delivery_origins = DeliveryOrigins(options or [_settings_delivery_origin()])
+
+    # Рамка поиска строится по точкам отправки: после их правки bounded-ответы устарели.
+    if reload and _delivery_origins.viewbox() != previous_viewbox:
+        await _forget_bounded_geocodes()
+
+
+async def refresh_delivery_settings(*, force: bool = False) -> None:
+    """Перечитывает точки отправки и зоны доставки не чаще раза в `DELIVERY_SETTINGS_REFRESH_SECONDS`.
+
+    Пока в таблице `delivery_origins` нет активных точек, доставка считается от
+    DELIVERY_ORIGIN_* из настроек. Вызывается перед расчетом доставки, чтобы
+    правки из админки доходили до всех воркеров.
+    """
+    if (
+        not force
+        and _delivery_settings_loaded_at is not None
+        and time.monotonic() - _delivery_settings_loaded_at < settings.DELIVERY_SETTINGS_REFRESH_SECONDS
+    ):
+        return
+
+    await _DELIVERY_SETTINGS_IN_FLIGHT.run("delivery", _load_delivery_settings)
+
+
+def _serving_origin(point: GeoPoint) -> tuple[OriginMatch, DeliveryZoneArea | None]:
+    """Точка отправки и зона для адреса.
+
+    Если заданы зоны, доставка возможна только внутри них: цена - по тарифу зоны
+    от ближайшей точки отправки. Без зон - самая дешевая точка, в радиус которой
+    попадает адрес.
+    """
+    origins = current_delivery_origins()
+    zones = current_delivery_zones()
+    if zones is None:
+        return origins.cheapest(point.lat, point.lon), None
+
+    nearest = origins.nearest(point.lat, point.lon)
+    zone = zones.find(point.lat, point.lon)
+    return OriginMatch(nearest.origin, nearest.distance_km, within_radius=zone is not None), zone
 
 
 def _delivery_viewbox() -> str:
-    lat_delta = settings.DELIVERY_MAX_RADIUS_KM / 111.0
-    lon_base = 111.0 * max(0.2, math.cos(math.radians(settings.DELIVERY_ORIGIN_LAT)))
-    lon_delta = settings.DELIVERY_MAX_RADIUS_KM / lon_base
-
-    left = settings.DELIVERY_ORIGIN_LON - lon_delta
-    top = settings.DELIVERY_ORIGIN_LAT + lat_delta
-    right = settings.DELIVERY_ORIGIN_LON + lon_delta
-    bottom = settings.DELIVERY_ORIGIN_LAT - lat_delta
+    left, top, right, bottom = current_delivery_origins().viewbox()
     return f"{left},{top},{right},{bottom}"
 
 
@@ -198,7 +417,30 @@ def _sort_geocoder_points(points: list[GeoPoint], query: str) -> list[GeoPoint]:
     return sorted(points, key=lambda point: _score_geocoder_point(point, query), reverse=True)
 
 
-async def _request_geocoder(address: str, *, bounded: bool, limit: int) -> list[GeoPoint]:
+def _geocoder_unavailable() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Не удалось связаться с сервисом расчета доставки. Попробуйте еще раз.",
+    )
+
+
+async def _acquire_geocoder_token(*, critical: bool) -> None:
+    try:
+        if critical:
+            await _GEOCODER_GOVERNOR.acquire(
+                priority=_GEOCODER_PRIORITY_RESOLVE,
+                max_wait=remaining_timeout(settings.GEOCODER_RESOLVE_MAX_WAIT_SECONDS),
+            )
+        else:
+            await _GEOCODER_GOVERNOR.acquire(
+                priority=_GEOCODER_PRIORITY_SUGGEST,
+                max_wait=remaining_timeout(settings.GEOCODER_SUGGEST_MAX_WAIT_SECONDS),
+            )
+    except DeadlineExceeded as error:
+        raise _geocoder_unavailable() from error
+
+
+async def _fetch_geocoder(address: str, *, bounded: bool, limit: int) -> list[GeoPoint]:
     params: dict[str, str | int] = {
         "q": address,
         "format": "jsonv2",
@@ -215,20 +457,16 @@ async def _request_geocoder(address: str, *, bounded: bool, limit: int) -> list[
         params["viewbox"] = _delivery_viewbox()
         params["bounded"] = 1
 
-    headers = {
-        "User-Agent": "GlassSelling/1.0 delivery-check",
-        "Accept": "application/json",
-    }
-
     try:
-        async with httpx.AsyncClient(timeout=10.0, follow_redirects=True) as client:
-            response = await client.get(_GEOCODER_URL, params=params, headers=headers)
+        async with _GEOCODER_BREAKER.guard():
+            response = await geocoder_http_client.get().get(
+                _GEOCODER_URL,
+                params=params,
+                timeout=remaining_timeout(_GEOCODER_TIMEOUT_SECONDS),
+            )
             response.raise_for_status()
-    except httpx.HTTPError as error:
-        raise HTTPException(
-            status_code=503,
-            detail="Не удалось связаться с сервисом расчета доставки. Попробуйте еще раз.",
-        ) from error
+    except (httpx.HTTPError, CircuitOpenError, DeadlineExceeded) as error:
+        raise _geocoder_unavailable() from error
 
     payload = response.json()
     if not payload:
@@ -243,6 +481,197 @@ async def _request_geocoder(address: str, *, bounded: bool, limit: int) -> list[
     return _dedupe_points(points)
 
 
+def _geocoder_query_key(address: str) -> str:
+    return " ".join(address.split()).casefold()
+
+
+def _cached_points(result_limit: int, points: list[GeoPoint], limit: int) -> list[GeoPoint] | None:
+    # Ответ на больший limit подходит и для меньшего; неполный ответ - для любого.
+    if result_limit >= limit or len(points) < result_limit:
+        return points[:limit]
+
+    return None
+
+
+async def _request_geocoder(
+    address: str,
+    *,
+    bounded: bool,
+    limit: int,
+    critical: bool = False,
+) -> list[GeoPoint]:
+    """Ищет адрес сначала в памяти процесса, затем в таблице geocode_cache и только потом в Nominatim.
+
+    `critical` - запрос нужен для оформления заказа и получает токен Nominatim раньше подсказок.
+    """
+    query = _geocoder_query_key(address)
+    key = (query, bounded)
+
+    cached = _GEOCODER_QUERY_CACHE.get(key)
+    if cached is not None:
+        points = _cached_points(*cached, limit)
+        if points is not None:
+            return points
+
+    return await _GEOCODER_IN_FLIGHT.run(
+        (query, bounded, limit),
+        lambda: _load_geocoder_points(address, query=query, bounded=bounded, limit=limit, critical=critical),
+    )
+
+
+async def _load_geocoder_points(
+    address: str,
+    *,
+    query: str,
+    bounded: bool,
+    limit: int,
+    critical: bool,
+) -> list[GeoPoint]:
+    key = (query, bounded)
+
+    try:
+        row = await GeocodeCacheDAO.find_by_query(query=query, bounded=bounded)
+    except (SQLAlchemyError, OSError):
+        logger.warning("Geocode cache read failed", exc_info=True)
+        row = None
+
+    stored_points: list[GeoPoint] | None = None
+    if row is not None:
+        stored_points = [GeoPoint(**raw_point) for raw_point in row.points]
+        fresh_after = utc_now() - timedelta(days=settings.GEOCODER_DB_CACHE_TTL_DAYS)
+        if row.updated_at > fresh_after:
+            _GEOCODER_QUERY_CACHE.set(key, (row.result_limit, stored_points))
+            points = _cached_points(row.result_limit, stored_points, limit)
+            if points is not None:
+                return points
+
+    # Пока Nominatim недоступен, устаревший или неполный ответ из geocode_cache
+    # лучше, чем ошибка.
+    if _GEOCODER_BREAKER.is_open():
+        if stored_points is not None:
+            return stored_points[:limit]
+        raise _geocoder_unavailable()
+
+    try:
+        await _acquire_geocoder_token(critical=critical)
+
+        # Токен Nominatim уже потрачен: если вызывающий ушел (клиент закрыл запрос),
+        # ответ все равно дочитывается и попадает в кэш, а не выбрасывается.
+        task = asyncio.create_task(
+            _fetch_and_store_geocoder_points(address, query=query, bounded=bounded, limit=limit)
+        )
+        _GEOCODER_BACKGROUND_TASKS.add(task)
+        task.add_done_callback(_forget_geocoder_task)
+        return await asyncio.shield(task)
+    except HTTPException:
+        if stored_points is not None:
+            return stored_points[:limit]
+        raise
+
+
+def _forget_geocoder_task(task: asyncio.Task) -> None:
+    _GEOCODER_BACKGROUND_TASKS.discard(task)
+    # Ошибку брошенного запроса уже некому отдать, но и в лог asyncio она не нужна.
+    if not task.cancelled():
+        task.exception()
+
+
+async def _fetch_and_store_geocoder_points(
+    address: str,
+    *,
+    query: str,
+    bounded: bool,
+    limit: int,
+) -> list[GeoPoint]:
+    key = (query, bounded)
+    points = await _fetch_geocoder(address, bounded=bounded, limit=limit)
+    _GEOCODER_QUERY_CACHE.set(key, (limit, points))
+
+    try:
+        await GeocodeCacheDAO.upsert(
+            query=query,
+            bounded=bounded,
+            result_limit=limit,
+            points=[asdict(point) for point in points],
+        )
+    except (SQLAlchemyError, OSError):
+        logger.warning("Geocode cache write failed", exc_info=True)
+
+    return points
+
+
+async def _collect_geocoder_variants(
+    variants: list[tuple[str, bool]],
+    *,
+    limit: int,
+    critical: bool,
+    enough: Callable[[list[GeoPoint]], bool],
+) -> list[GeoPoint]:
+    """Запрашивает все варианты `(запрос, bounded)` одновременно, а результаты берет по порядку.
+
+    Ответы складываются в порядке приоритета вариантов, как при последовательном переборе:
+    `enough` проверяется на готовом начале этого списка. Как только он доволен, оставшиеся
+    запросы отменяются, в том числе ждущие токен Nominatim. Ошибка варианта, например отказ
+    governor, означает "точек нет"; она поднимается, только если ошиблись все варианты.
+    """
+
+    async def request_variant(
+        index: int, query: str, bounded: bool
+    ) -> tuple[int, list[GeoPoint], HTTPException | None]:
+        try:
+            return index, await _request_geocoder(query, bounded=bounded, limit=limit, critical=critical), None
+        except HTTPException as error:
+            return index, [], error
+
+    tasks = [
+        asyncio.create_task(request_variant(index, query, bounded))
+        for index, (query, bounded) in enumerate(variants)
+    ]
+    results: list[list[GeoPoint] | None] = [None] * len(variants)
+    errors: list[HTTPException | None] = [None] * len(variants)
+    points: list[GeoPoint] = []
+    ready = 0
+
+    try:
+        for finished in asyncio.as_completed(tasks):
+            index, variant_points, error = await finished
+            results[index] = variant_points
+            errors[index] = error
+
+            while ready < len(variants) and results[ready] is not None:
+                points.extend(results[ready])
+                ready += 1
+
+            if enough(points):
+                break
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    if variants and ready == len(variants) and all(errors):
+        raise errors[0]
+
+    return points
+
+
+async def _lookup_delivery_address(normalized_address: str) -> GeoPoint:
+    queries = _build_geocoder_queries(normalized_address)
+    points = await _collect_geocoder_variants(
+        [(query, bounded) for bounded in (True, False) for query in queries],
+        limit=1,
+        critical=True,
+        enough=bool,
+    )
+    if points:
+        return points[0]
+
+    raise HTTPException(
+        status_code=400,
+        detail="Не удалось определить адрес. Укажи населенный пункт, улицу и номер дома.",
+    )
+
+
 async def resolve_delivery_address(address: str) -> GeoPoint:
     normalized_address = " ".join(address.split())
 
@@ -252,73 +681,138 @@ async def resolve_delivery_address(address: str) -> GeoPoint:
             detail="Укажи адрес доставки подробнее: населенный пункт, улицу и дом.",
         )
 
-    cached = _GEOCODER_CACHE.get(normalized_address.lower())
-    if cached is not None:
-        return cached
+    with deadline(settings.GEOCODER_DEADLINE_SECONDS):
+        return await _GEOCODER_CACHE.get_or_load(
+            normalized_address.lower(),
+            lambda: _lookup_delivery_address(normalized_address),
+        )
 
-    for bounded in (True, False):
-        for query in _build_geocoder_queries(normalized_address):
-            points = await _request_geocoder(query, bounded=bounded, limit=1)
-            if points:
-                _GEOCODER_CACHE[normalized_address.lower()] = points[0]
-                return points[0]
 
-    raise HTTPException(
-        status_code=400,
-        detail="Не удалось определить адрес. Укажи населенный пункт, улицу и номер дома.",
+async def _lookup_suggestion_points(normalized_query: str) -> list[GeoPoint]:
+    # Suggestions should search across Russia first so city queries like
+    # "Краснодар" are not trapped inside the local delivery-radius box.
+    queries = _build_geocoder_queries(normalized_query)
+    variants = [(normalized_query, False)]
+    variants.extend((query, False) for query in queries if query != normalized_query)
+    variants.extend((query, True) for query in queries)
+
+    points = await _collect_geocoder_variants(
+        variants,
+        limit=_SUGGESTION_LIMIT,
+        critical=False,
+        enough=lambda collected: len(_dedupe_points(collected)) >= _SUGGESTION_LIMIT,
     )
+    return _sort_geocoder_points(_dedupe_points(points), normalized_query)[:_SUGGESTION_LIMIT]
+
+
+def load_gazetteer() -> Gazetteer | None:
+    """Загружает локальный справочник из `GEOCODER_GAZETTEER_PATH` один раз на процесс.
+
+    Разбор `.osm` блокирует поток, поэтому при старте приложения функция вызывается через `asyncio.to_thread`.
+    """
+    global _GAZETTEER, _GAZETTEER_LOADED
+
+    if _GAZETTEER_LOADED:
+        return _GAZETTEER
+
+    _GAZETTEER_LOADED = True
+    if not settings.GEOCODER_GAZETTEER_PATH:
+        return None
+
+    try:
+        entries = read_entries(
+            Path(settings.GEOCODER_GAZETTEER_PATH),
+            areas=current_delivery_origins().areas(),
+        )
+    except (OSError, ValueError, KeyError, TypeError, ElementTree.ParseError):
+        logger.exception("Failed to load gazetteer from %s", settings.GEOCODER_GAZETTEER_PATH)
+        return None
+
+    _GAZETTEER = Gazetteer(entries, normalize=_normalize_geocoder_text)
+    logger.info("Loaded gazetteer with %s entries", len(_GAZETTEER))
+    return _GAZETTEER
+
+
+def _local_suggestion_points(normalized_query: str) -> list[GeoPoint]:
+    gazetteer = load_gazetteer()
+    if gazetteer is None:
+        return []
+
+    points = [
+        GeoPoint(
+            display_name=entry.display_name,
+            lat=entry.lat,
+            lon=entry.lon,
+            importance=entry.importance,
+            addresstype=entry.kind,
+        )
+        for entry in gazetteer.search(normalized_query, limit=_GAZETTEER_CANDIDATES)
+    ]
+    return _sort_geocoder_points(points, normalized_query)[:_SUGGESTION_LIMIT]
+
+
+def _refine_cached_suggestions(normalized_query: str) -> list[GeoPoint] | None:
+    """Уточняет закэшированные подсказки для более короткого префикса вместо запроса в Nominatim.
+
+    Годится только полный ответ (меньше `_SUGGESTION_LIMIT` точек) на префикс, который
+    отличается от запроса лишь продолжением последнего слова: "пуш" -> "пушки".
+    Если после фильтрации ничего не осталось, решает Nominatim.
+    """
+    global _suggest_prefix_reuses
+
+    key = normalized_query.lower()
+    for length in range(len(key) - 1, _SUGGEST_MIN_QUERY_LENGTH - 1, -1):
+        if not key[length:].isalnum():
+            break
+
+        cached = _GEOCODER_SUGGEST_CACHE.peek(key[:length])
+        if cached is None:
+            continue
+        if len(cached) >= _SUGGESTION_LIMIT:
+            return None
+
+        query_words = _normalize_geocoder_text(normalized_query).split()
+        if not query_words:
+            return None
+
+        last_word = query_words[-1]
+        refined = [
+            point
+            for point in cached
+            if any(word.startswith(last_word) for word in _normalize_geocoder_text(point.display_name).split())
+        ]
+        if not refined:
+            return None
+
+        refined = _sort_geocoder_points(refined, normalized_query)
+        _GEOCODER_SUGGEST_CACHE.set(key, refined)
+        _suggest_prefix_reuses += 1
+        return refined
+
+    return None
 
 
 async def suggest_delivery_addresses(query: str) -> list[dict]:
     normalized_query = " ".join(query.split())
 
-    if len(normalized_query) < 3:
+    if len(normalized_query) < _SUGGEST_MIN_QUERY_LENGTH:
         return []
 
-    cache_key = normalized_query.lower()
-    cached = _GEOCODER_SUGGEST_CACHE.get(cache_key)
-
-    if cached is None:
-        # Suggestions should search across Russia first so city queries like
-        # "Краснодар" are not trapped inside the local delivery-radius box.
-        points = await _request_geocoder(normalized_query, bounded=False, limit=_SUGGESTION_LIMIT)
-        deduped_points = _dedupe_points(points)
-
-        if len(deduped_points) < _SUGGESTION_LIMIT:
-            for search_query in _build_geocoder_queries(normalized_query):
-                if search_query == normalized_query:
-                    continue
-
-                points.extend(
-                    await _request_geocoder(
-                        search_query,
-                        bounded=False,
-                        limit=_SUGGESTION_LIMIT,
-                    )
-                )
-                deduped_points = _dedupe_points(points)
-                if len(deduped_points) >= _SUGGESTION_LIMIT:
-                    break
-
-        if len(deduped_points) < _SUGGESTION_LIMIT:
-            for search_query in _build_geocoder_queries(normalized_query):
-                points.extend(
-                    await _request_geocoder(
-                        search_query,
-                        bounded=True,
-                        limit=_SUGGESTION_LIMIT,
-                    )
-                )
-                deduped_points = _dedupe_points(points)
-                if len(deduped_points) >= _SUGGESTION_LIMIT:
-                    break
-
-        cached = _sort_geocoder_points(deduped_points, normalized_query)[:_SUGGESTION_LIMIT]
-        _GEOCODER_SUGGEST_CACHE[cache_key] = cached
+    # Населенные пункты и улицы зоны доставки отвечаются из локального справочника,
+    # в Nominatim уходят только промахи (например, запросы с номером дома).
+    cached = _local_suggestion_points(normalized_query) or _refine_cached_suggestions(normalized_query)
+    if not cached:
+        with deadline(settings.GEOCODER_DEADLINE_SECONDS):
+            cached = await _GEOCODER_SUGGEST_CACHE.get_or_load(
+                normalized_query.lower(),
+                lambda: _lookup_suggestion_points(normalized_query),
+            )
+
+    await refresh_delivery_settings()
 
     suggestions: list[dict] = []
     for point in cached:
-        distance_km = _distance_from_origin_km(point)
+        match, zone = _serving_origin(point)
         title, subtitle = _split_display_name(point.display_name)
 
         suggestions.append(
@@ -326,8 +820,11 @@ async def suggest_delivery_addresses(query: str) -> list[dict]:
                 "title": title,
                 "subtitle": subtitle,
                 "full_address": point.display_name,
-                "distance_km": _distance_decimal(distance_km),
-                "within_radius": distance_km <= settings.DELIVERY_MAX_RADIUS_KM,
+                "distance_km": _distance_decimal(match.distance_km),
+                "within_radius": match.within_radius,
+                "origin_id": match.origin.id,
+                "origin_name": match.origin.name,
+                "zone_name": zone.name if zone else None,
                 "lat": point.lat,
                 "lon": point.lon,
             }
@@ -336,24 +833,197 @@ async def suggest_delivery_addresses(query: str) -> list[dict]:
     return suggestions
 
 
-def build_delivery_quote(*, address: str, point: GeoPoint, subtotal: Decimal, items_available: bool) -> dict:
-    distance_km = _distance_from_origin_km(point)
-    distance_value = _distance_decimal(distance_km)
-    within_radius = distance_km <= settings.DELIVERY_MAX_RADIUS_KM
+def geocoder_cache_stats() -> dict:
+    return {
+        "resolve": _GEOCODER_CACHE.stats(),
+        "suggest": _GEOCODER_SUGGEST_CACHE.stats(),
+        "suggest_prefix_reuses": _suggest_prefix_reuses,
+        "queries": _GEOCODER_QUERY_CACHE.stats(),
+        "in_flight": _GEOCODER_IN_FLIGHT.stats(),
+        "governor": _GEOCODER_GOVERNOR.stats(),
+        "breaker": _GEOCODER_BREAKER.stats(),
+        "delivery_quotes": _DELIVERY_QUOTE_CACHE.stats(),
+        "gazetteer_entries": len(_GAZETTEER) if _GAZETTEER is not None else 0,
+        "delivery_origins": len(current_delivery_origins()),
+        "delivery_zones": _delivery_zones.stats() if _delivery_zones is not None else None,
+        "road_distances": {
+            "cache": _ROAD_DISTANCE_CACHE.stats(),
+            "in_flight": _ROAD_DISTANCE_IN_FLIGHT.stats(),
+            "fallbacks": _road_distance_fallbacks,
+        },
+    }
+
+
+async def saved_delivery_point(*, user_id: int, saved_address_id: int) -> GeoPoint:
+    """Точка из адресной книги пользователя: координаты уже известны, геокодер не нужен."""
+    saved_address = await SavedAddressesDAO.find_one_or_none(id=saved_address_id, user_id=user_id)
+
+    if not saved_address:
+        raise HTTPException(status_code=404, detail="Сохраненный адрес не найден.")
+
+    return GeoPoint(
+        display_name=saved_address.normalized_address,
+        lat=saved_address.lat,
+        lon=saved_address.lon,
+    )
+
+
+def delivery_settings_version() -> str:
+    """Отпечаток точек отправки, зон и их тарифов, от которых зависит цена доставки."""
+    zones = current_delivery_zones()
+    return f"{current_delivery_origins().version}:{zones.version if zones else '-'}"
+
+
+def delivery_quote_cache_key(
+    *,
+    user_id: int,
+    cart_version: str,
+    address: str,
+    normalized_address: str | None,
+    lat: float | None,
+    lon: float | None,
+) -> tuple:
+    """Ключ расчета доставки: корзина, адрес (или округленные до ~1 м координаты) и настройки."""
+    if lat is not None and lon is not None:
+        place = ("point", round(lat, 5), round(lon, 5), _geocoder_query_key(normalized_address or address))
+    else:
+        place = ("address", _geocoder_query_key(address))
+
+    return user_id, cart_version, place, delivery_settings_version()
+
+
+def get_cached_delivery_quote(key: tuple, *, address: str) -> dict | None:
+    quote = _DELIVERY_QUOTE_CACHE.get(key)
+    if quote is None:
+        return None
+
+    return {**quote, "address": address}
+
+
+def cache_delivery_quote(key: tuple, quote: dict) -> None:
+    """Кэширует расчет доставки.
+
+    Смена корзины или настроек меняет ключ, а изменения цен в каталоге
+    подхватываются по истечении `DELIVERY_QUOTE_CACHE_TTL_SECONDS`.
+    """
+    _DELIVERY_QUOTE_CACHE.set(key, quote)
 
+
+def set_road_router(router: RoadRouter | None) -> None:
+    """Подменяет маршрутизатор, например на `StraightLineRouter` в тестах."""
+    global _road_router
+
+    _road_router = router
+    _ROAD_DISTANCE_CACHE.clear()
+
+
+async def _load_road_distance(
+    key: tuple[str, str],
+    origin: DeliveryOriginOption,
+    destination: tuple[float, float],
+) -> float | None:
+    global _road_distance_fallbacks
+
+    origin_key, cell_key = key
+    row = None
+    try:
+        row = await RoadDistancesDAO.find_one_or_none(origin_key=origin_key, cell_key=cell_key)
+    except (SQLAlchemyError, OSError):
+        logger.exception("Failed to read road distance cache")
+
+    fresh_after = utc_now() - timedelta(days=settings.ROAD_DISTANCE_DB_CACHE_TTL_DAYS)
+    if row is not None and row.updated_at > fresh_after:
+        _ROAD_DISTANCE_CACHE.set(key, row.distance_km)
+        return row.distance_km
+
+    try:
+        distance_km = await _road_router.route_km((origin.lat, origin.lon), destination)
+    except NoRoadRoute:
+        _ROAD_DISTANCE_CACHE.set(key, NO_ROAD_ROUTE, ttl=settings.ROAD_DISTANCE_NO_ROUTE_TTL_SECONDS)
+        return NO_ROAD_ROUTE
+    except RoutingUnavailable:
+        _road_distance_fallbacks += 1
+        logger.warning("Road routing unavailable for %s -> %s", origin_key, cell_key, exc_info=True)
+        return row.distance_km if row is not None else None
+
+    _ROAD_DISTANCE_CACHE.set(key, distance_km)
+    try:
+        await RoadDistancesDAO.upsert(origin_key=origin_key, cell_key=cell_key, distance_km=distance_km)
+    except (SQLAlchemyError, OSError):
+        logger.exception("Failed to store road distance")
+
+    return distance_km
+
+
+async def road_distance_km(origin: DeliveryOriginOption, point: GeoPoint) -> float | None:
+    """Расстояние по дорогам от точки отправки до адреса или `None`, если считать по прямой.
+
+    `NO_ROAD_ROUTE` - маршрутизатор ответил, что проезда нет.
+
+    Маршрут строится до центра ячейки `ROAD_DISTANCE_CELL_METERS`, в которую попал
+    адрес, и кэшируется для всей ячейки: в памяти, затем в таблице `road_distances`.
+    Повторный расчет для того же квартала маршрутизатор не вызывает.
+    """
+    if _road_router is None:
+        return None
+
+    cell_meters = settings.ROAD_DISTANCE_CELL_METERS
+    row, col = destination_cell(point.lat, point.lon, cell_meters=cell_meters)
+    key = (f"{origin.lat:.5f},{origin.lon:.5f}", f"{cell_meters:g}:{row}:{col}")
+
+    cached = _ROAD_DISTANCE_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    destination = cell_center(row, col, cell_meters=cell_meters)
+    return await _ROAD_DISTANCE_IN_FLIGHT.run(key, lambda: _load_road_distance(key, origin, destination))
+
+
+async def build_delivery_quote(*, address: str, point: GeoPoint, subtotal: Decimal, items_available: bool) -> dict:
+    """Считает доставку для адреса; точку отправки и тариф выбирает `_serving_origin()`.
+
+    Точки и зоны берутся из `current_delivery_origins()`, поэтому вызывающий должен
+    заранее сделать `await refresh_delivery_settings()`. Зона и радиус проверяются
+    по прямой, а цена - по дорогам, если настроен маршрутизатор.
+    """
+    match, zone = _serving_origin(point)
+    origin = match.origin
+    within_radius = match.within_radius
+    distance_km = match.distance_km
+    distance_label = "Расстояние"
+
+    no_road_route = False
     if within_radius:
-        billed_km = Decimal(max(1, math.ceil(distance_km)))
-        distance_component = settings.DELIVERY_PRICE_PER_KM * billed_km
-        delivery_price = _money(max(settings.DELIVERY_MIN_PRICE, distance_component))
+        road_km = await road_distance_km(origin, point)
+        if road_km == NO_ROAD_ROUTE:
+            no_road_route = True
+            within_radius = False
+        elif road_km is not None:
+            # Путь до центра ячейки может выйти чуть короче прямой до самого адреса.
+            distance_km = max(distance_km, road_km)
+            distance_label = "Расстояние по дорогам"
+
+    distance_value = _distance_decimal(distance_km)
+
+    if no_road_route:
+        delivery_price = Decimal("0.00")
+        message = f"До адреса нет проезда по дорогам от {origin.name}."
+    elif zone is not None:
+        delivery_price = zone.price_for(distance_km)
         message = (
-            f"Адрес входит в зону доставки. Расстояние от {settings.DELIVERY_ORIGIN_NAME}: "
-            f"{distance_value} км."
+            f"Адрес входит в зону доставки «{zone.name}». {distance_label} от {origin.name}: {distance_value} км."
         )
+    elif current_delivery_zones() is not None:
+        delivery_price = Decimal("0.00")
+        message = "Адрес не входит ни в одну зону доставки."
+    elif within_radius:
+        delivery_price = origin.price_for(distance_km)
+        message = f"Адрес входит в зону доставки. {distance_label} от {origin.name}: {distance_value} км."
     else:
         delivery_price = Decimal("0.00")
         message = (
-            f"Адрес находится в {distance_value} км от {settings.DELIVERY_ORIGIN_NAME}. "
-            f"Доставка доступна только в радиусе {settings.DELIVERY_MAX_RADIUS_KM:.0f} км."
+            f"Адрес находится в {distance_value} км от {origin.name}. "
+            f"Доставка доступна только в радиусе {origin.max_radius_km:.0f} км."
         )
 
     total_price = _money(subtotal + delivery_price)
@@ -368,6 +1038,85 @@ def build_delivery_quote(*, address: str, point: GeoPoint, subtotal: Decimal, it
         "within_radius": within_radius,
         "can_order": items_available and within_radius,
         "message": message,
+        "lat": point.lat,
+        "lon": point.lon,
+        "origin_id": origin.id,
+        "origin_name": origin.name,
+        "zone_id": zone.id if zone else None,
+        "zone_name": zone.name if zone else None,
+    }
+
+
+def create_delivery_quote_token(*, user_id: int, cart_version: str, quote: dict) -> str | None:
+    """Подписывает расчет доставки, чтобы оформление заказа не считало его заново.
+
+    Токен выдается только для расчета, по которому можно оформить заказ.
+    """
+    if not quote["can_order"]:
+        return None
+
+    claims = {
+        "type": _DELIVERY_QUOTE_TOKEN_TYPE,
+        "uid": user_id,
+        "cart": cart_version,
+        "settings": delivery_settings_version(),
+        "address": quote["address"],
+        "normalized_address": quote["normalized_address"],
+        "lat": quote["lat"],
+        "lon": quote["lon"],
+        "origin_id": quote["origin_id"],
+        "origin_name": quote["origin_name"],
+        "zone_id": quote["zone_id"],
+        "zone_name": quote["zone_name"],
+        "within_radius": quote["within_radius"],
+        "distance_km": str(quote["distance_km"]),
+        "delivery_price": str(quote["delivery_price"]),
+        "subtotal": str(quote["subtotal_price"]),
+        "exp": utc_now() + timedelta(seconds=settings.DELIVERY_QUOTE_TOKEN_TTL_SECONDS),
+    }
+    return jwt.encode(claims=claims, key=settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
+def read_delivery_quote_token(token: str, *, user_id: int, cart_version: str | None) -> dict | None:
+    """Возвращает данные токена расчета, если он подлинный, не истек и корзина с настройками не менялись."""
+    try:
+        claims = jwt.decode(token=token, key=settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+
+    if (
+        claims.get("type") != _DELIVERY_QUOTE_TOKEN_TYPE
+        or claims.get("uid") != user_id
+        or claims.get("cart") != cart_version
+        or claims.get("settings") != delivery_settings_version()
+    ):
+        return None
+
+    return claims
+
+
+def delivery_quote_from_token(claims: dict, *, subtotal: Decimal) -> dict | None:
+    """Собирает расчет из токена без геокодирования. `None`, если цены корзины с тех пор изменились."""
+    if Decimal(claims["subtotal"]) != _money(subtotal):
+        return None
+
+    delivery_price = Decimal(claims["delivery_price"])
+    return {
+        "address": claims["address"],
+        "normalized_address": claims["normalized_address"],
+        "distance_km": Decimal(claims["distance_km"]),
+        "delivery_price": delivery_price,
+        "subtotal_price": _money(subtotal),
+        "total_price": _money(subtotal + delivery_price),
+        "within_radius": claims["within_radius"],
+        "can_order": True,
+        "message": None,
+        "lat": claims["lat"],
+        "lon": claims["lon"],
+        "origin_id": claims["origin_id"],
+        "origin_name": claims["origin_name"],
+        "zone_id": claims["zone_id"],
+        "zone_name": claims["zone_name"],
     }
 
 
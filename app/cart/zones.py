@@ -0,0 +1,374 @@
+"""Полигональные зоны доставки из GeoJSON и их растровый индекс.
+
+Зоны заранее растрируются в сетку с ячейкой в `cell_meters`: в ячейке записан
+номер зоны, которая покрывает ее целиком, 0 - если ячейка вне всех зон, и -1 -
+если через ячейку (или соседнюю) проходит граница. Поиск зоны для точки - одно
+чтение из массива; точный тест полигона нужен только у самой границы.
+"""
+from __future__ import annotations
+
+import hashlib
+import math
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from typing import Iterable
+
+import numpy as np
+
+from app.cart.origins import delivery_price
+
+
+_METERS_PER_DEGREE = 111_320.0
+_BOUNDARY = -1
+_CONTAINS_BATCH_CELLS = 1_000_000
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class DeliveryZoneArea:
+    id: int | None
+    name: str
+    # Полигоны зоны; у каждого внешнее кольцо и дырки как массивы (lon, lat).
+    polygons: tuple[tuple[np.ndarray, ...], ...]
+    price_per_km: Decimal
+    min_price: Decimal
+    priority: int
+
+    def contains(self, lat: float, lon: float) -> bool:
+        return any(_polygon_contains(rings, lon, lat) for rings in self.polygons)
+
+    def price_for(self, distance_km: float) -> Decimal:
+        return delivery_price(distance_km, price_per_km=self.price_per_km, min_price=self.min_price)
+
+
+def _polygon_contains(rings: tuple[np.ndarray, ...], x: float, y: float) -> bool:
+    """Правило чет-нечет по лучу вправо; дырки учитываются автоматически."""
+    crossings = 0
+    for ring in rings:
+        x0, y0 = ring[:-1, 0], ring[:-1, 1]
+        x1, y1 = ring[1:, 0], ring[1:, 1]
+        straddles = (y0 > y) != (y1 > y)
+        if not straddles.any():
+            continue
+
+        x0, y0, x1, y1 = x0[straddles], y0[straddles], x1[straddles], y1[straddles]
+        x_cross = x0 + (y - y0) * (x1 - x0) / (y1 - y0)
+        crossings += int(np.count_nonzero(x < x_cross))
+
+    return crossings % 2 == 1
+
+
+def _polygon_contains_many(rings: tuple[np.ndarray, ...], x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """`_polygon_contains` для массива точек; точки идут пачками, чтобы матрица точки x ребра была небольшой."""
+    inside = np.zeros(len(x), dtype=bool)
+    edges = sum(len(ring) - 1 for ring in rings)
+    batch = max(1, _CONTAINS_BATCH_CELLS // max(1, edges))
+
+    for start in range(0, len(x), batch):
+        px = x[start:start + batch, None]
+        py = y[start:start + batch, None]
+        crossings = np.zeros(len(px), dtype=np.int64)
+        for ring in rings:
+            x0, y0 = ring[:-1, 0], ring[:-1, 1]
+            x1, y1 = ring[1:, 0], ring[1:, 1]
+            straddles = (y0 > py) != (y1 > py)
+            # У горизонтальных ребер знаменатель нулевой, но они и не пересекают луч.
+            with np.errstate(divide="ignore", invalid="ignore"):
+                x_cross = x0 + (py - y0) * (x1 - x0) / (y1 - y0)
+            crossings += np.count_nonzero(straddles & (px < x_cross), axis=1)
+        inside[start:start + batch] = crossings % 2 == 1
+
+    return inside
+
+
+def _parse_ring(raw_ring) -> list[list[float]]:
+    if not isinstance(raw_ring, list):
+        raise ValueError("Кольцо полигона должно быть списком координат.")
+
+    ring: list[list[float]] = []
+    for position in raw_ring:
+        if not isinstance(position, list) or len(position) < 2:
+            raise ValueError("Координата должна быть парой [долгота, широта].")
+        lon, lat = position[0], position[1]
+        if not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in (lon, lat)):
+            raise ValueError("Координаты должны быть числами.")
+        if not (-180 <= lon <= 180 and -90 <= lat <= 90):
+            raise ValueError("Координаты вне допустимого диапазона.")
+        ring.append([float(lon), float(lat)])
+
+    if ring and ring[0] != ring[-1]:
+        ring.append(list(ring[0]))
+    if len(ring) < 4:
+        raise ValueError("В кольце полигона должно быть хотя бы три разные точки.")
+
+    return ring
+
+
+def normalize_geometry(geometry) -> dict:
+    """Проверяет геометрию GeoJSON и приводит ее к MultiPolygon с замкнутыми кольцами."""
+    if not isinstance(geometry, dict):
+        raise ValueError("У зоны нет геометрии.")
+
+    geometry_type = geometry.get("type")
+    coordinates = geometry.get("coordinates")
+    if geometry_type == "Polygon":
+        raw_polygons = [coordinates]
+    elif geometry_type == "MultiPolygon":
+        raw_polygons = coordinates
+    else:
+        raise ValueError("Зона должна быть Polygon или MultiPolygon.")
+
+    if not isinstance(raw_polygons, list) or not raw_polygons:
+        raise ValueError("У зоны пустая геометрия.")
+
+    polygons = []
+    for raw_polygon in raw_polygons:
+        if not isinstance(raw_polygon, list) or not raw_polygon:
+            raise ValueError("Полигон должен содержать хотя бы внешнее кольцо.")
+        polygons.append([_parse_ring(raw_ring) for raw_ring in raw_polygon])
+
+    return {"type": "MultiPolygon", "coordinates": polygons}
+
+
+def _parse_money(properties: dict, key: str, name: str) -> Decimal:
+    try:
+        value = Decimal(str(properties[key]))
+    except (KeyError, InvalidOperation):
+        raise ValueError(f"У зоны «{name}» не задано число {key}.") from None
+
+    if not value.is_finite() or value < 0:
+        raise ValueError(f"У зоны «{name}» некорректное значение {key}.")
+
+    return value
+
+
+def parse_zone_features(payload) -> list[dict]:
+    """Достает зоны из GeoJSON Feature или FeatureCollection.
+
+    У каждой зоны в `properties` обязательны `name`, `price_per_km` и `min_price`,
+    необязателен `priority` (при пересечении зон побеждает больший).
+    """
+    if isinstance(payload, dict) and payload.get("type") == "FeatureCollection":
+        features = payload.get("features")
+    elif isinstance(payload, dict) and payload.get("type") == "Feature":
+        features = [payload]
+    else:
+        raise ValueError("Нужен GeoJSON Feature или FeatureCollection.")
+
+    if not isinstance(features, list) or not features:
+        raise ValueError("В файле нет зон.")
+
+    zones: dict[str, dict] = {}
+    for feature in features:
+        properties = feature.get("properties") if isinstance(feature, dict) else None
+        if not isinstance(properties, dict):
+            raise ValueError("У зоны нет properties.")
+
+        name = str(properties.get("name") or "").strip()
+        if not name or len(name) > 100:
+            raise ValueError("У каждой зоны должно быть имя до 100 символов.")
+        if name in zones:
+            raise ValueError(f"Зона «{name}» встречается в файле дважды.")
+
+        priority = properties.get("priority", 0)
+        if isinstance(priority, bool) or not isinstance(priority, int):
+            raise ValueError(f"У зоны «{name}» priority должен быть целым числом.")
+
+        zones[name] = {
+            "name": name,
+            "geometry": normalize_geometry(feature.get("geometry")),
+            "price_per_km": _parse_money(properties, "price_per_km", name),
+            "min_price": _parse_money(properties, "min_price", name),
+            "priority": priority,
+        }
+
+    return list(zones.values())
+
+
+def zone_area(
+    *,
+    id: int | None,
+    name: str,
+    geometry: dict,
+    price_per_km: Decimal,
+    min_price: Decimal,
+    priority: int,
+) -> DeliveryZoneArea:
+    polygons = tuple(
+        tuple(np.array(ring, dtype=float) for ring in polygon)
+        for polygon in normalize_geometry(geometry)["coordinates"]
+    )
+    return DeliveryZoneArea(id, name, polygons, price_per_km, min_price, priority)
+
+
+class DeliveryZones:
+    """Набор активных зон с растровой сеткой для поиска зоны по точке."""
+
+    def __init__(self, zones: Iterable[DeliveryZoneArea], *, cell_meters: float, max_cells: int) -> None:
+        # Сетка закрашивается по возрастанию приоритета, так что в ячейке остается старшая зона.
+        self.zones = sorted(zones, key=lambda zone: (zone.priority, zone.id or 0))
+        if not self.zones:
+            raise ValueError("Нужна хотя бы одна зона.")
+
+        rings = [ring for zone in self.zones for polygon in zone.polygons for ring in polygon]
+        lon_min = min(float(ring[:, 0].min()) for ring in rings)
+        lon_max = max(float(ring[:, 0].max()) for ring in rings)
+        lat_min = min(float(ring[:, 1].min()) for ring in rings)
+        lat_max = max(float(ring[:, 1].max()) for ring in rings)
+
+        mid_lat = math.radians((lat_min + lat_max) / 2)
+        while True:
+            self._dlat = cell_meters / _METERS_PER_DEGREE
+            self._dlon = cell_meters / (_METERS_PER_DEGREE * max(0.2, math.cos(mid_lat)))
+            self._lat0 = lat_min - self._dlat
+            self._lon0 = lon_min - self._dlon
+            rows = math.ceil((lat_max - self._lat0) / self._dlat) + 2
+            cols = math.ceil((lon_max - self._lon0) / self._dlon) + 2
+            if rows * cols <= max_cells:
+                break
+            cell_meters *= math.sqrt(rows * cols / max_cells) * 1.01
+        self.cell_meters = cell_meters
+
+        grid = np.zeros((rows, cols), dtype=np.int16)
+        boundary = np.zeros((rows, cols), dtype=bool)
+        for number, zone in enumerate(self.zones, start=1):
+            for polygon in zone.polygons:
+                grid[self._fill_mask(polygon, rows, cols)] = number
+                for ring in polygon:
+                    self._mark_edges(ring, boundary)
+
+        # Соседние с границей ячейки тоже сомнительные: отрезок мог задеть угол ячейки между отсчетами.
+        padded = np.pad(boundary, 1)
+        near_boundary = np.zeros_like(boundary)
+        for row_shift in range(3):
+            for col_shift in range(3):
+                near_boundary |= padded[row_shift:row_shift + rows, col_shift:col_shift + cols]
+        grid[near_boundary] = _BOUNDARY
+        self._grid = grid
+
+        digest = hashlib.sha1()
+        for zone in self.zones:
+            digest.update(f"{zone.id}:{zone.name}:{zone.priority}:{zone.price_per_km}:{zone.min_price}:".encode())
+            for polygon in zone.polygons:
+                for ring in polygon:
+                    digest.update(ring.tobytes())
+        self.version = digest.hexdigest()[:12]
+
+    def __len__(self) -> int:
+        return len(self.zones)
+
+    def _fill_mask(self, rings: tuple[np.ndarray, ...], rows: int, cols: int) -> np.ndarray:
+        """Ячейки, центры которых внутри полигона: построчная заливка между пересечениями с ребрами."""
+        mask = np.zeros((rows, cols), dtype=bool)
+        edges = np.concatenate([np.hstack((ring[:-1], ring[1:])) for ring in rings])
+        x0, y0, x1, y1 = edges.T
+
+        first_row = max(0, math.floor((float(min(y0.min(), y1.min())) - self._lat0) / self._dlat))
+        last_row = min(rows - 1, math.ceil((float(max(y0.max(), y1.max())) - self._lat0) / self._dlat))
+        for row in range(first_row, last_row + 1):
+            y = self._lat0 + (row + 0.5) * self._dlat
+            straddles = (y0 > y) != (y1 > y)
+            if not straddles.any():
+                continue
+
+            sx0, sy0, sx1, sy1 = x0[straddles], y0[straddles], x1[straddles], y1[straddles]
+            crossings = np.sort(sx0 + (y - sy0) * (sx1 - sx0) / (sy1 - sy0))
+            for start, end in zip(crossings[0::2], crossings[1::2]):
+                first_col = max(0, math.floor((start - self._lon0) / self._dlon - 0.5) + 1)
+                last_col = min(cols - 1, math.ceil((end - self._lon0) / self._dlon - 0.5) - 1)
+                if first_col <= last_col:
+                    mask[row, first_col:last_col + 1] ^= True
+
+        return mask
+
+    def _mark_edges(self, ring: np.ndarray, boundary: np.ndarray) -> None:
+        start, end = ring[:-1], ring[1:]
+        delta = end - start
+        # Отсчеты вдоль ребра чаще, чем раз в пол-ячейки.
+        length_in_cells = np.maximum(np.abs(delta[:, 0]) / self._dlon, np.abs(delta[:, 1]) / self._dlat)
+        steps = np.ceil(length_in_cells * 2).astype(int) + 1
+        edge_index = np.repeat(np.arange(len(start)), steps)
+        offsets = np.arange(int(steps.sum())) - np.repeat(np.cumsum(steps) - steps, steps)
+        t = offsets / np.repeat(np.maximum(steps - 1, 1), steps)
+
+        points = start[edge_index] + delta[edge_index] * t[:, None]
+        rows = np.clip(((points[:, 1] - self._lat0) / self._dlat).astype(int), 0, boundary.shape[0] - 1)
+        cols = np.clip(((points[:, 0] - self._lon0) / self._dlon).astype(int), 0, boundary.shape[1] - 1)
+        boundary[rows, cols] = True
+
+    def find(self, lat: float, lon: float) -> DeliveryZoneArea | None:
+        """Зона с наибольшим приоритетом, в которую попадает точка, или `None`."""
+        row = math.floor((lat - self._lat0) / self._dlat)
+        col = math.floor((lon - self._lon0) / self._dlon)
+        if not (0 <= row < self._grid.shape[0] and 0 <= col < self._grid.shape[1]):
+            return None
+
+        value = int(self._grid[row, col])
+        if value > 0:
+            return self.zones[value - 1]
+        if value == 0:
+            return None
+
+        for zone in reversed(self.zones):
+            if zone.contains(lat, lon):
+                return zone
+
+        return None
+
+    def find_many(self, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+        """Векторный `find()`: индекс зоны в `zones` для каждой точки, -1 - вне зон."""
+        rows = np.floor((lat - self._lat0) / self._dlat).astype(np.int64)
+        cols = np.floor((lon - self._lon0) / self._dlon).astype(np.int64)
+        on_grid = (rows >= 0) & (rows < self._grid.shape[0]) & (cols >= 0) & (cols < self._grid.shape[1])
+
+        values = np.zeros(len(lat), dtype=np.int64)
+        values[on_grid] = self._grid[rows[on_grid], cols[on_grid]]
+        result = np.where(values > 0, values - 1, -1)
+
+        undecided = np.flatnonzero(values == _BOUNDARY)
+        for number in range(len(self.zones) - 1, -1, -1):
+            if undecided.size == 0:
+                break
+
+            inside = np.zeros(undecided.size, dtype=bool)
+            for polygon in self.zones[number].polygons:
+                inside |= _polygon_contains_many(polygon, lon[undecided], lat[undecided])
+            result[undecided[inside]] = number
+            undecided = undecided[~inside]
+
+        return result
+
+    def bounds(self) -> tuple[float, float, float, float]:
+        """Прямоугольник (left, top, right, bottom), накрывающий все зоны."""
+        rows, cols = self._grid.shape
+        return self._lon0, self._lat0 + rows * self._dlat, self._lon0 + cols * self._dlon, self._lat0
+
+    def stats(self) -> dict:
+        rows, cols = self._grid.shape
+        return {
+            "zones": len(self.zones),
+            "grid_cells": rows * cols,
+            "cell_meters": round(self.cell_meters, 1),
+            "boundary_share": round(float(np.count_nonzero(self._grid == _BOUNDARY)) / (rows * cols), 4),
+        }
+
+
+def zones_geojson(rows: Iterable) -> dict:
+    """FeatureCollection из строк `delivery_zones` - для выгрузки и карты в админке."""
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "id": row.id,
+                "geometry": row.geometry,
+                "properties": {
+                    "name": row.name,
+                    "price_per_km": str(row.price_per_km),
+                    "min_price": str(row.min_price),
+                    "priority": row.priority,
+                    "is_active": row.is_active,
+                },
+            }
+            for row in rows
+        ],
+    }
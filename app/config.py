@@ -18,6 +18,28 @@ class Settings(BaseSettings):
 
     SECRET_KEY: str
     ALGORITHM: str
+    AUTH_USER_CACHE_TTL: float = 60.0
+    AUTH_USER_CACHE_SIZE: int = 10000
+    AUTH_TOKEN_CACHE_SIZE: int = 4096
+
+    BACKGROUND_WORKERS_IN_APP: bool = True
+    JOBS_CONCURRENCY: int = 2
+    JOBS_POLL_SECONDS: float = 2.0
+    JOBS_LEASE_SECONDS: float = 300.0
+    JOBS_SCHEDULER_SECONDS: float = 60.0
+
+    RETENTION_INTERVAL_MINUTES: float = 60.0
+    RETENTION_BATCH_SIZE: int = 500
+    RETENTION_MAX_BATCHES: int = 200
+    RETENTION_BATCH_PAUSE_SECONDS: float = 0.2
+    RETENTION_CART_DAYS: int = 90
+    RETENTION_UNVERIFIED_USER_DAYS: int = 7
+    RETENTION_PENDING_ORDER_HOURS: int = 24
+    RETENTION_FINISHED_JOB_DAYS: int = 14
+
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_MEMORY_SIZE: int = 100000
 
     SMTP_HOST: str
     SMTP_PORT: int
@@ -28,6 +50,12 @@ class Settings(BaseSettings):
     SMTP_SSL_TLS: bool = False
     USE_CREDENTIALS: bool = True
     VALIDATE_CERTS: bool = True
+    EMAIL_OUTBOX_BATCH_SIZE: int = 20
+    EMAIL_OUTBOX_POLL_SECONDS: float = 5.0
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = 8
+    EMAIL_OUTBOX_BASE_RETRY_SECONDS: float = 30.0
+    EMAIL_OUTBOX_MAX_RETRY_SECONDS: float = 3600.0
+    EMAIL_SMTP_POOL_SIZE: int = 2
 
     DELIVERY_ORIGIN_NAME: str = "Майкоп"
     DELIVERY_ORIGIN_LAT: float = 44.6078
@@ -35,7 +63,39 @@ class Settings(BaseSettings):
     DELIVERY_MAX_RADIUS_KM: float = 50.0
     DELIVERY_PRICE_PER_KM: Decimal = Decimal("40.00")
     DELIVERY_MIN_PRICE: Decimal = Decimal("400.00")
+    DELIVERY_SETTINGS_REFRESH_SECONDS: float = 60
+    DELIVERY_ZONE_GRID_CELL_METERS: float = 100.0
+    DELIVERY_ZONE_GRID_MAX_CELLS: int = 4_000_000
+    DELIVERY_QUOTE_CACHE_SIZE: int = 10000
+    DELIVERY_QUOTE_CACHE_TTL_SECONDS: float = 120
+    DELIVERY_QUOTE_TOKEN_TTL_SECONDS: int = 15 * 60
+    # "" - цена по прямой, "osrm" - по дорогам через OSRM, "straight_line" - локальная замена для тестов.
+    ROAD_DISTANCE_PROVIDER: str = ""
+    ROAD_DISTANCE_OSRM_URL: str = "https://router.project-osrm.org"
+    ROAD_DISTANCE_DETOUR_FACTOR: float = 1.3
+    ROAD_DISTANCE_CELL_METERS: float = 250.0
+    ROAD_DISTANCE_CACHE_SIZE: int = 20000
+    ROAD_DISTANCE_DB_CACHE_TTL_DAYS: int = 180
+    ROAD_DISTANCE_NO_ROUTE_TTL_SECONDS: int = 3600
+    DELIVERY_TIMEZONE: str = "Europe/Moscow"
+    DELIVERY_VEHICLES: int = 1
+    DELIVERY_VEHICLE_CAPACITY_AREA_M2: float = 30.0
+    DELIVERY_VEHICLE_CAPACITY_WEIGHT_KG: float = 1500.0
+    DELIVERY_COVERAGE_TILE_CACHE_SIZE: int = 2048
+    NESTING_KERF_MM: int = 3
+    NESTING_TIME_LIMIT_MS: int = 500
     GEOCODER_CONTACT_EMAIL: str | None = None
+    GEOCODER_CACHE_SIZE: int = 5000
+    GEOCODER_CACHE_TTL_SECONDS: float = 7 * 24 * 3600
+    GEOCODER_QUERY_CACHE_TTL_SECONDS: float = 3600
+    GEOCODER_SUGGEST_CACHE_SIZE: int = 20000
+    GEOCODER_SUGGEST_CACHE_TTL_SECONDS: float = 24 * 3600
+    GEOCODER_CACHE_STALE_SECONDS: float = 24 * 3600
+    GEOCODER_DB_CACHE_TTL_DAYS: int = 90
+    GEOCODER_MAX_REQUESTS_PER_SECOND: float = 1.0
+    GEOCODER_RESOLVE_MAX_WAIT_SECONDS: float = 8.0
+    GEOCODER_SUGGEST_MAX_WAIT_SECONDS: float = 1.5
+    GEOCODER_GAZETTEER_PATH: str = ""
 
     YOOKASSA_SHOP_ID: str | None = None
     YOOKASSA_SECRET_KEY: str | None = None
@@ -43,6 +103,19 @@ class Settings(BaseSettings):
     YOOKASSA_WEBHOOK_TOKEN: str | None = None
     YOOKASSA_API_BASE_URL: str = "https://api.yookassa.ru/v3"
     YOOKASSA_CURRENCY: str = "RUB"
+    YOOKASSA_SLOW_CALL_SECONDS: float = 8.0
+    YOOKASSA_RETRY_ATTEMPTS: int = 3
+    YOOKASSA_RETRY_BACKOFF_SECONDS: float = 0.5
+    # ЮKassa помнит Idempotence-Key 24 часа; повторно используем его с запасом.
+    YOOKASSA_IDEMPOTENCE_KEY_TTL_HOURS: int = 23
+
+    REQUEST_DEADLINE_SECONDS: float = 30.0
+    GEOCODER_DEADLINE_SECONDS: float = 12.0
+    GEOCODER_SLOW_CALL_SECONDS: float = 5.0
+    CIRCUIT_BREAKER_WINDOW: int = 20
+    CIRCUIT_BREAKER_MIN_CALLS: int = 5
+    CIRCUIT_BREAKER_FAILURE_RATE: float = 0.5
+    CIRCUIT_BREAKER_OPEN_SECONDS: float = 30.0
 
     model_config = SettingsConfigDict(env_file=".env")
 
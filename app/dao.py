@@ -159,4 +159,45 @@ class BaseDAO():
                 await session.commit()
         else:
             await session.execute(update(cls.model).values(is_active=False))
-                
\ No newline at end of file
+
+    @classmethod
+    async def delete_batch(cls, *where, limit: int) -> int:
+        """Удаляет не больше `limit` записей по условиям одной короткой транзакцией.
+
+        Строки, заблокированные другими транзакциями, пропускаются.
+
+        **Результат:**
+            - `Количество удаленных записей`.
+        """
+        ids = (
+            select(cls.model.id)
+            .where(*where)
+            .order_by(cls.model.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        async with new_session() as session:
+            res = await session.execute(delete(cls.model).where(cls.model.id.in_(ids.scalar_subquery())))
+            await session.commit()
+            return res.rowcount
+
+    @classmethod
+    async def update_batch(cls, *where, limit: int, **values) -> int:
+        """Изменяет не больше `limit` записей по условиям одной короткой транзакцией.
+
+        **Результат:**
+            - `Количество измененных записей`.
+        """
+        ids = (
+            select(cls.model.id)
+            .where(*where)
+            .order_by(cls.model.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        async with new_session() as session:
+            res = await session.execute(
+                update(cls.model).where(cls.model.id.in_(ids.scalar_subquery())).values(**values)
+            )
+            await session.commit()
+            return res.rowcount
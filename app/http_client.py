@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import importlib.util
+
+import httpx
+
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class SharedAsyncClient:
+    """Один долгоживущий `httpx.AsyncClient` на процесс с keep-alive соединениями.
+
+    Клиент создается при первом обращении (или в lifespan приложения) и
+    закрывается через `aclose()` при остановке.
+    """
+
+    def __init__(self, **client_kwargs) -> None:
+        self._client_kwargs = client_kwargs
+        self._client: httpx.AsyncClient | None = None
+
+    def get(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(http2=HTTP2_AVAILABLE, **self._client_kwargs)
+
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,225 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func, insert, or_, select, update
+
+from app.dao import BaseDAO
+from app.database import new_session
+from app.jobs.models import PRIORITY_LOW, Job, utc_now
+
+
+class JobsDAO(BaseDAO):
+    model = Job
+
+    @classmethod
+    async def claim(cls, *, lease: timedelta) -> Job | None:
+        """Забирает самую приоритетную готовую задачу, пропуская строки, занятые другими воркерами.
+
+        Задача, воркер которой упал, снова доступна после истечения `locked_until`,
+        пока не исчерпаны попытки; после этого она уходит в `failed`, чтобы задача,
+        роняющая воркер, не забиралась бесконечно.
+
+        **Результат:**
+            - `Задача` со статусом `running`, либо `None`, если очередь пуста.
+        """
+        now = utc_now()
+        abandoned = (
+            update(cls.model)
+            .where(
+                cls.model.status == "running",
+                cls.model.locked_until <= now,
+                cls.model.attempts >= cls.model.max_attempts,
+            )
+            .values(
+                status="failed",
+                locked_until=None,
+                last_error="Lease expired: the worker stopped before the job finished",
+                finished_at=now,
+            )
+        )
+        claimable = (
+            select(cls.model.id)
+            .where(
+                or_(
+                    and_(cls.model.status == "queued", cls.model.run_at <= now),
+                    and_(
+                        cls.model.status == "running",
+                        cls.model.locked_until <= now,
+                        cls.model.attempts < cls.model.max_attempts,
+                    ),
+                )
+            )
+            .order_by(cls.model.priority.desc(), cls.model.run_at, cls.model.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        query = (
+            update(cls.model)
+            .where(cls.model.id == claimable.scalar_subquery())
+            .values(
+                status="running",
+                attempts=cls.model.attempts + 1,
+                locked_until=now + lease,
+                started_at=now,
+            )
+            .returning(cls.model)
+        )
+
+        async with new_session() as session:
+            await session.execute(abandoned)
+            res = await session.execute(query)
+            await session.commit()
+            return res.scalar_one_or_none()
+
+    @classmethod
+    async def extend_lease(cls, job_id: int, *, started_at: datetime, lease: timedelta) -> bool:
+        """Продлевает `locked_until` задачи, если ее все еще выполняет тот же захват.
+
+        **Результат:**
+            - `False`, если задачу уже забрал другой воркер или она завершена.
+        """
+        async with new_session() as session:
+            res = await session.execute(
+                update(cls.model)
+                .where(
+                    cls.model.id == job_id,
+                    cls.model.status == "running",
+                    cls.model.started_at == started_at,
+                )
+                .values(locked_until=utc_now() + lease)
+            )
+            await session.commit()
+            return res.rowcount > 0
+
+    @classmethod
+    async def ensure_scheduled(cls, kind: str, *, every: timedelta) -> None:
+        """Ставит периодическую задачу `kind`, если ее еще нет в очереди.
+
+        Следующий запуск назначается через `every` после завершения предыдущего.
+        Advisory-lock не дает нескольким воркерам поставить задачу дважды.
+        """
+        now = utc_now()
+
+        async with new_session() as session:
+            async with session.begin():
+                await session.execute(select(func.pg_advisory_xact_lock(func.hashtext(kind))))
+
+                pending = await session.execute(
+                    select(cls.model.id)
+                    .where(cls.model.kind == kind, cls.model.status.in_(("queued", "running")))
+                    .limit(1)
+                )
+                if pending.first() is not None:
+                    return
+
+                last_finished_at = await session.scalar(
+                    select(func.max(cls.model.finished_at)).where(cls.model.kind == kind)
+                )
+                run_at = now if last_finished_at is None else max(now, last_finished_at + every)
+
+                await session.execute(
+                    insert(cls.model).values(
+                        kind=kind,
+                        payload={},
+                        priority=PRIORITY_LOW,
+                        status="queued",
+                        attempts=0,
+                        max_attempts=1,
+                        run_at=run_at,
+                        created_at=now,
+                    )
+                )
+
+    @classmethod
+    async def mark_done(cls, job_id: int, *, started_at: datetime) -> bool:
+        """Завершает задачу, если ее все еще держит захват с `started_at`.
+
+        **Результат:**
+            - `False`, если аренду перехватил другой воркер; строка не меняется.
+        """
+        done = await cls.update(
+            {"id": job_id, "status": "running", "started_at": started_at},
+            status="done",
+            locked_until=None,
+            last_error=None,
+            finished_at=utc_now(),
+        )
+        return done is not None
+
+    @classmethod
+    async def mark_failed(cls, job_id: int, *, started_at: datetime, error: str, retry_at: datetime | None) -> bool:
+        """Переносит задачу на `retry_at` или помечает ее `failed`, если `retry_at` не задан.
+
+        Как и `mark_done()`, меняет строку только пока ее держит захват с `started_at`.
+        """
+        if retry_at is None:
+            failed = await cls.update(
+                {"id": job_id, "status": "running", "started_at": started_at},
+                status="failed",
+                locked_until=None,
+                last_error=error[:1000],
+                finished_at=utc_now(),
+            )
+        else:
+            failed = await cls.update(
+                {"id": job_id, "status": "running", "started_at": started_at},
+                status="queued",
+                locked_until=None,
+                last_error=error[:1000],
+                run_at=retry_at,
+            )
+        return failed is not None
+
+    @classmethod
+    async def stats(cls, *, window: timedelta) -> dict:
+        """Глубина очереди по типам задач и задержки задач, завершенных за последние `window`.
+
+        **Результат:**
+            - `Словарь` с ключами `queues` и `latency`.
+        """
+        now = utc_now()
+        since = now - window
+
+        depth_query = (
+            select(
+                cls.model.kind,
+                cls.model.status,
+                func.count(),
+                func.min(cls.model.run_at),
+            )
+            .where(cls.model.status.in_(("queued", "running", "failed")))
+            .group_by(cls.model.kind, cls.model.status)
+        )
+        latency_query = (
+            select(
+                cls.model.kind,
+                func.count(),
+                func.avg(func.extract("epoch", cls.model.started_at - cls.model.run_at)),
+                func.max(func.extract("epoch", cls.model.started_at - cls.model.run_at)),
+                func.avg(func.extract("epoch", cls.model.finished_at - cls.model.started_at)),
+            )
+            .where(cls.model.status == "done", cls.model.finished_at >= since)
+            .group_by(cls.model.kind)
+        )
+
+        async with new_session() as session:
+            depth_rows = (await session.execute(depth_query)).all()
+            latency_rows = (await session.execute(latency_query)).all()
+
+        queues: dict[str, dict] = {}
+        for kind, status, count, oldest_run_at in depth_rows:
+            queue = queues.setdefault(kind, {"queued": 0, "running": 0, "failed": 0, "oldest_queued_seconds": 0.0})
+            queue[status] = count
+            if status == "queued" and oldest_run_at is not None:
+                queue["oldest_queued_seconds"] = max(0.0, (now - oldest_run_at).total_seconds())
+
+        latency = {
+            kind: {
+                "done": count,
+                "avg_wait_seconds": float(avg_wait or 0),
+                "max_wait_seconds": float(max_wait or 0),
+                "avg_run_seconds": float(avg_run or 0),
+            }
+            for kind, count, avg_wait, max_wait, avg_run in latency_rows
+        }
+
+        return {"queues": queues, "latency": latency}
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import asyncio
+import importlib
+import logging
+import random
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable
+
+from app.config import settings
+from app.jobs.dao import JobsDAO
+from app.jobs.models import PRIORITY_NORMAL, utc_now
+
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[dict], Awaitable[None]]
+
+# Модули, в которых объявлены обработчики задач. Импортируются воркером при старте.
+JOB_MODULES = (
+    "app.cart.jobs",
+    "app.mail.jobs",
+    "app.payments.jobs",
+    "app.rate_limit.jobs",
+    "app.users.jobs",
+)
+
+_HANDLERS: dict[str, JobHandler] = {}
+_PERIODIC: dict[str, timedelta] = {}
+
+
+def job_handler(kind: str, *, every: timedelta | None = None) -> Callable[[JobHandler], JobHandler]:
+    """Регистрирует корутину `handler(payload)` как обработчик задач типа `kind`.
+
+    С `every` задача становится периодической: воркер сам ставит ее в очередь.
+    """
+
+    def decorator(handler: JobHandler) -> JobHandler:
+        _HANDLERS[kind] = handler
+        if every is not None:
+            _PERIODIC[kind] = every
+        return handler
+
+    return decorator
+
+
+def load_job_handlers() -> None:
+    for module_name in JOB_MODULES:
+        importlib.import_module(module_name)
+
+
+async def enqueue_job(
+    kind: str,
+    payload: dict | None = None,
+    *,
+    priority: int = PRIORITY_NORMAL,
+    run_at: datetime | None = None,
+    max_attempts: int = 5,
+    session=None,
+) -> None:
+    """Ставит задачу в очередь. С `session` задача сохранится в той же транзакции."""
+    await JobsDAO.add(
+        session=session,
+        kind=kind,
+        payload=payload or {},
+        priority=priority,
+        run_at=run_at or utc_now(),
+        max_attempts=max_attempts,
+    )
+
+
+async def run_in_batches(step: Callable[[int], Awaitable[int]]) -> int:
+    """Вызывает `step(batch_size)`, пока он обрабатывает полные пачки.
+
+    Каждая пачка идет своей короткой транзакцией, между пачками есть пауза,
+    поэтому чистка больших таблиц не держит долгих блокировок.
+
+    **Результат:**
+        - `Сколько всего записей обработано`.
+    """
+    batch_size = settings.RETENTION_BATCH_SIZE
+    total = 0
+
+    for _ in range(settings.RETENTION_MAX_BATCHES):
+        affected = await step(batch_size)
+        total += affected
+        if affected < batch_size:
+            break
+
+        await asyncio.sleep(settings.RETENTION_BATCH_PAUSE_SECONDS)
+
+    return total
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    delay = min(3600.0, 10.0 * 2 ** max(0, attempts - 1))
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+class JobWorker:
+    """Несколько корутин, которые по очереди забирают и выполняют задачи из таблицы `jobs`."""
+
+    def __init__(self) -> None:
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+
+    def start(self, *, concurrency: int | None = None) -> None:
+        if self._tasks:
+            return
+
+        load_job_handlers()
+        for index in range(concurrency or settings.JOBS_CONCURRENCY):
+            self._tasks.append(asyncio.create_task(self._run(), name=f"job-worker-{index}"))
+
+        if _PERIODIC:
+            self._tasks.append(asyncio.create_task(self._schedule(), name="job-scheduler"))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def wake(self) -> None:
+        """Будит воркеры сразу после коммита новой задачи, не дожидаясь опроса."""
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                processed = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Job worker iteration failed")
+                processed = False
+
+            if processed:
+                continue
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.JOBS_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _schedule(self) -> None:
+        while True:
+            for kind, every in _PERIODIC.items():
+                try:
+                    await JobsDAO.ensure_scheduled(kind, every=every)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    logger.exception("Failed to schedule periodic job %s", kind)
+
+            await asyncio.sleep(settings.JOBS_SCHEDULER_SECONDS)
+
+    async def _keep_lease(self, job, lease: timedelta, handler_task: asyncio.Task) -> bool:
+        """Продлевает аренду задачи, пока работает обработчик, чтобы ее не забрал другой воркер.
+
+        Если аренду уже перехватили, отменяет обработчик и возвращает `True`.
+        """
+        while True:
+            await asyncio.sleep(lease.total_seconds() / 3)
+            try:
+                extended = await JobsDAO.extend_lease(job.id, started_at=job.started_at, lease=lease)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Failed to extend lease of job %s", job.id, exc_info=True)
+                continue
+
+            if not extended:
+                logger.warning("Job %s (%s) lost its lease, cancelling its handler", job.id, job.kind)
+                handler_task.cancel()
+                return True
+
+    async def run_once(self) -> bool:
+        """Выполняет одну задачу. Возвращает `False`, если очередь пуста."""
+        lease = timedelta(seconds=settings.JOBS_LEASE_SECONDS)
+        job = await JobsDAO.claim(lease=lease)
+        if job is None:
+            return False
+
+        handler = _HANDLERS.get(job.kind)
+        if handler is None:
+            await JobsDAO.mark_failed(
+                job.id,
+                started_at=job.started_at,
+                error=f"Unknown job kind: {job.kind}",
+                retry_at=None,
+            )
+            return True
+
+        handler_task = asyncio.create_task(handler(job.payload))
+        heartbeat = asyncio.create_task(self._keep_lease(job, lease, handler_task))
+        try:
+            await handler_task
+        except asyncio.CancelledError:
+            # Задачу уже выполняет другой воркер: ни `done`, ни `failed` ей ставить нельзя.
+            if heartbeat.done() and not heartbeat.cancelled() and heartbeat.result():
+                return True
+            raise
+        except Exception as error:
+            retry_at = None
+            if job.attempts < job.max_attempts:
+                retry_at = utc_now() + _retry_delay(job.attempts)
+
+            logger.warning("Job %s (%s) failed: %r", job.id, job.kind, error)
+            await JobsDAO.mark_failed(job.id, started_at=job.started_at, error=repr(error), retry_at=retry_at)
+            return True
+        finally:
+            heartbeat.cancel()
+
+        if not await JobsDAO.mark_done(job.id, started_at=job.started_at):
+            logger.warning("Job %s (%s) finished after losing its lease", job.id, job.kind)
+        return True
+
+
+job_worker = JobWorker()
+
+
+@job_handler("jobs.purge_finished", every=timedelta(minutes=settings.RETENTION_INTERVAL_MINUTES))
+async def purge_finished_jobs(payload: dict) -> None:
+    cutoff = utc_now() - timedelta(days=settings.RETENTION_FINISHED_JOB_DAYS)
+    deleted = await run_in_batches(
+        lambda limit: JobsDAO.delete_batch(
+            JobsDAO.model.status.in_(("done", "failed")),
+            JobsDAO.model.finished_at < cutoff,
+            limit=limit,
+        )
+    )
+    logger.info("Purged %s finished jobs", deleted)
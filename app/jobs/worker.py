@@ -0,0 +1,35 @@
+"""Отдельный процесс для фоновой работы: `python -m app.jobs.worker`.
+
+Запускает обработчики очереди задач и отправку писем из outbox. Если воркер
+вынесен в отдельный контейнер, в приложении стоит выставить
+`BACKGROUND_WORKERS_IN_APP=false`.
+"""
+import asyncio
+import logging
+import signal
+
+from app.database import engine
+from app.jobs.service import job_worker
+from app.mail.service import email_outbox_sender
+
+
+async def main() -> None:
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signal_number, stop_event.set)
+
+    job_worker.start()
+    email_outbox_sender.start()
+
+    try:
+        await stop_event.wait()
+    finally:
+        await job_worker.stop()
+        await email_outbox_sender.stop()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
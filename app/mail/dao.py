@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+
+from app.dao import BaseDAO
+from app.database import new_session
+from app.mail.models import EmailOutbox, utc_now
+
+
+class EmailOutboxDAO(BaseDAO):
+    model = EmailOutbox
+
+    @classmethod
+    async def claim_batch(cls, *, limit: int, lease: timedelta) -> list[EmailOutbox]:
+        """Забирает пачку писем к отправке, не блокируясь на строках других воркеров.
+
+        Забранные письма получают статус `sending` и аренду `lease`: если воркер упадет,
+        по истечении аренды письмо снова станет доступно.
+
+        **Результат:**
+            - `Список писем` в порядке создания.
+        """
+        now = utc_now()
+        claimable = (
+            select(cls.model.id)
+            .where(
+                cls.model.status.in_(("pending", "sending")),
+                cls.model.next_attempt_at <= now,
+            )
+            .order_by(cls.model.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        query = (
+            update(cls.model)
+            .where(cls.model.id.in_(claimable.scalar_subquery()))
+            .values(
+                status="sending",
+                attempts=cls.model.attempts + 1,
+                next_attempt_at=now + lease,
+            )
+            .returning(cls.model)
+        )
+
+        async with new_session() as session:
+            res = await session.execute(query)
+            await session.commit()
+            return sorted(res.scalars().all(), key=lambda message: message.id)
+
+    @classmethod
+    async def mark_sent(cls, ids: list[int]) -> None:
+        if not ids:
+            return
+
+        async with new_session() as session:
+            await session.execute(
+                update(cls.model)
+                .where(cls.model.id.in_(ids))
+                .values(status="sent", sent_at=utc_now(), html_body=None, last_error=None)
+            )
+            await session.commit()
+
+    @classmethod
+    async def mark_failed(cls, message_id: int, *, error: str, retry_at: datetime | None) -> None:
+        """Откладывает письмо до `retry_at` или помечает его `failed`, если `retry_at` не задан."""
+        values = {"last_error": error[:1000]}
+        if retry_at is None:
+            values.update(status="failed", html_body=None)
+        else:
+            values.update(status="pending", next_attempt_at=retry_at)
+
+        async with new_session() as session:
+            await session.execute(update(cls.model).filter_by(id=message_id).values(**values))
+            await session.commit()
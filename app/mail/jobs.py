@@ -0,0 +1,23 @@
+import logging
+from datetime import timedelta
+
+from app.config import settings
+from app.jobs.service import job_handler, run_in_batches
+from app.mail.dao import EmailOutboxDAO
+from app.mail.models import utc_now
+
+
+logger = logging.getLogger(__name__)
+
+
+@job_handler("mail.purge_outbox", every=timedelta(minutes=settings.RETENTION_INTERVAL_MINUTES))
+async def purge_email_outbox(payload: dict) -> None:
+    cutoff = utc_now() - timedelta(days=settings.RETENTION_FINISHED_JOB_DAYS)
+    deleted = await run_in_batches(
+        lambda limit: EmailOutboxDAO.delete_batch(
+            EmailOutboxDAO.model.status.in_(("sent", "failed")),
+            EmailOutboxDAO.model.created_at < cutoff,
+            limit=limit,
+        )
+    )
+    logger.info("Purged %s processed outbox emails", deleted)
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from email.message import EmailMessage
+from pathlib import Path
+from string import Template
+
+import aiosmtplib
+
+from app.config import settings
+from app.mail.dao import EmailOutboxDAO
+from app.mail.models import EmailOutbox, utc_now
+
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = Path(__file__).resolve().parent / "templates"
+VERIFY_EMAIL_SUBJECT = "Подтверждение регистрации Glass Shop"
+
+_TEMPLATES: dict[str, Template] = {}
+_SEND_LEASE = timedelta(minutes=5)
+
+
+def load_templates() -> None:
+    """Читает шаблоны писем с диска один раз, дальше они только подставляются."""
+    _TEMPLATES.clear()
+    for path in TEMPLATES_DIR.glob("*.html"):
+        _TEMPLATES[path.stem] = Template(path.read_text(encoding="utf-8"))
+
+
+def render_template(name: str, **context: str) -> str:
+    if not _TEMPLATES:
+        load_templates()
+
+    return _TEMPLATES[name].substitute(context)
+
+
+async def enqueue_email(*, recipient: str, subject: str, html_body: str, session=None) -> None:
+    """Кладет письмо в outbox. С `session` письмо сохранится в той же транзакции."""
+    await EmailOutboxDAO.add(
+        session=session,
+        recipient=recipient,
+        subject=subject,
+        html_body=html_body,
+    )
+
+
+async def enqueue_verify_email(email_to: str, code: str, session=None) -> None:
+    await enqueue_email(
+        recipient=email_to,
+        subject=VERIFY_EMAIL_SUBJECT,
+        html_body=render_template("verify_email", code=code),
+        session=session,
+    )
+
+
+def _build_message(outbox_message: EmailOutbox) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = settings.SMTP_FROM
+    message["To"] = outbox_message.recipient
+    message["Subject"] = outbox_message.subject
+    message.set_content(outbox_message.html_body or "", subtype="html")
+    return message
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    delay = min(
+        settings.EMAIL_OUTBOX_MAX_RETRY_SECONDS,
+        settings.EMAIL_OUTBOX_BASE_RETRY_SECONDS * 2 ** max(0, attempts - 1),
+    )
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+class SMTPConnectionPool:
+    """Несколько долгоживущих SMTP-соединений, которые переиспользуются между письмами."""
+
+    def __init__(self, *, size: int) -> None:
+        self._idle: asyncio.Queue[aiosmtplib.SMTP] = asyncio.Queue()
+        for _ in range(size):
+            self._idle.put_nowait(self._new_client())
+
+    @staticmethod
+    def _new_client() -> aiosmtplib.SMTP:
+        credentials = {}
+        if settings.USE_CREDENTIALS:
+            credentials = {"username": settings.SMTP_USER, "password": settings.SMTP_PASSWORD}
+
+        return aiosmtplib.SMTP(
+            hostname=settings.SMTP_HOST,
+            port=settings.SMTP_PORT,
+            use_tls=settings.SMTP_SSL_TLS,
+            start_tls=False if settings.SMTP_SSL_TLS else settings.SMTP_STARTTLS,
+            validate_certs=settings.VALIDATE_CERTS,
+            timeout=30,
+            **credentials,
+        )
+
+    @asynccontextmanager
+    async def _acquire(self):
+        client = await self._idle.get()
+        try:
+            yield client
+        finally:
+            self._idle.put_nowait(client)
+
+    async def send(self, message: EmailMessage) -> None:
+        async with self._acquire() as client:
+            if not client.is_connected:
+                await client.connect()
+
+            try:
+                await client.send_message(message)
+            except aiosmtplib.SMTPServerDisconnected:
+                # Сервер закрыл простаивающее соединение: переподключаемся один раз.
+                client.close()
+                await client.connect()
+                await client.send_message(message)
+            except (aiosmtplib.SMTPException, OSError):
+                client.close()
+                raise
+
+    async def close(self) -> None:
+        clients = []
+        while not self._idle.empty():
+            clients.append(self._idle.get_nowait())
+
+        for client in clients:
+            if client.is_connected:
+                try:
+                    await client.quit()
+                except (aiosmtplib.SMTPException, OSError):
+                    client.close()
+            self._idle.put_nowait(client)
+
+
+class EmailOutboxSender:
+    """Фоновая отправка писем из outbox пачками через пул SMTP-соединений."""
+
+    def __init__(self) -> None:
+        self._pool: SMTPConnectionPool | None = None
+        self._task: asyncio.Task | None = None
+        self._wakeup = asyncio.Event()
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+
+        load_templates()
+        self._pool = SMTPConnectionPool(size=settings.EMAIL_SMTP_POOL_SIZE)
+        self._task = asyncio.create_task(self._run(), name="email-outbox-sender")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+        self._task = None
+        await self._pool.close()
+        self._pool = None
+
+    def wake(self) -> None:
+        """Будит отправщика сразу после коммита нового письма, не дожидаясь опроса."""
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                sent = await self.send_pending()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Email outbox iteration failed")
+                sent = 0
+
+            if sent >= settings.EMAIL_OUTBOX_BATCH_SIZE:
+                continue
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.EMAIL_OUTBOX_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def send_pending(self) -> int:
+        """Отправляет одну пачку писем. Возвращает размер пачки."""
+        batch = await EmailOutboxDAO.claim_batch(
+            limit=settings.EMAIL_OUTBOX_BATCH_SIZE,
+            lease=_SEND_LEASE,
+        )
+        if not batch:
+            return 0
+
+        results = await asyncio.gather(
+            *(self._pool.send(_build_message(message)) for message in batch),
+            return_exceptions=True,
+        )
+
+        sent_ids: list[int] = []
+        for message, result in zip(batch, results):
+            if not isinstance(result, BaseException):
+                sent_ids.append(message.id)
+                continue
+
+            permanent = isinstance(result, aiosmtplib.SMTPRecipientsRefused)
+            retry_at = None
+            if not permanent and message.attempts < settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+                retry_at = utc_now() + _retry_delay(message.attempts)
+
+            logger.warning("Email %s to %s failed: %r", message.id, message.recipient, result)
+            await EmailOutboxDAO.mark_failed(message.id, error=repr(result), retry_at=retry_at)
+
+        await EmailOutboxDAO.mark_sent(sent_ids)
+        return len(batch)
+
+
+email_outbox_sender = EmailOutboxSender()
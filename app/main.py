@@ -1,3 +1,5 @@
+import asyncio
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI, HTTPException
@@ -8,19 +10,48 @@ from sqlalchemy import text
 
 from app.admin.router import router as admin_router
 from app.cart.router import router as carts_router
+from app.cart.routing import routing_http_client
+from app.cart.service import geocoder_http_client, load_gazetteer, refresh_delivery_settings
 from app.config import settings
 from app.database import new_session
+from app.jobs.service import job_worker
+from app.mail.service import email_outbox_sender
 from app.payments.router import router as payments_router
+from app.payments.service import yookassa_http_client
 from app.products.router import router as products_router
+from app.resilience import RequestDeadlineMiddleware
 from app.users.router import router as auth_router
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    geocoder_http_client.get()
+    await refresh_delivery_settings()
+    await asyncio.to_thread(load_gazetteer)
+
+    if settings.BACKGROUND_WORKERS_IN_APP:
+        job_worker.start()
+        email_outbox_sender.start()
+
+    try:
+        yield
+    finally:
+        await job_worker.stop()
+        await email_outbox_sender.stop()
+        await geocoder_http_client.aclose()
+        await routing_http_client.aclose()
+        await yookassa_http_client.aclose()
+
+
 app = FastAPI(
     title="GlassShop",
     description="Каталог и заказ стекла с административной панелью и оплатой.",
     version="v1",
+    lifespan=lifespan,
 )
 
+app.add_middleware(RequestDeadlineMiddleware, seconds=settings.REQUEST_DEADLINE_SECONDS)
+
 cors_origins = [
     origin.strip()
     for origin in settings.BACKEND_CORS_ORIGINS.split(",")
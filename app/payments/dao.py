@@ -1,6 +1,44 @@
+from datetime import datetime
+
+from sqlalchemy import select
+
 from app.dao import BaseDAO
+from app.database import new_session
 from app.payments.models import Order
 
 
 class OrdersDAO(BaseDAO):
     model = Order
+
+    @classmethod
+    async def unconfirmed_yookassa_orders(cls, *, user_id: int, since: datetime, limit: int = 5) -> list[Order]:
+        """Недавние заказы пользователя, для которых ЮKassa так и не вернула платеж."""
+        async with new_session() as session:
+            res = await session.execute(
+                select(cls.model)
+                .where(
+                    cls.model.user_id == user_id,
+                    cls.model.provider == "yookassa",
+                    cls.model.status.in_(("pending", "failed")),
+                    cls.model.yookassa_payment_id.is_(None),
+                    cls.model.yookassa_idempotence_key.is_not(None),
+                    cls.model.created_at >= since,
+                )
+                .order_by(cls.model.id.desc())
+                .limit(limit)
+            )
+            return list(res.scalars().all())
+
+    @classmethod
+    async def paid_between(cls, *, start: datetime, end: datetime) -> list[Order]:
+        async with new_session() as session:
+            res = await session.execute(
+                select(cls.model)
+                .where(
+                    cls.model.status == "paid",
+                    cls.model.paid_at >= start,
+                    cls.model.paid_at < end,
+                )
+                .order_by(cls.model.id)
+            )
+            return list(res.scalars().all())
@@ -0,0 +1,70 @@
+import logging
+from datetime import timedelta
+
+from app.cart.dao import CartsDAO, SavedAddressesDAO
+from app.config import settings
+from app.jobs.models import utc_now
+from app.jobs.service import job_handler, run_in_batches
+from app.payments.dao import OrdersDAO
+
+
+logger = logging.getLogger(__name__)
+
+CLEAR_PAID_CART_ITEMS = "payments.clear_paid_cart_items"
+SAVE_DELIVERY_ADDRESS = "payments.save_delivery_address"
+
+
+def _cart_item_ids_from_payload(items_payload: list[dict]) -> list[int]:
+    item_ids: list[int] = []
+
+    for item in items_payload:
+        cart_item_id = item.get("cart_item_id")
+        if isinstance(cart_item_id, int) and cart_item_id > 0:
+            item_ids.append(cart_item_id)
+
+    return item_ids
+
+
+@job_handler(CLEAR_PAID_CART_ITEMS)
+async def clear_paid_cart_items(payload: dict) -> None:
+    order = await OrdersDAO.find_one_or_none(id=payload["order_id"])
+    if not order:
+        return
+
+    cart_item_ids = _cart_item_ids_from_payload(order.items_payload)
+    await CartsDAO.delete_items(user_id=order.user_id, item_ids=cart_item_ids)
+
+
+@job_handler(SAVE_DELIVERY_ADDRESS)
+async def save_delivery_address(payload: dict) -> None:
+    order = await OrdersDAO.find_one_or_none(id=payload["order_id"])
+    # У заказов, оформленных до появления координат в orders, сохранять нечего.
+    if not order or order.delivery_lat is None or order.delivery_lon is None:
+        return
+
+    await SavedAddressesDAO.remember(
+        user_id=order.user_id,
+        address=order.delivery_address,
+        normalized_address=order.delivery_normalized_address or order.delivery_address,
+        lat=order.delivery_lat,
+        lon=order.delivery_lon,
+        distance_km=order.delivery_distance_km,
+        within_radius=order.delivery_within_radius,
+        zone_id=order.delivery_zone_id,
+    )
+
+
+@job_handler("payments.expire_pending_orders", every=timedelta(minutes=settings.RETENTION_INTERVAL_MINUTES))
+async def expire_pending_orders(payload: dict) -> None:
+    now = utc_now()
+    cutoff = now - timedelta(hours=settings.RETENTION_PENDING_ORDER_HOURS)
+    expired = await run_in_batches(
+        lambda limit: OrdersDAO.update_batch(
+            OrdersDAO.model.status == "pending",
+            OrdersDAO.model.created_at < cutoff,
+            limit=limit,
+            status="expired",
+            updated_at=now,
+        )
+    )
+    logger.info("Expired %s stale pending orders", expired)
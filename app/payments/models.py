@@ -1,7 +1,7 @@
 from datetime import datetime, timezone
 from decimal import Decimal
 
-from sqlalchemy import DateTime, ForeignKey, JSON, Numeric, String
+from sqlalchemy import DateTime, Float, ForeignKey, Index, JSON, Numeric, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -14,6 +14,7 @@ def utc_now() -> datetime:
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (Index("ix_orders_status_created_at", "status", "created_at"),)
 
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
@@ -29,8 +30,21 @@ class Order(Base):
 
     delivery_address: Mapped[str] = mapped_column(String(300), nullable=False)
     delivery_normalized_address: Mapped[str | None] = mapped_column(String(300), nullable=True)
+    delivery_lat: Mapped[float | None] = mapped_column(Float, nullable=True)
+    delivery_lon: Mapped[float | None] = mapped_column(Float, nullable=True)
+    delivery_origin_id: Mapped[int | None] = mapped_column(
+        ForeignKey("delivery_origins.id", ondelete="SET NULL"),
+        nullable=True,
+    )
+    delivery_zone_id: Mapped[int | None] = mapped_column(
+        ForeignKey("delivery_zones.id", ondelete="SET NULL"),
+        nullable=True,
+    )
+    delivery_within_radius: Mapped[bool] = mapped_column(nullable=False)
 
     yookassa_payment_id: Mapped[str | None] = mapped_column(String(128), nullable=True, unique=True)
+    # Ключ создания платежа; повторное оформление того же заказа отправляет его снова.
+    yookassa_idempotence_key: Mapped[str | None] = mapped_column(String(64), nullable=True)
     confirmation_url: Mapped[str | None] = mapped_column(String(2048), nullable=True)
 
     items_payload: Mapped[list[dict]] = mapped_column(JSON, nullable=False)
@@ -0,0 +1,336 @@
+"""Раскрой листового стекла: сколько стандартных листов уходит на заказ.
+
+Гильотинная упаковка прямоугольников (каждый рез - от края до края
+свободного куска) с поворотом деталей и шириной реза `kerf_mm`. Свободные
+куски всех открытых листов лежат в массивах numpy, и лучший кусок для детали
+(Best Short Side Fit) выбирается одной векторной операцией. Первый проход -
+детали по убыванию площади; оставшееся до `time_limit_ms` время уходит на
+проходы с другими порядками, из которых берется лучший раскрой.
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from app.payments.models import Order
+from app.products.dao import ProductsDAO
+
+
+@dataclass(frozen=True, slots=True)
+class Piece:
+    order_id: int
+    cart_item_id: int | None
+    # Номер экземпляра позиции с quantity > 1, с единицы.
+    copy_index: int
+    width: int
+    length: int
+
+    @property
+    def area(self) -> int:
+        return self.width * self.length
+
+
+@dataclass(frozen=True, slots=True)
+class Placement:
+    piece: Piece
+    x: int
+    y: int
+    width: int
+    length: int
+    rotated: bool
+
+
+@dataclass(slots=True)
+class Sheet:
+    placements: list[Placement] = field(default_factory=list)
+
+    @property
+    def used_area(self) -> int:
+        return sum(placement.width * placement.length for placement in self.placements)
+
+
+@dataclass(slots=True)
+class NestingResult:
+    sheet_width: int
+    sheet_length: int
+    sheets: list[Sheet]
+    # Детали, которые не помещаются на лист ни в одной ориентации.
+    oversized: list[Piece]
+
+    @property
+    def sheet_area(self) -> int:
+        return self.sheet_width * self.sheet_length
+
+    @property
+    def waste_percent(self) -> float:
+        if not self.sheets:
+            return 0.0
+
+        used = sum(sheet.used_area for sheet in self.sheets)
+        return round(100 * (1 - used / (len(self.sheets) * self.sheet_area)), 2)
+
+    def _score(self) -> tuple[int, int]:
+        # Меньше листов, а при равенстве - свободнее последний лист (его остаток полезнее).
+        return len(self.sheets), self.sheets[-1].used_area if self.sheets else 0
+
+
+class _FreeRects:
+    """Свободные куски всех листов: x, y, ширина, длина, номер листа."""
+
+    def __init__(self, capacity: int) -> None:
+        self.data = np.zeros((capacity, 5), dtype=np.int64)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.size = 0
+
+    def add(self, x: int, y: int, width: int, length: int, sheet: int) -> None:
+        if width <= 0 or length <= 0:
+            return
+
+        if self.size == len(self.data):
+            self.data = np.concatenate((self.data, np.zeros_like(self.data)))
+            self.alive = np.concatenate((self.alive, np.zeros_like(self.alive)))
+
+        self.data[self.size] = (x, y, width, length, sheet)
+        self.alive[self.size] = True
+        self.size += 1
+
+    def best_fit(self, width: int, length: int) -> tuple[int, int]:
+        """Индекс куска с наименьшим коротким остатком и сам остаток; (-1, 0), если не влезает."""
+        free_width = self.data[:self.size, 2]
+        free_length = self.data[:self.size, 3]
+        fits = self.alive[:self.size] & (free_width >= width) & (free_length >= length)
+        if not fits.any():
+            return -1, 0
+
+        short_side = np.minimum(free_width - width, free_length - length)
+        index = int(np.argmin(np.where(fits, short_side, np.iinfo(np.int64).max)))
+        return index, int(short_side[index])
+
+
+def _pack(
+    pieces: list[Piece],
+    *,
+    sheet_width: int,
+    sheet_length: int,
+    kerf: int,
+    allow_rotation: bool,
+) -> list[Sheet]:
+    sheets: list[Sheet] = []
+    free = _FreeRects(capacity=2 * len(pieces) + 8)
+
+    for piece in pieces:
+        orientations = [(piece.width, piece.length, False)]
+        if allow_rotation and piece.width != piece.length:
+            orientations.append((piece.length, piece.width, True))
+
+        best = None
+        for width, length, rotated in orientations:
+            index, short_side = free.best_fit(width, length)
+            if index >= 0 and (best is None or short_side < best[1]):
+                best = (index, short_side, width, length, rotated)
+
+        if best is None:
+            sheets.append(Sheet())
+            free.add(0, 0, sheet_width, sheet_length, len(sheets) - 1)
+            width, length, rotated = next(
+                (width, length, rotated)
+                for width, length, rotated in orientations
+                if width <= sheet_width and length <= sheet_length
+            )
+            index = free.size - 1
+        else:
+            index, _, width, length, rotated = best
+
+        x, y, free_width, free_length, sheet = (int(value) for value in free.data[index])
+        free.alive[index] = False
+        sheets[sheet].placements.append(Placement(piece, x, y, width, length, rotated))
+
+        # Рез идет вдоль короткого остатка, чтобы длинный остаток остался одним куском.
+        rest_width = free_width - width - kerf
+        rest_length = free_length - length - kerf
+        if free_width - width < free_length - length:
+            free.add(x + width + kerf, y, rest_width, length, sheet)
+            free.add(x, y + length + kerf, free_width, rest_length, sheet)
+        else:
+            free.add(x + width + kerf, y, rest_width, free_length, sheet)
+            free.add(x, y + length + kerf, width, rest_length, sheet)
+
+    return sheets
+
+
+def nest_pieces(
+    pieces: list[Piece],
+    *,
+    sheet_width: int,
+    sheet_length: int,
+    kerf_mm: int,
+    allow_rotation: bool = True,
+    time_limit_ms: float,
+    seed: int = 0,
+) -> NestingResult:
+    """Раскраивает детали на листы `sheet_width` x `sheet_length` мм.
+
+    Всегда выполняются проходы с детерминированными порядками (по площади,
+    по длинной стороне, по периметру), дальше до `time_limit_ms` - со
+    случайными перестановками крупных деталей.
+    """
+    deadline = time.monotonic() + time_limit_ms / 1000
+
+    def fits(piece: Piece) -> bool:
+        if piece.width <= sheet_width and piece.length <= sheet_length:
+            return True
+        return allow_rotation and piece.length <= sheet_width and piece.width <= sheet_length
+
+    oversized = [piece for piece in pieces if not fits(piece)]
+    fitting = [piece for piece in pieces if fits(piece)]
+
+    orders = [
+        sorted(fitting, key=lambda piece: (piece.area, max(piece.width, piece.length)), reverse=True),
+        sorted(fitting, key=lambda piece: (max(piece.width, piece.length), piece.area), reverse=True),
+        sorted(fitting, key=lambda piece: (piece.width + piece.length, piece.area), reverse=True),
+    ]
+
+    def run(order: list[Piece]) -> NestingResult:
+        sheets = _pack(
+            order,
+            sheet_width=sheet_width,
+            sheet_length=sheet_length,
+            kerf=kerf_mm,
+            allow_rotation=allow_rotation,
+        )
+        return NestingResult(sheet_width, sheet_length, sheets, oversized)
+
+    best = min((run(order) for order in orders), key=NestingResult._score)
+
+    generator = random.Random(seed)
+    base = orders[0]
+    while len(base) > 1 and time.monotonic() < deadline:
+        # Крупные детали остаются в начале, но соседние по размеру меняются местами.
+        keys = [index + generator.uniform(0, len(base) / 4) for index in range(len(base))]
+        candidate = run([piece for _, piece in sorted(zip(keys, base), key=lambda pair: pair[0])])
+        if candidate._score() < best._score():
+            best = candidate
+
+    return best
+
+
+def order_pieces(orders: list[Order]) -> dict[int, list[Piece]]:
+    """Детали заказов по товарам: каждая позиция повторяется `quantity` раз."""
+    pieces_by_product: dict[int, list[Piece]] = {}
+    for order in orders:
+        for item in order.items_payload:
+            width = item.get("width_mm")
+            length = item.get("length_mm")
+            product_id = item.get("product_id")
+            if not width or not length or product_id is None:
+                continue
+
+            pieces_by_product.setdefault(product_id, []).extend(
+                Piece(order.id, item.get("cart_item_id"), copy_index, width, length)
+                for copy_index in range(1, (item.get("quantity") or 1) + 1)
+            )
+
+    return pieces_by_product
+
+
+def _result_payload(result: NestingResult) -> dict:
+    sheet_area = result.sheet_area
+    return {
+        "sheet_width": result.sheet_width,
+        "sheet_length": result.sheet_length,
+        "sheet_count": len(result.sheets),
+        "waste_percent": result.waste_percent,
+        "sheets": [
+            {
+                "index": index,
+                "used_area_m2": round(sheet.used_area / 1_000_000, 3),
+                "waste_percent": round(100 * (1 - sheet.used_area / sheet_area), 2),
+                "placements": [
+                    {
+                        "order_id": placement.piece.order_id,
+                        "cart_item_id": placement.piece.cart_item_id,
+                        "copy_index": placement.piece.copy_index,
+                        "x": placement.x,
+                        "y": placement.y,
+                        "width": placement.width,
+                        "length": placement.length,
+                        "rotated": placement.rotated,
+                    }
+                    for placement in sheet.placements
+                ],
+            }
+            for index, sheet in enumerate(result.sheets, start=1)
+        ],
+        "oversized": [
+            {
+                "order_id": piece.order_id,
+                "cart_item_id": piece.cart_item_id,
+                "copy_index": piece.copy_index,
+                "width": piece.width,
+                "length": piece.length,
+            }
+            for piece in result.oversized
+        ],
+    }
+
+
+async def plan_order_cuts(
+    orders: list[Order],
+    *,
+    kerf_mm: int,
+    time_limit_ms: float,
+    allow_rotation: bool = True,
+) -> dict:
+    """Раскрой деталей заказов по товарам; лист товара - `max_width` x `max_length`.
+
+    Время `time_limit_ms` делится между товарами пропорционально числу деталей,
+    сам раскрой идет в потоке, чтобы не держать цикл событий.
+    """
+    pieces_by_product = order_pieces(orders)
+    products = await ProductsDAO.find_by_ids(set(pieces_by_product)) if pieces_by_product else []
+    products_by_id = {product.id: product for product in products}
+    total_pieces = sum(len(pieces) for pieces in pieces_by_product.values())
+
+    plans = []
+    skipped = []
+    for product_id, pieces in sorted(pieces_by_product.items()):
+        product = products_by_id.get(product_id)
+        if product is None or not product.max_width or not product.max_length:
+            skipped.append(
+                {
+                    "product_id": product_id,
+                    "product_name": product.name if product else None,
+                    "pieces": len(pieces),
+                    "reason": "Товар удален." if product is None else "У товара не задан размер листа.",
+                }
+            )
+            continue
+
+        result = await asyncio.to_thread(
+            nest_pieces,
+            pieces,
+            sheet_width=product.max_width,
+            sheet_length=product.max_length,
+            kerf_mm=kerf_mm,
+            allow_rotation=allow_rotation,
+            time_limit_ms=time_limit_ms * len(pieces) / total_pieces,
+        )
+        plans.append(
+            {
+                "product_id": product_id,
+                "product_name": product.name,
+                "pieces": len(pieces),
+                **_result_payload(result),
+            }
+        )
+
+    return {
+        "orders": len(orders),
+        "sheet_count": sum(plan["sheet_count"] for plan in plans),
+        "products": plans,
+        "skipped": skipped,
+    }
@@ -1,19 +1,36 @@
 from __future__ import annotations
 
+from datetime import timedelta
 from decimal import Decimal
+from uuid import uuid4
 
 from fastapi import APIRouter, Depends, HTTPException, Request
 
 from app.cart.dao import CartsDAO
-from app.cart.service import GeoPoint, build_delivery_quote, resolve_delivery_address, validate_item_in_cart
+from app.cart.service import (
+    build_delivery_quote,
+    delivery_quote_from_token,
+    read_delivery_quote_token,
+    refresh_delivery_settings,
+    resolve_delivery_address,
+    saved_delivery_point,
+    validate_item_in_cart,
+)
+from app.database import new_session
+from app.jobs.models import PRIORITY_HIGH
+from app.jobs.service import enqueue_job, job_worker
 from app.payments.dao import OrdersDAO
+from app.payments.jobs import CLEAR_PAID_CART_ITEMS, SAVE_DELIVERY_ADDRESS
 from app.payments.schemas import SPaymentOrderOut, SYooKassaCheckoutIn
 from app.payments.service import (
+    YooKassaPaymentRejected,
     create_yookassa_payment,
+    ensure_yookassa_available,
     ensure_yookassa_settings,
     get_yookassa_payment,
     payment_order_message,
     utc_now,
+    yookassa_circuit_open,
 )
 from app.products.dao import ProductsDAO
 from app.users.dependencies import get_current_user
@@ -39,17 +56,6 @@ def _serialize_order(order) -> dict:
     }
 
 
-def _cart_item_ids_from_payload(items_payload: list[dict]) -> list[int]:
-    item_ids: list[int] = []
-
-    for item in items_payload:
-        cart_item_id = item.get("cart_item_id")
-        if isinstance(cart_item_id, int) and cart_item_id > 0:
-            item_ids.append(cart_item_id)
-
-    return item_ids
-
-
 async def _sync_order_from_payment_payload(order, payment_payload: dict) -> None:
     event = payment_payload.get("event")
     payment_object = payment_payload.get("object") if event else payment_payload
@@ -72,34 +78,99 @@ async def _sync_order_from_payment_payload(order, payment_payload: dict) -> None
     elif next_payment_status in {"pending", "waiting_for_capture"}:
         next_status = "pending"
 
-    await OrdersDAO.update(
-        {"id": order.id},
-        status=next_status,
-        payment_status=next_payment_status,
-        provider_payload=payment_payload,
-        paid_at=paid_at,
-        updated_at=utc_now(),
-    )
+    async with new_session() as session:
+        async with session.begin():
+            await OrdersDAO.update(
+                {"id": order.id},
+                session=session,
+                status=next_status,
+                payment_status=next_payment_status,
+                provider_payload=payment_payload,
+                paid_at=paid_at,
+                updated_at=utc_now(),
+            )
+
+            if should_clear_items:
+                await enqueue_job(
+                    CLEAR_PAID_CART_ITEMS,
+                    {"order_id": order.id},
+                    priority=PRIORITY_HIGH,
+                    session=session,
+                )
+                await enqueue_job(SAVE_DELIVERY_ADDRESS, {"order_id": order.id}, session=session)
 
     if should_clear_items:
-        cart_item_ids = _cart_item_ids_from_payload(order.items_payload)
-        await CartsDAO.delete_items(user_id=order.user_id, item_ids=cart_item_ids)
+        job_worker.wake()
+
+
+async def _find_retried_order(*, user_id: int, delivery_quote: dict, items_payload: list[dict]):
+    """Заказ, оплату которого пользователь уже начинал с той же корзиной и доставкой.
+
+    Если прошлая попытка оборвалась таймаутом, платеж в ЮKassa мог быть создан.
+    Тот же заказ с тем же `Idempotence-Key` вернет этот платеж вместо второго.
+    """
+    orders = await OrdersDAO.unconfirmed_yookassa_orders(
+        user_id=user_id,
+        since=utc_now() - timedelta(hours=settings.YOOKASSA_IDEMPOTENCE_KEY_TTL_HOURS),
+    )
+
+    for order in orders:
+        if (
+            order.items_payload == items_payload
+            and order.total_price == delivery_quote["total_price"]
+            and order.delivery_price == delivery_quote["delivery_price"]
+            and order.delivery_address == delivery_quote["address"]
+            and order.delivery_normalized_address == delivery_quote["normalized_address"]
+        ):
+            return order
+
+    return None
+
+
+async def _start_yookassa_payment(order, *, user_id: int) -> dict:
+    """Создает платеж с сохраненным в заказе `Idempotence-Key`; при ошибке помечает заказ `failed`."""
+    try:
+        return await create_yookassa_payment(
+            order_id=order.id,
+            amount=order.total_price,
+            description=f"Заказ #{order.id} на GlassSelling",
+            metadata={
+                "order_id": str(order.id),
+                "user_id": str(user_id),
+            },
+            idempotence_key=order.yookassa_idempotence_key,
+        )
+    except HTTPException as error:
+        # После отказа ключ не переиспользуем, а после сбоя сети платеж мог создаться - ключ нужен.
+        rejected = isinstance(error, YooKassaPaymentRejected)
+        await OrdersDAO.update(
+            {"id": order.id},
+            status="failed",
+            payment_status="failed",
+            **({"yookassa_idempotence_key": None} if rejected else {}),
+            updated_at=utc_now(),
+        )
+        raise
 
 
 @router.post("/yookassa/create", response_model=SPaymentOrderOut)
 async def create_yookassa_checkout(data: SYooKassaCheckoutIn, user=Depends(get_current_user)):
     ensure_yookassa_settings()
+    ensure_yookassa_available()
+    await refresh_delivery_settings()
+
+    quote_claims = None
+    if data.quote_token:
+        quote_claims = read_delivery_quote_token(
+            data.quote_token,
+            user_id=user.id,
+            cart_version=await CartsDAO.cart_version(user_id=user.id),
+        )
 
     items = sorted(await CartsDAO.get_all_by(user_id=user.id), key=lambda item: item.id)
     if not items:
         raise HTTPException(status_code=400, detail="Корзина пуста. Сначала добавьте товары.")
 
-    if (data.lat is None) != (data.lon is None):
-        raise HTTPException(
-            status_code=400,
-            detail="Передайте либо обе координаты адреса, либо не передавайте их вовсе.",
-        )
-
     subtotal = Decimal("0.00")
     items_available = True
     snapshot_items: list[dict] = []
@@ -136,21 +207,24 @@ async def create_yookassa_checkout(data: SYooKassaCheckoutIn, user=Depends(get_c
             detail="В корзине есть недоступные позиции. Исправьте их перед оплатой.",
         )
 
-    if data.lat is not None and data.lon is not None:
-        point = GeoPoint(
-            display_name=(data.normalized_address or data.address).strip(),
-            lat=data.lat,
-            lon=data.lon,
+    # Подписанный расчет из /cart/delivery/quote избавляет от повторного геокодирования:
+    # точку для него сервер нашел сам, координаты от клиента не принимаются.
+    delivery_quote = None
+    if quote_claims is not None:
+        delivery_quote = delivery_quote_from_token(quote_claims, subtotal=subtotal)
+
+    if delivery_quote is None:
+        if data.saved_address_id is not None:
+            point = await saved_delivery_point(user_id=user.id, saved_address_id=data.saved_address_id)
+        else:
+            point = await resolve_delivery_address(data.address)
+
+        delivery_quote = await build_delivery_quote(
+            address=data.address.strip(),
+            point=point,
+            subtotal=subtotal,
+            items_available=items_available,
         )
-    else:
-        point = await resolve_delivery_address(data.address)
-
-    delivery_quote = build_delivery_quote(
-        address=data.address.strip(),
-        point=point,
-        subtotal=subtotal,
-        items_available=items_available,
-    )
 
     if not delivery_quote["can_order"]:
         raise HTTPException(
@@ -159,42 +233,40 @@ async def create_yookassa_checkout(data: SYooKassaCheckoutIn, user=Depends(get_c
         )
 
     timestamp = utc_now()
-    order = await OrdersDAO.add_and_return(
-        user_id=user.id,
-        provider="yookassa",
-        status="pending",
-        payment_status="pending",
-        currency=settings.YOOKASSA_CURRENCY,
-        subtotal_price=delivery_quote["subtotal_price"],
-        delivery_price=delivery_quote["delivery_price"],
-        total_price=delivery_quote["total_price"],
-        delivery_distance_km=delivery_quote["distance_km"],
-        delivery_address=delivery_quote["address"],
-        delivery_normalized_address=delivery_quote["normalized_address"],
-        items_payload=snapshot_items,
-        provider_payload=None,
-        created_at=timestamp,
-        updated_at=timestamp,
-    )
-
-    try:
-        created_payment = await create_yookassa_payment(
-            order_id=order.id,
-            amount=order.total_price,
-            description=f"Заказ #{order.id} на GlassSelling",
-            metadata={
-                "order_id": str(order.id),
-                "user_id": str(user.id),
-            },
-        )
-    except HTTPException:
-        await OrdersDAO.update(
+    order = await _find_retried_order(user_id=user.id, delivery_quote=delivery_quote, items_payload=snapshot_items)
+    if order is not None:
+        order = await OrdersDAO.update(
             {"id": order.id},
-            status="failed",
-            payment_status="failed",
-            updated_at=utc_now(),
+            status="pending",
+            payment_status="pending",
+            updated_at=timestamp,
         )
-        raise
+    else:
+        order = await OrdersDAO.add_and_return(
+            user_id=user.id,
+            provider="yookassa",
+            status="pending",
+            payment_status="pending",
+            currency=settings.YOOKASSA_CURRENCY,
+            subtotal_price=delivery_quote["subtotal_price"],
+            delivery_price=delivery_quote["delivery_price"],
+            total_price=delivery_quote["total_price"],
+            delivery_distance_km=delivery_quote["distance_km"],
+            delivery_address=delivery_quote["address"],
+            delivery_normalized_address=delivery_quote["normalized_address"],
+            delivery_lat=delivery_quote["lat"],
+            delivery_lon=delivery_quote["lon"],
+            delivery_origin_id=delivery_quote["origin_id"],
+            delivery_zone_id=delivery_quote["zone_id"],
+            delivery_within_radius=delivery_quote["within_radius"],
+            yookassa_idempotence_key=str(uuid4()),
+            items_payload=snapshot_items,
+            provider_payload=None,
+            created_at=timestamp,
+            updated_at=timestamp,
+        )
+
+    created_payment = await _start_yookassa_payment(order, user_id=user.id)
 
     confirmation = created_payment.get("confirmation", {})
     order = await OrdersDAO.update(
@@ -254,6 +326,9 @@ async def handle_yookassa_webhook(webhook_token: str, request: Request):
     try:
         payment_payload = await get_yookassa_payment(str(payment_id))
     except HTTPException:
+        # Пока предохранитель ЮKassa открыт, отвечаем ошибкой: ЮKassa повторит уведомление позже.
+        if yookassa_circuit_open():
+            raise
         return {"ok": True}
 
     await _sync_order_from_payment_payload(order, payment_payload)
@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
 
 from pydantic import BaseModel, Field
@@ -6,9 +6,8 @@ from pydantic import BaseModel, Field
 
 class SYooKassaCheckoutIn(BaseModel):
     address: str = Field(..., min_length=5, max_length=300)
-    normalized_address: str | None = Field(default=None, max_length=300)
-    lat: float | None = None
-    lon: float | None = None
+    quote_token: str | None = Field(default=None, max_length=2000)
+    saved_address_id: int | None = Field(default=None, ge=1)
 
 
 class SPaymentOrderOut(BaseModel):
@@ -23,3 +22,94 @@ class SPaymentOrderOut(BaseModel):
     confirmation_url: str | None = None
     paid_at: datetime | None = None
     message: str
+
+
+class SDeliveryRouteStopOut(BaseModel):
+    order_id: int
+    address: str
+    lat: float
+    lon: float
+    area_m2: float
+    weight_kg: float
+    leg_km: float
+
+
+class SDeliveryRouteOut(BaseModel):
+    vehicle: int
+    distance_km: float
+    area_m2: float
+    weight_kg: float
+    stops: list[SDeliveryRouteStopOut]
+    return_km: float
+
+
+class SDeliveryOriginRoutesOut(BaseModel):
+    origin_id: int | None = None
+    origin_name: str
+    routes: list[SDeliveryRouteOut]
+
+
+class SUnassignedOrderOut(BaseModel):
+    order_id: int
+    address: str
+    reason: str
+
+
+class SDeliveryPlanOut(BaseModel):
+    day: date
+    orders: int
+    origins: list[SDeliveryOriginRoutesOut]
+    unassigned: list[SUnassignedOrderOut]
+
+
+class SNestingPlacementOut(BaseModel):
+    order_id: int
+    cart_item_id: int | None = None
+    copy_index: int
+    x: int
+    y: int
+    width: int
+    length: int
+    rotated: bool
+
+
+class SNestingSheetOut(BaseModel):
+    index: int
+    used_area_m2: float
+    waste_percent: float
+    placements: list[SNestingPlacementOut]
+
+
+class SNestingPieceOut(BaseModel):
+    order_id: int
+    cart_item_id: int | None = None
+    copy_index: int
+    width: int
+    length: int
+
+
+class SNestingProductOut(BaseModel):
+    product_id: int
+    product_name: str
+    pieces: int
+    sheet_width: int
+    sheet_length: int
+    sheet_count: int
+    waste_percent: float
+    sheets: list[SNestingSheetOut]
+    oversized: list[SNestingPieceOut]
+
+
+class SNestingSkippedOut(BaseModel):
+    product_id: int
+    product_name: str | None = None
+    pieces: int
+    reason: str
+
+
+class SNestingPlanOut(BaseModel):
+    day: date | None = None
+    orders: int
+    sheet_count: int
+    products: list[SNestingProductOut]
+    skipped: list[SNestingSkippedOut]
@@ -1,17 +1,55 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
+import asyncio
+import logging
+import random
+from datetime import date, datetime, time, timedelta, timezone
 from decimal import Decimal, ROUND_HALF_UP
 from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
-from uuid import uuid4
+from zoneinfo import ZoneInfo
 
 import httpx
 from fastapi import HTTPException
 
 from app.config import settings
+from app.http_client import SharedAsyncClient
+from app.payments.dao import OrdersDAO
+from app.payments.models import Order
+from app.resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded, remaining_timeout
 
 
+logger = logging.getLogger(__name__)
+
 MONEY_PRECISION = Decimal("0.01")
+YOOKASSA_TIMEOUT_SECONDS = 20.0
+
+
+class YooKassaServerError(Exception):
+    """ЮKassa ответила 5xx."""
+
+
+class YooKassaPaymentRejected(HTTPException):
+    """ЮKassa ответила 4xx на создание платежа: с тем же ключом будет тот же отказ."""
+
+
+# Для предохранителя сбой - это сеть, таймауты и 5xx; ответы 4xx говорят о нашем запросе.
+_YOOKASSA_BREAKER = CircuitBreaker(
+    "yookassa",
+    failure_exceptions=(httpx.TransportError, YooKassaServerError),
+    window=settings.CIRCUIT_BREAKER_WINDOW,
+    min_calls=settings.CIRCUIT_BREAKER_MIN_CALLS,
+    failure_rate=settings.CIRCUIT_BREAKER_FAILURE_RATE,
+    slow_call_seconds=settings.YOOKASSA_SLOW_CALL_SECONDS,
+    open_seconds=settings.CIRCUIT_BREAKER_OPEN_SECONDS,
+)
+
+yookassa_http_client = SharedAsyncClient(
+    base_url=settings.YOOKASSA_API_BASE_URL,
+    auth=(settings.YOOKASSA_SHOP_ID or "", settings.YOOKASSA_SECRET_KEY or ""),
+    timeout=httpx.Timeout(YOOKASSA_TIMEOUT_SECONDS, connect=5.0, pool=2.0),
+    limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60.0),
+    headers={"User-Agent": "GlassSelling/1.0 payments", "Accept": "application/json"},
+)
 
 
 def utc_now() -> datetime:
@@ -22,6 +60,14 @@ def money(value: Decimal) -> Decimal:
     return value.quantize(MONEY_PRECISION, rounding=ROUND_HALF_UP)
 
 
+async def paid_orders_for_day(day: date | None) -> tuple[date, list[Order]]:
+    """Заказы, оплаченные за день (по умолчанию сегодня) по `DELIVERY_TIMEZONE`."""
+    delivery_timezone = ZoneInfo(settings.DELIVERY_TIMEZONE)
+    day = day or datetime.now(delivery_timezone).date()
+    start = datetime.combine(day, time.min, tzinfo=delivery_timezone)
+    return day, await OrdersDAO.paid_between(start=start, end=start + timedelta(days=1))
+
+
 def ensure_yookassa_settings() -> None:
     missing = []
 
@@ -44,6 +90,23 @@ def ensure_yookassa_settings() -> None:
         )
 
 
+def _yookassa_unavailable() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="ЮKassa временно недоступна. Попробуйте оплатить заказ через несколько минут.",
+    )
+
+
+def yookassa_circuit_open() -> bool:
+    return _YOOKASSA_BREAKER.is_open()
+
+
+def ensure_yookassa_available() -> None:
+    """Не дает начать оплату, пока предохранитель ЮKassa открыт."""
+    if yookassa_circuit_open():
+        raise _yookassa_unavailable()
+
+
 def build_yookassa_return_url(order_id: int) -> str:
     ensure_yookassa_settings()
     split_result = urlsplit(settings.YOOKASSA_RETURN_URL or "")
@@ -68,19 +131,70 @@ def payment_order_message(status: str, payment_status: str) -> str:
     if status == "canceled" or payment_status == "canceled":
         return "Платеж отменен. Можно вернуться к корзине и создать оплату заново."
 
+    if status == "expired":
+        return "Платеж не был завершен вовремя. Можно вернуться к корзине и создать оплату заново."
+
     if status == "failed":
         return "Не удалось создать или завершить платеж. Проверьте настройки и попробуйте снова."
 
     return "Платеж создан. Завершите оплату в ЮKassa, чтобы подтвердить заказ."
 
 
+def _raise_for_server_error(response: httpx.Response) -> None:
+    if response.is_server_error:
+        raise YooKassaServerError(f"YooKassa responded with {response.status_code}")
+
+
+def _retry_delay(attempt: int) -> float:
+    """Экспоненциальная пауза с полным джиттером, чтобы повторы разных запросов не шли залпом."""
+    return random.uniform(0, settings.YOOKASSA_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+
+
+async def _yookassa_request(method: str, url: str, **kwargs) -> httpx.Response:
+    """Запрос к ЮKassa через общий клиент с повторами на сетевые ошибки, таймауты и 5xx.
+
+    Повторять создание платежа безопасно только с тем же `Idempotence-Key`, его
+    передает вызывающий. Каждая попытка идет через предохранитель, а пауза перед
+    следующей не выходит за бюджет запроса.
+    """
+    attempt = 1
+    while True:
+        try:
+            async with _YOOKASSA_BREAKER.guard():
+                response = await yookassa_http_client.get().request(
+                    method,
+                    url,
+                    timeout=remaining_timeout(YOOKASSA_TIMEOUT_SECONDS),
+                    **kwargs,
+                )
+                _raise_for_server_error(response)
+            return response
+        except (httpx.TransportError, YooKassaServerError) as error:
+            if attempt >= settings.YOOKASSA_RETRY_ATTEMPTS:
+                raise
+
+            delay = _retry_delay(attempt)
+            if remaining_timeout(YOOKASSA_TIMEOUT_SECONDS) <= delay:
+                raise
+            logger.warning("YooKassa %s %s failed (attempt %s): %r", method, url, attempt, error)
+
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
 async def create_yookassa_payment(
     *,
     order_id: int,
     amount: Decimal,
     description: str,
     metadata: dict[str, str],
+    idempotence_key: str,
 ) -> dict:
+    """Создает платеж в ЮKassa.
+
+    `idempotence_key` хранится в заказе: с тем же ключом и телом ЮKassa вернет уже
+    созданный платеж, а не создаст второй.
+    """
     ensure_yookassa_settings()
 
     payload = {
@@ -96,16 +210,13 @@ async def create_yookassa_payment(
         "description": description,
         "metadata": metadata,
     }
-    headers = {"Idempotence-Key": str(uuid4())}
+    headers = {"Idempotence-Key": idempotence_key}
 
     try:
-        async with httpx.AsyncClient(
-            base_url=settings.YOOKASSA_API_BASE_URL,
-            auth=(settings.YOOKASSA_SHOP_ID, settings.YOOKASSA_SECRET_KEY),
-            timeout=20.0,
-        ) as client:
-            response = await client.post("/payments", json=payload, headers=headers)
-    except httpx.HTTPError as error:
+        response = await _yookassa_request("POST", "/payments", json=payload, headers=headers)
+    except CircuitOpenError as error:
+        raise _yookassa_unavailable() from error
+    except (httpx.HTTPError, YooKassaServerError, DeadlineExceeded) as error:
         raise HTTPException(
             status_code=502,
             detail="Не удалось связаться с API ЮKassa. Проверьте сеть и параметры магазина.",
@@ -123,7 +234,7 @@ async def create_yookassa_payment(
             if isinstance(description, str) and description.strip():
                 error_detail = f"ЮKassa: {description.strip()}"
 
-        raise HTTPException(status_code=502, detail=error_detail)
+        raise YooKassaPaymentRejected(status_code=502, detail=error_detail)
 
     created_payment = response.json()
     confirmation_url = created_payment.get("confirmation", {}).get("confirmation_url")
@@ -141,14 +252,15 @@ async def get_yookassa_payment(payment_id: str) -> dict:
     ensure_yookassa_settings()
 
     try:
-        async with httpx.AsyncClient(
-            base_url=settings.YOOKASSA_API_BASE_URL,
-            auth=(settings.YOOKASSA_SHOP_ID, settings.YOOKASSA_SECRET_KEY),
-            timeout=20.0,
-        ) as client:
-            response = await client.get(f"/payments/{payment_id}")
-            response.raise_for_status()
-    except httpx.HTTPError as error:
+        response = await _yookassa_request("GET", f"/payments/{payment_id}")
+        response.raise_for_status()
+    except CircuitOpenError as error:
+        # Статус платежа потом придет вебхуком или обновится при следующем запросе.
+        raise HTTPException(
+            status_code=503,
+            detail="ЮKassa временно недоступна, статус платежа обновится позже.",
+        ) from error
+    except (httpx.HTTPError, YooKassaServerError, DeadlineExceeded) as error:
         raise HTTPException(
             status_code=502,
             detail="Не удалось получить статус платежа из ЮKassa.",
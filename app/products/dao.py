@@ -1,10 +1,25 @@
+from sqlalchemy import select
+
 from app.dao import BaseDAO
+from app.database import new_session
 from app.products.models import EdgeProcessingPrice, FacetPrice, Product, Product_Category, TemperingPrice
 
 
 class ProductsDAO(BaseDAO):
     model = Product
 
+    @classmethod
+    async def thickness_by_ids(cls, ids: set[int]) -> dict[int, int | None]:
+        async with new_session() as session:
+            res = await session.execute(select(cls.model.id, cls.model.thickness_mm).where(cls.model.id.in_(ids)))
+            return dict(res.all())
+
+    @classmethod
+    async def find_by_ids(cls, ids: set[int]) -> list[Product]:
+        async with new_session() as session:
+            res = await session.execute(select(cls.model).where(cls.model.id.in_(ids)))
+            return list(res.scalars().all())
+
 
 class CategoriesDAO(BaseDAO):
     model = Product_Category
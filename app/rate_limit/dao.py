@@ -0,0 +1,61 @@
+from datetime import datetime
+
+from sqlalchemy import case, delete, func, literal, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.dao import BaseDAO
+from app.database import new_session
+from app.rate_limit.models import RateLimitBucket
+
+
+class RateLimitBucketsDAO(BaseDAO):
+    model = RateLimitBucket
+
+    @classmethod
+    async def take_token(cls, *, key: str, capacity: float, refill_rate: float) -> tuple[bool, float]:
+        """Атомарно пополняет ведро по прошедшему времени и забирает из него 1 токен.
+
+        **Результат:**
+            - `(allowed, tokens)`: разрешен ли запрос и сколько токенов осталось.
+        """
+        table = cls.model.__table__
+        elapsed = func.extract("epoch", func.now() - table.c.updated_at)
+        available = func.least(literal(capacity), table.c.tokens + elapsed * refill_rate)
+
+        query = (
+            insert(table)
+            .values(key=key, tokens=capacity - 1, allowed=True, updated_at=func.now())
+            .on_conflict_do_update(
+                index_elements=[table.c.key],
+                set_={
+                    "tokens": case((available >= 1, available - 1), else_=available),
+                    "allowed": available >= 1,
+                    "updated_at": func.now(),
+                },
+            )
+            .returning(table.c.allowed, table.c.tokens)
+        )
+
+        async with new_session() as session:
+            res = await session.execute(query)
+            await session.commit()
+            allowed, tokens = res.one()
+
+        return allowed, tokens
+
+    @classmethod
+    async def delete_stale(cls, *, updated_before: datetime, limit: int) -> int:
+        """Удаляет не больше `limit` ведер, которые не трогали с `updated_before`.
+
+        Такие ведра давно заполнены целиком, их удаление ничего не меняет в лимитах.
+        """
+        keys = (
+            select(cls.model.key)
+            .where(cls.model.updated_at < updated_before)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        async with new_session() as session:
+            res = await session.execute(delete(cls.model).where(cls.model.key.in_(keys.scalar_subquery())))
+            await session.commit()
+            return res.rowcount
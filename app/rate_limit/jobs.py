@@ -0,0 +1,22 @@
+import logging
+from datetime import timedelta
+
+from app.config import settings
+from app.jobs.models import utc_now
+from app.jobs.service import job_handler, run_in_batches
+from app.rate_limit.dao import RateLimitBucketsDAO
+
+
+logger = logging.getLogger(__name__)
+
+
+@job_handler("rate_limit.purge_buckets", every=timedelta(minutes=settings.RETENTION_INTERVAL_MINUTES))
+async def purge_rate_limit_buckets(payload: dict) -> None:
+    if settings.RATE_LIMIT_BACKEND != "postgres":
+        return
+
+    cutoff = utc_now() - timedelta(days=1)
+    deleted = await run_in_batches(
+        lambda limit: RateLimitBucketsDAO.delete_stale(updated_before=cutoff, limit=limit)
+    )
+    logger.info("Purged %s stale rate limit buckets", deleted)
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from dataclasses import dataclass
+from typing import Protocol
+
+from fastapi import HTTPException, Request
+
+from app.cache import TTLCache
+from app.config import settings
+from app.rate_limit.dao import RateLimitBucketsDAO
+
+
+@dataclass(frozen=True, slots=True)
+class RateLimit:
+    """Token bucket: не больше `capacity` запросов подряд, пополнение за `period_seconds`."""
+
+    name: str
+    capacity: int
+    period_seconds: float
+
+    @property
+    def refill_rate(self) -> float:
+        return self.capacity / self.period_seconds
+
+
+class RateLimitBackend(Protocol):
+    async def take(self, key: str, limit: RateLimit) -> float:
+        """Забирает токен из ведра. Возвращает 0, если запрос разрешен, иначе сколько секунд ждать."""
+        ...
+
+
+class MemoryRateLimitBackend:
+    """Ведра в памяти процесса. Лимит действует на каждый воркер отдельно."""
+
+    def __init__(self, *, maxsize: int) -> None:
+        self._buckets: TTLCache[str, tuple[float, float]] = TTLCache(maxsize=maxsize, ttl=3600)
+
+    async def take(self, key: str, limit: RateLimit) -> float:
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (float(limit.capacity), now))
+        tokens = min(float(limit.capacity), tokens + (now - updated_at) * limit.refill_rate)
+
+        if tokens >= 1:
+            tokens -= 1
+            retry_after = 0.0
+        else:
+            retry_after = (1 - tokens) / limit.refill_rate
+
+        # За period_seconds ведро заполняется целиком, дальше хранить его незачем.
+        self._buckets.set(key, (tokens, now), ttl=limit.period_seconds)
+        return retry_after
+
+
+class PostgresRateLimitBackend:
+    """Ведра в таблице `rate_limit_buckets`: лимит общий для всех воркеров."""
+
+    async def take(self, key: str, limit: RateLimit) -> float:
+        allowed, tokens = await RateLimitBucketsDAO.take_token(
+            key=key,
+            capacity=float(limit.capacity),
+            refill_rate=limit.refill_rate,
+        )
+        if allowed:
+            return 0.0
+
+        return (1 - tokens) / limit.refill_rate
+
+
+def _build_backend() -> RateLimitBackend:
+    if settings.RATE_LIMIT_BACKEND == "postgres":
+        return PostgresRateLimitBackend()
+
+    return MemoryRateLimitBackend(maxsize=settings.RATE_LIMIT_MEMORY_SIZE)
+
+
+rate_limit_backend: RateLimitBackend = _build_backend()
+
+
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+async def enforce_rate_limits(*checks: tuple[RateLimit, str]) -> None:
+    """Проверяет лимиты по порядку и бросает HTTPException(429) на первом превышенном.
+
+    Вызывается в начале обработчика, до обращений к БД, bcrypt и внешним сервисам.
+    """
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+
+    for limit, key in checks:
+        retry_after = await rate_limit_backend.take(f"{limit.name}:{key}", limit)
+
+        if retry_after > 0:
+            raise HTTPException(
+                status_code=429,
+                detail="Слишком много запросов. Попробуйте немного позже.",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+
+
+class UpstreamGovernor:
+    """Общий token bucket на вызовы внешнего сервиса с очередью по приоритетам.
+
+    Токены берутся из `rate_limit_backend`, поэтому с `RATE_LIMIT_BACKEND=postgres`
+    бюджет делится между всеми воркерами. Внутри процесса токен первым получает
+    самый приоритетный ожидающий. Если дождаться токена за `max_wait` нельзя,
+    запрос сразу получает 503.
+    """
+
+    def __init__(self, limit: RateLimit, *, unavailable_detail: str) -> None:
+        self.limit = limit
+        self.unavailable_detail = unavailable_detail
+        self._waiters: list[tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._changed = asyncio.Condition()
+
+        self.granted = 0
+        self.rejected = 0
+
+    def _reject(self, retry_after: float) -> HTTPException:
+        self.rejected += 1
+        return HTTPException(
+            status_code=503,
+            detail=self.unavailable_detail,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+    async def acquire(self, *, priority: int, max_wait: float) -> None:
+        deadline = time.monotonic() + max_wait
+        entry = (-priority, next(self._sequence))
+
+        ahead = sum(1 for waiter in self._waiters if waiter < entry)
+        expected_wait = ahead / self.limit.refill_rate
+        if expected_wait > max_wait:
+            raise self._reject(expected_wait)
+
+        heapq.heappush(self._waiters, entry)
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+
+                if self._waiters[0] != entry:
+                    if remaining <= 0:
+                        raise self._reject(1 / self.limit.refill_rate)
+
+                    async with self._changed:
+                        try:
+                            await asyncio.wait_for(self._changed.wait(), timeout=remaining)
+                        except asyncio.TimeoutError:
+                            pass
+                    continue
+
+                retry_after = await rate_limit_backend.take(self.limit.name, self.limit)
+                if retry_after == 0:
+                    self.granted += 1
+                    return
+
+                if retry_after > remaining:
+                    raise self._reject(retry_after)
+
+                await asyncio.sleep(retry_after)
+        finally:
+            self._waiters.remove(entry)
+            heapq.heapify(self._waiters)
+            async with self._changed:
+                self._changed.notify_all()
+
+    def stats(self) -> dict:
+        return {"waiting": len(self._waiters), "granted": self.granted, "rejected": self.rejected}
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+
+
+class CircuitOpenError(Exception):
+    """Вызов не выполнен: внешний сервис считается недоступным."""
+
+
+class DeadlineExceeded(Exception):
+    """Бюджет времени запроса исчерпан раньше, чем дошло до вызова."""
+
+
+_DEADLINE: ContextVar[float | None] = ContextVar("request_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: float):
+    """Ограничивает время всего, что выполняется внутри блока.
+
+    Вложенный бюджет не может быть больше внешнего: берется ближайший из сроков.
+    """
+    new_deadline = time.monotonic() + seconds
+    current = _DEADLINE.get()
+    if current is not None:
+        new_deadline = min(current, new_deadline)
+
+    token = _DEADLINE.set(new_deadline)
+    try:
+        yield
+    finally:
+        _DEADLINE.reset(token)
+
+
+def remaining_timeout(default: float) -> float:
+    """Таймаут для очередного вызова: `default`, но не дольше остатка бюджета запроса."""
+    current = _DEADLINE.get()
+    if current is None:
+        return default
+
+    remaining = current - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceeded()
+
+    return min(default, remaining)
+
+
+class RequestDeadlineMiddleware:
+    """ASGI-middleware, которое выдает каждому HTTP-запросу общий бюджет времени."""
+
+    def __init__(self, app, *, seconds: float) -> None:
+        self.app = app
+        self.seconds = seconds
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with deadline(self.seconds):
+            await self.app(scope, receive, send)
+
+
+class CircuitBreaker:
+    """Предохранитель на вызовы одного внешнего сервиса.
+
+    Считает исходы последних `window` вызовов; медленный вызов (дольше
+    `slow_call_seconds`) считается неудачным. Когда доля неудач достигает
+    `failure_rate`, предохранитель открывается на `open_seconds` и вызовы сразу
+    получают `CircuitOpenError`. Затем пропускается `half_open_calls` пробных
+    вызовов: успех закрывает предохранитель, неудача открывает снова.
+
+    Состояние живет в памяти процесса, у каждого воркера свое.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        failure_exceptions: tuple[type[BaseException], ...],
+        window: int,
+        min_calls: int,
+        failure_rate: float,
+        slow_call_seconds: float,
+        open_seconds: float,
+        half_open_calls: int = 1,
+    ) -> None:
+        self.name = name
+        self.failure_exceptions = failure_exceptions
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._state = "closed"
+        self._opened_until = 0.0
+        self._probes = 0
+        # Номер текущего полуоткрытого периода: пробы прошлых периодов на него не влияют.
+        self._half_open_period = 0
+
+        self.rejected = 0
+        self.times_opened = 0
+        BREAKERS[name] = self
+
+    @property
+    def state(self) -> str:
+        if self._state == "open" and time.monotonic() >= self._opened_until:
+            self._state = "half_open"
+            self._probes = 0
+            self._half_open_period += 1
+
+        return self._state
+
+    def is_open(self) -> bool:
+        """Открыт ли предохранитель. Проверка ничего не меняет, в отличие от `guard()`."""
+        state = self.state
+        return state == "open" or (state == "half_open" and self._probes >= self.half_open_calls)
+
+    def _before_call(self) -> int | None:
+        """Пускает вызов. Возвращает номер полуоткрытого периода, если вызов пущен пробным."""
+        if self.is_open():
+            self.rejected += 1
+            raise CircuitOpenError(self.name)
+
+        if self._state == "half_open":
+            self._probes += 1
+            return self._half_open_period
+
+        return None
+
+    def _is_current_probe(self, probe: int | None) -> bool:
+        return probe is not None and self._state == "half_open" and probe == self._half_open_period
+
+    def _open(self) -> None:
+        self._state = "open"
+        self._opened_until = time.monotonic() + self.open_seconds
+        self._outcomes.clear()
+        self.times_opened += 1
+
+    def _record(self, ok: bool, probe: int | None) -> None:
+        if self._is_current_probe(probe):
+            self._probes -= 1
+            if ok:
+                self._state = "closed"
+                self._outcomes.clear()
+            else:
+                self._open()
+            return
+
+        # Исход засчитывается только в том состоянии, в котором вызов был пущен:
+        # вызов из закрытого состояния, завершившийся после открытия, и запоздавшая
+        # проба прошлого периода состояние не меняют.
+        if probe is not None or self._state != "closed":
+            return
+
+        self._outcomes.append(ok)
+        if len(self._outcomes) < self.min_calls:
+            return
+
+        failures = self._outcomes.count(False)
+        if failures / len(self._outcomes) >= self.failure_rate:
+            self._open()
+
+    def _release(self, probe: int | None) -> None:
+        if self._is_current_probe(probe):
+            self._probes -= 1
+
+    @asynccontextmanager
+    async def guard(self):
+        """Оборачивает один вызов сервиса. Бросает `CircuitOpenError`, если предохранитель открыт.
+
+        Исключения из `failure_exceptions` засчитываются как неудача, остальные
+        (отмена, ошибки нашего кода) не влияют на статистику.
+        """
+        probe = self._before_call()
+        started_at = time.monotonic()
+
+        try:
+            yield
+        except self.failure_exceptions:
+            self._record(False, probe)
+            raise
+        except BaseException:
+            self._release(probe)
+            raise
+
+        self._record(time.monotonic() - started_at <= self.slow_call_seconds, probe)
+
+    def stats(self) -> dict:
+        outcomes = len(self._outcomes)
+        return {
+            "state": self.state,
+            "window_calls": outcomes,
+            "window_failure_rate": round(self._outcomes.count(False) / outcomes, 3) if outcomes else 0.0,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+        }
+
+
+BREAKERS: dict[str, CircuitBreaker] = {}
+
+
+def circuit_breaker_stats() -> dict:
+    return {name: breaker.stats() for name, breaker in BREAKERS.items()}
@@ -1,10 +1,11 @@
 import string
 import secrets
+import time
 from datetime import datetime, timedelta, timezone
 from passlib.context import CryptContext
 from jose import jwt
-from fastapi_mail import ConnectionConfig, FastMail, MessageSchema, MessageType
 
+from app.cache import TTLCache
 from app.config import settings
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -14,6 +15,15 @@ REFRESH_TOKEN_EXPIRE = 30
 SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = settings.ALGORITHM
 
+# Из access-токена авторизации нужны только эти claims, права берутся из `UserState`.
+_ACCESS_TOKEN_CLAIMS = ("sub", "type", "token_version", "exp")
+
+# Уже проверенные access-токены: повторный запрос с тем же cookie не платит за проверку подписи.
+_VERIFIED_ACCESS_TOKENS: TTLCache[str, dict] = TTLCache(
+    maxsize=settings.AUTH_TOKEN_CACHE_SIZE,
+    ttl=ACCESS_TOKEN_EXPIRE * 60,
+)
+
 
 def auth_cookie_kwargs(*, max_age: int) -> dict:
     return {
@@ -42,6 +52,32 @@ def create_access_token(data: dict) -> str:
     return encoded_jwt
 
 
+def access_token_claims(user) -> dict:
+    return {
+        "sub": str(user.id),
+        "token_version": user.token_version,
+    }
+
+
+def decode_access_token(token: str) -> dict:
+    """Проверяет access JWT и возвращает нужные для авторизации claims.
+
+    Бросает `JWTError`/`ExpiredSignatureError`, как и `jwt.decode`.
+    """
+    claims = _VERIFIED_ACCESS_TOKENS.get(token)
+    if claims is not None:
+        return claims
+
+    payload = jwt.decode(token=token, key=SECRET_KEY, algorithms=[ALGORITHM])
+    claims = {key: payload[key] for key in _ACCESS_TOKEN_CLAIMS if key in payload}
+
+    expires_in = float(claims.get("exp", 0)) - time.time()
+    if expires_in > 0:
+        _VERIFIED_ACCESS_TOKENS.set(token, claims, ttl=expires_in)
+
+    return claims
+
+
 def create_refresh_token(data: dict) -> str:
     expire = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE)
     to_encode = data.copy()
@@ -50,10 +86,10 @@ def create_refresh_token(data: dict) -> str:
     return encoded_jwt
 
 
-def set_cookies(response, user_id: int) -> None:
+def set_cookies(response, user) -> None:
     """Функция установки access и refresh token\'а"""
-    access_token = create_access_token({"sub": str(user_id)})
-    refresh_token = create_refresh_token({"sub": str(user_id)})
+    access_token = create_access_token(access_token_claims(user))
+    refresh_token = create_refresh_token({"sub": str(user.id)})
 
     response.set_cookie(
         key="access",
@@ -81,82 +117,3 @@ def clear_auth_cookies(response) -> None:
 
 def generate_code():
     return "".join(secrets.choice(string.digits) for _ in range(6))
-
-conf = ConnectionConfig(
-    MAIL_SERVER=settings.SMTP_HOST,
-    MAIL_PORT=settings.SMTP_PORT,
-    MAIL_USERNAME=settings.SMTP_USER,
-    MAIL_PASSWORD=settings.SMTP_PASSWORD,
-    MAIL_FROM=settings.SMTP_FROM,
-    MAIL_STARTTLS=settings.SMTP_STARTTLS,
-    MAIL_SSL_TLS=settings.SMTP_SSL_TLS,
-    USE_CREDENTIALS=settings.USE_CREDENTIALS,
-    VALIDATE_CERTS=settings.VALIDATE_CERTS
-)
-
-async def send_verify_email(email_to: str, code: str) -> None:
-    """Функция отправки письма"""
-
-    html = f"""
-    <div style="
-        font-family: Arial, sans-serif;
-        background-color: #f5f7fa;
-        padding: 30px;
-    ">
-        <div style="
-            max-width: 420px;
-            margin: 0 auto;
-            background-color: #ffffff;
-            border-radius: 12px;
-            padding: 30px;
-            text-align: center;
-            box-shadow: 0 8px 24px rgba(0,0,0,0.08);
-        ">
-            <h1 style="
-                margin-top: 0;
-                color: #222;
-                font-size: 24px;
-            ">
-                Добро пожаловать в <span style="color:#4a90e2;">Glass Shop</span> 👋
-            </h1>
-
-            <p style="
-                color: #555;
-                font-size: 16px;
-                margin-bottom: 25px;
-            ">
-                Используйте код ниже для подтверждения:
-            </p>
-
-            <div style="
-                font-size: 28px;
-                font-weight: bold;
-                letter-spacing: 6px;
-                color: #4a90e2;
-                margin-bottom: 25px;
-            ">
-                {code}
-            </div>
-
-            <p style="
-                color: #888;
-                font-size: 14px;
-                margin-bottom: 0;
-            ">
-                Код действует <b>10 минут</b>.<br>
-                Если вы не запрашивали код — просто проигнорируйте это письмо.
-            </p>
-        </div>
-    </div>
-    """
-        
-    message = MessageSchema(
-        subject="Подтверждение регистрации Glass Shop",
-        recipients=[email_to],
-        body=html,
-        subtype=MessageType.html
-    )
-
-    fm = FastMail(conf)
-
-    await fm.send_message(message)
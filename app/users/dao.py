@@ -1,6 +1,28 @@
 from app.dao import BaseDAO
 from app.users.models import User
+from app.users.service import invalidate_user_state
+
+
+# Поля, от которых зависят права: при их изменении выданные access-токены отзываются.
+_TOKEN_CLAIM_FIELDS = frozenset({"is_admin", "is_active", "is_verified"})
 
 
 class UserDAO(BaseDAO):
-    model = User
\ No newline at end of file
+    model = User
+
+    @classmethod
+    async def update(cls, filter_by: dict, session=None, **values):
+        """Изменяет пользователя и сбрасывает его закэшированное состояние.
+
+        Если меняются права пользователя, увеличивает `token_version`,
+        чтобы выданные ранее токены перестали приниматься.
+        """
+        if _TOKEN_CLAIM_FIELDS & values.keys() and "token_version" not in values:
+            values["token_version"] = cls.model.token_version + 1
+
+        user = await super().update(filter_by, session=session, **values)
+
+        if user is not None:
+            invalidate_user_state(user.id)
+
+        return user
@@ -1,13 +1,26 @@
 from fastapi import HTTPException, Request
-from jose import jwt, JWTError, ExpiredSignatureError
+from jose import JWTError, ExpiredSignatureError
 
-from app.security import ALGORITHM, SECRET_KEY
+from app.security import decode_access_token
 from app.users.dao import UserDAO
+from app.users.service import UserState, cache_user_state, get_cached_user_state, invalidate_user_state
 
 
-async def get_current_user(request: Request):
+async def _load_user_state(user_id: int) -> UserState:
+    db_user = await UserDAO.find_one_or_none(id=user_id)
+    if not db_user:
+        raise HTTPException(status_code=401, detail="Не авторизован")
+
+    return cache_user_state(db_user)
+
+
+async def get_current_user(request: Request) -> UserState:
     """Dependency: возвращает текущего авторизованного пользователя по access JWT из cookies.
     Бросает HTTPException(401), если пользователь не авторизован.
+
+    Состояние пользователя берется из кэша процесса; в БД идем только при промахе.
+    Токен, выпущенный до смены прав (другой `token_version`), считается истекшим.
+    Если токен новее кэша, права сменились в другом воркере: состояние перечитывается из БД.
     """
     token = request.cookies.get("access")
 
@@ -15,18 +28,35 @@ async def get_current_user(request: Request):
         raise HTTPException(status_code=401, detail="Не авторизован")
     
     try:
-        payload = jwt.decode(token=token, key=SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_access_token(token)
     except ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Токен истек")
     except JWTError:
         raise HTTPException(status_code=401, detail="Не авторизован")
 
+    if payload.get("type") != "access":
+        raise HTTPException(status_code=401, detail="Не авторизован")
+
     id = payload.get("sub")
     if not id:
         raise HTTPException(status_code=401, detail="Не авторизован")
-    
-    user = await UserDAO.find_one_or_none(id=int(id))
-    if not user: 
+
+    try:
+        user_id = int(id)
+    except (ValueError, TypeError):
         raise HTTPException(status_code=401, detail="Не авторизован")
+
+    user = get_cached_user_state(user_id)
+    if user is None:
+        user = await _load_user_state(user_id)
+
+    token_version = payload.get("token_version", 0)
+    if token_version > user.token_version:
+        # UserDAO.update сбрасывает кэш только в своем воркере, здесь он мог устареть.
+        invalidate_user_state(user_id)
+        user = await _load_user_state(user_id)
+
+    if token_version != user.token_version:
+        raise HTTPException(status_code=401, detail="Токен истек")
     
-    return user
\ No newline at end of file
+    return user
@@ -0,0 +1,30 @@
+import logging
+from datetime import timedelta
+
+from sqlalchemy import exists, or_
+
+from app.cart.models import Cart
+from app.config import settings
+from app.jobs.models import utc_now
+from app.jobs.service import job_handler, run_in_batches
+from app.payments.models import Order
+from app.users.dao import UserDAO
+from app.users.models import User
+
+
+logger = logging.getLogger(__name__)
+
+
+@job_handler("users.purge_unverified", every=timedelta(minutes=settings.RETENTION_INTERVAL_MINUTES))
+async def purge_unverified_users(payload: dict) -> None:
+    cutoff = utc_now() - timedelta(days=settings.RETENTION_UNVERIFIED_USER_DAYS)
+    deleted = await run_in_batches(
+        lambda limit: UserDAO.delete_batch(
+            User.is_verified.is_(False),
+            or_(User.verify_code_sent_at.is_(None), User.verify_code_sent_at < cutoff),
+            ~exists().where(Cart.user_id == User.id),
+            ~exists().where(Order.user_id == User.id),
+            limit=limit,
+        )
+    )
+    logger.info("Purged %s unverified users", deleted)
@@ -15,4 +15,5 @@ class User(Base):
     verify_code_hash: Mapped[str | None] = mapped_column(nullable=True)
     verify_code_expires_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     verify_code_sent_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
-    attempts: Mapped[int] = mapped_column(default=0)
\ No newline at end of file
+    attempts: Mapped[int] = mapped_column(default=0)
+    token_version: Mapped[int] = mapped_column(default=0, server_default="0")
\ No newline at end of file
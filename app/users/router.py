@@ -1,18 +1,21 @@
 from datetime import datetime, timedelta, timezone
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from jose import ExpiredSignatureError, JWTError, jwt
 
+from app.database import new_session
+from app.mail.service import email_outbox_sender, enqueue_verify_email
+from app.rate_limit.service import RateLimit, client_ip, enforce_rate_limits
 from app.security import (
     ACCESS_TOKEN_EXPIRE,
     ALGORITHM,
     SECRET_KEY,
+    access_token_claims,
     auth_cookie_kwargs,
     clear_auth_cookies,
     create_access_token,
     generate_code,
     hash_password,
-    send_verify_email,
     set_cookies,
     verify_password,
 )
@@ -23,9 +26,21 @@ from app.users.schemas import SResendVerifyCode, SUserAuth, SUserConfirmEmail, S
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
+LOGIN_IP_LIMIT = RateLimit("auth:login:ip", capacity=20, period_seconds=60)
+LOGIN_EMAIL_LIMIT = RateLimit("auth:login:email", capacity=5, period_seconds=60)
+REGISTRATION_IP_LIMIT = RateLimit("auth:registration:ip", capacity=5, period_seconds=600)
+REGISTRATION_EMAIL_LIMIT = RateLimit("auth:registration:email", capacity=3, period_seconds=600)
+RESEND_IP_LIMIT = RateLimit("auth:resend:ip", capacity=5, period_seconds=600)
+RESEND_EMAIL_LIMIT = RateLimit("auth:resend:email", capacity=3, period_seconds=600)
+
 
 @router.post("/registration")
-async def register(data: SUserAuth, background_tasks: BackgroundTasks):
+async def register(data: SUserAuth, request: Request):
+    await enforce_rate_limits(
+        (REGISTRATION_IP_LIMIT, client_ip(request)),
+        (REGISTRATION_EMAIL_LIMIT, data.email.casefold()),
+    )
+
     existing_user = await UserDAO.find_one_or_none(email=data.email)
     if existing_user:
         raise HTTPException(status_code=409, detail="Пользователь с таким email уже зарегистрирован")
@@ -33,15 +48,19 @@ async def register(data: SUserAuth, background_tasks: BackgroundTasks):
     plain_code = generate_code()
     now = datetime.now(timezone.utc)
 
-    await UserDAO.add(
-        email=data.email,
-        hashed_password=hash_password(data.password),
-        verify_code_hash=hash_password(plain_code),
-        verify_code_expires_at=now + timedelta(minutes=10),
-        verify_code_sent_at=now,
-    )
-
-    background_tasks.add_task(send_verify_email, data.email, plain_code)
+    async with new_session() as session:
+        async with session.begin():
+            await UserDAO.add(
+                session=session,
+                email=data.email,
+                hashed_password=hash_password(data.password),
+                verify_code_hash=hash_password(plain_code),
+                verify_code_expires_at=now + timedelta(minutes=10),
+                verify_code_sent_at=now,
+            )
+            await enqueue_verify_email(data.email, plain_code, session=session)
+
+    email_outbox_sender.wake()
     return {
         "message": "Пользователь создан. Код подтверждения отправлен на почту.",
         "email": data.email,
@@ -59,7 +78,7 @@ async def confirm_registration(data: SUserConfirmEmail, response: Response):
         raise HTTPException(status_code=403, detail="Вход запрещен")
 
     if user.is_verified:
-        set_cookies(response, user.id)
+        set_cookies(response, user)
         return user
 
     if not user.verify_code_hash or not user.verify_code_expires_at:
@@ -103,12 +122,17 @@ async def confirm_registration(data: SUserConfirmEmail, response: Response):
         attempts=0,
     )
 
-    set_cookies(response, verified_user.id)
+    set_cookies(response, verified_user)
     return verified_user
 
 
 @router.post("/registration/resend_verify_code")
-async def resend_verify_code(data: SResendVerifyCode, background_tasks: BackgroundTasks):
+async def resend_verify_code(data: SResendVerifyCode, request: Request):
+    await enforce_rate_limits(
+        (RESEND_IP_LIMIT, client_ip(request)),
+        (RESEND_EMAIL_LIMIT, data.email.casefold()),
+    )
+
     user = await UserDAO.find_one_or_none(email=data.email)
 
     if not user:
@@ -125,20 +149,29 @@ async def resend_verify_code(data: SResendVerifyCode, background_tasks: Backgrou
         raise HTTPException(status_code=429, detail="Подождите 3 минуты перед отправкой нового кода.")
 
     plain_code = generate_code()
-    await UserDAO.update(
-        filter_by={"id": user.id},
-        verify_code_hash=hash_password(plain_code),
-        verify_code_expires_at=now + timedelta(minutes=10),
-        verify_code_sent_at=now,
-        attempts=0,
-    )
-
-    background_tasks.add_task(send_verify_email, data.email, plain_code)
+    async with new_session() as session:
+        async with session.begin():
+            await UserDAO.update(
+                filter_by={"id": user.id},
+                session=session,
+                verify_code_hash=hash_password(plain_code),
+                verify_code_expires_at=now + timedelta(minutes=10),
+                verify_code_sent_at=now,
+                attempts=0,
+            )
+            await enqueue_verify_email(data.email, plain_code, session=session)
+
+    email_outbox_sender.wake()
     return {"message": "Код был успешно отправлен на указанный вами email."}
 
 
 @router.post("/login", response_model=SUserRead)
-async def login(response: Response, data: SUserAuth):
+async def login(request: Request, response: Response, data: SUserAuth):
+    await enforce_rate_limits(
+        (LOGIN_IP_LIMIT, client_ip(request)),
+        (LOGIN_EMAIL_LIMIT, data.email.casefold()),
+    )
+
     user = await UserDAO.find_one_or_none(email=data.email)
 
     if not user or not verify_password(data.password, user.hashed_password):
@@ -150,7 +183,7 @@ async def login(response: Response, data: SUserAuth):
     if not user.is_verified:
         raise HTTPException(status_code=403, detail="Email не подтвержден")
 
-    set_cookies(response, user.id)
+    set_cookies(response, user)
     return user
 
 
@@ -205,7 +238,7 @@ async def refresh_access_token(request: Request, response: Response):
         clear_auth_cookies(response)
         raise HTTPException(status_code=403, detail="Доступ запрещен")
 
-    access = create_access_token({"sub": str(user_id)})
+    access = create_access_token(access_token_claims(user))
     response.set_cookie(
         key="access",
         value=access,
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from app.cache import TTLCache
+from app.config import settings
+
+
+@dataclass(frozen=True, slots=True)
+class UserState:
+    """Снимок пользователя, которого достаточно для авторизации запроса."""
+
+    id: int
+    email: str
+    is_admin: bool
+    is_active: bool
+    is_verified: bool
+    token_version: int
+
+
+# Кэш живет в памяти воркера: в других воркерах изменения видны не позже чем через TTL,
+# а смена прав дополнительно отзывает старые access-токены через token_version.
+_USER_STATE_CACHE: TTLCache[int, UserState] = TTLCache(
+    maxsize=settings.AUTH_USER_CACHE_SIZE,
+    ttl=settings.AUTH_USER_CACHE_TTL,
+)
+
+
+def user_state_from_model(user) -> UserState:
+    return UserState(
+        id=user.id,
+        email=user.email,
+        is_admin=user.is_admin,
+        is_active=user.is_active,
+        is_verified=user.is_verified,
+        token_version=user.token_version,
+    )
+
+
+def get_cached_user_state(user_id: int) -> UserState | None:
+    return _USER_STATE_CACHE.get(user_id)
+
+
+def cache_user_state(user) -> UserState:
+    state = user_state_from_model(user)
+    _USER_STATE_CACHE.set(state.id, state)
+    return state
+
+
+def invalidate_user_state(user_id: int) -> None:
+    _USER_STATE_CACHE.pop(user_id)
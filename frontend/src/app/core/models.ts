@@ -119,6 +119,10 @@ export interface DeliveryQuote {
   within_radius: boolean;
   can_order: boolean;
   message: string | null;
+  origin_id: number | null;
+  origin_name: string | null;
+  zone_name: string | null;
+  quote_token: string | null;
 }
 
 export interface DeliverySuggestion {
@@ -127,6 +131,9 @@ export interface DeliverySuggestion {
   full_address: string;
   distance_km: MoneyValue;
   within_radius: boolean;
+  origin_id: number | null;
+  origin_name: string | null;
+  zone_name: string | null;
   lat: number;
   lon: number;
 }
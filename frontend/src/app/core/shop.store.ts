@@ -279,20 +279,16 @@ export class ShopStore {
     this.checkoutError.set('');
 
     try {
-      const selectedSuggestion = this.selectedDeliverySuggestion();
+      const quote = this.deliveryQuote();
       const payload: {
         address: string;
-        normalized_address?: string;
-        lat?: number;
-        lon?: number;
+        quote_token?: string;
       } = {
         address
       };
 
-      if (selectedSuggestion?.full_address === address) {
-        payload.normalized_address = selectedSuggestion.full_address;
-        payload.lat = selectedSuggestion.lat;
-        payload.lon = selectedSuggestion.lon;
+      if (quote?.quote_token && quote.address === address) {
+        payload.quote_token = quote.quote_token;
       }
 
       const paymentOrder = await firstValueFrom(
@@ -508,23 +504,7 @@ export class ShopStore {
     this.deliveryError.set('');
 
     try {
-      const selectedSuggestion = this.selectedDeliverySuggestion();
-      const payload: {
-        address: string;
-        normalized_address?: string;
-        lat?: number;
-        lon?: number;
-      } = {
-        address
-      };
-
-      if (selectedSuggestion?.full_address === address) {
-        payload.normalized_address = selectedSuggestion.full_address;
-        payload.lat = selectedSuggestion.lat;
-        payload.lon = selectedSuggestion.lon;
-      }
-
-      const quote = await firstValueFrom(this.http.post<DeliveryQuote>('/cart/delivery/quote', payload));
+      const quote = await firstValueFrom(this.http.post<DeliveryQuote>('/cart/delivery/quote', { address }));
       this.deliveryQuote.set(quote);
     } catch (error) {
       this.deliveryQuote.set(null);
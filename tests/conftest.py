@@ -0,0 +1,21 @@
+import os
+
+# Settings читаются при импорте app.config, поэтому окружение задается до импорта приложения.
+for name, value in {
+    "DB_HOST": "localhost",
+    "DB_PORT": "5432",
+    "DB_NAME": "glassselling_test",
+    "DB_USER": "test",
+    "DB_PASS": "test",
+    "SECRET_KEY": "test-secret",
+    "ALGORITHM": "HS256",
+    "SMTP_HOST": "localhost",
+    "SMTP_PORT": "2525",
+    "SMTP_USER": "test@example.com",
+    "SMTP_PASSWORD": "test",
+    "SMTP_FROM": "test@example.com",
+    "YOOKASSA_SHOP_ID": "test-shop",
+    "YOOKASSA_SECRET_KEY": "test-secret",
+    "YOOKASSA_RETURN_URL": "https://example.com/orders",
+}.items():
+    os.environ.setdefault(name, value)
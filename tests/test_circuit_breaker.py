@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from app.resilience import CircuitBreaker, CircuitOpenError
+
+
+class UpstreamDown(Exception):
+    pass
+
+
+def _breaker(**overrides):
+    return CircuitBreaker(
+        "tests",
+        failure_exceptions=(UpstreamDown,),
+        **{
+            "window": 4,
+            "min_calls": 2,
+            "failure_rate": 0.5,
+            "slow_call_seconds": 10.0,
+            "open_seconds": 0.0,
+            **overrides,
+        },
+    )
+
+
+async def _fail(breaker):
+    with pytest.raises(UpstreamDown):
+        async with breaker.guard():
+            raise UpstreamDown
+
+
+async def _held_call(breaker, release: asyncio.Event, *, fail: bool = False):
+    async with breaker.guard():
+        await release.wait()
+        if fail:
+            raise UpstreamDown
+
+
+def test_call_admitted_while_closed_does_not_decide_half_open():
+    async def scenario():
+        breaker = _breaker()
+        release_slow, release_probe = asyncio.Event(), asyncio.Event()
+
+        slow = asyncio.create_task(_held_call(breaker, release_slow))
+        await asyncio.sleep(0)
+        await _fail(breaker)
+        await _fail(breaker)
+        assert breaker.state == "half_open"
+
+        probe = asyncio.create_task(_held_call(breaker, release_probe, fail=True))
+        await asyncio.sleep(0)
+        # Пробный вызов занял единственное место: новых вызовов не пускаем.
+        with pytest.raises(CircuitOpenError):
+            async with breaker.guard():
+                pass
+
+        # Запоздавший вызов из закрытого состояния не закрывает предохранитель и не освобождает пробу.
+        release_slow.set()
+        await slow
+        assert breaker.state == "half_open"
+        assert breaker.is_open()
+
+        release_probe.set()
+        with pytest.raises(UpstreamDown):
+            await probe
+        return breaker
+
+    assert asyncio.run(scenario()).times_opened == 2
+
+
+def test_successful_probe_closes_breaker():
+    async def scenario():
+        breaker = _breaker()
+        await _fail(breaker)
+        await _fail(breaker)
+        assert breaker.state == "half_open"
+
+        async with breaker.guard():
+            pass
+        return breaker
+
+    assert asyncio.run(scenario()).state == "closed"
@@ -0,0 +1,67 @@
+import asyncio
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from app.cart import service
+from app.cart.service import DeliveryOriginsDAO, DeliveryZonesDAO, GeocodeCacheDAO
+
+
+@pytest.fixture
+def origins(monkeypatch):
+    """Активные точки отправки в "таблице" и удаления из geocode_cache."""
+    state = SimpleNamespace(rows=[], purged=[])
+
+    async def get_origins(**filter_by):
+        return list(state.rows)
+
+    async def get_zones(**filter_by):
+        return []
+
+    async def delete_by(**filter_by):
+        state.purged.append(filter_by)
+
+    monkeypatch.setattr(DeliveryOriginsDAO, "get_all_by", get_origins)
+    monkeypatch.setattr(DeliveryZonesDAO, "get_all_by", get_zones)
+    monkeypatch.setattr(GeocodeCacheDAO, "delete_by", delete_by)
+    monkeypatch.setattr(service, "_delivery_origins", None)
+    monkeypatch.setattr(service, "_delivery_zones", None)
+    monkeypatch.setattr(service, "_delivery_zones_key", None)
+    monkeypatch.setattr(service, "_delivery_settings_loaded_at", None)
+    return state
+
+
+def _origin(origin_id, lat, lon, radius_km=30.0):
+    return SimpleNamespace(
+        id=origin_id,
+        name=f"Склад {origin_id}",
+        lat=lat,
+        lon=lon,
+        max_radius_km=radius_km,
+        price_per_km=Decimal("40.00"),
+        min_price=Decimal("300.00"),
+    )
+
+
+def test_moving_origins_purges_bounded_geocodes(origins):
+    origins.rows = [_origin(1, 44.6, 40.1)]
+    bounded_key = ("майкоп ленина 1", True)
+
+    async def scenario():
+        await service.refresh_delivery_settings(force=True)
+        assert origins.purged == []
+
+        service._GEOCODER_QUERY_CACHE.set(bounded_key, (1, []))
+        await service.refresh_delivery_settings(force=True)
+        # Точки не менялись - кэш жив.
+        assert origins.purged == []
+        assert service._GEOCODER_QUERY_CACHE.get(bounded_key) is not None
+
+        origins.rows = [_origin(1, 44.6, 40.1), _origin(2, 45.0, 39.0)]
+        await service.refresh_delivery_settings(force=True)
+
+    asyncio.run(scenario())
+
+    assert origins.purged == [{"bounded": True}]
+    assert service._GEOCODER_QUERY_CACHE.get(bounded_key) is None
@@ -0,0 +1,163 @@
+import asyncio
+from email import message_from_bytes, policy
+from types import SimpleNamespace
+
+import pytest
+
+from app.config import settings
+from app.mail import service
+from app.mail.service import EmailOutboxDAO, EmailOutboxSender, SMTPConnectionPool
+
+
+class FakeSMTPServer:
+    """Минимальный SMTP-сервер в том же процессе: принимает письма и умеет отвечать отказами.
+
+    `data_failures` - сколько раз подряд ответить 451 на DATA (временная ошибка),
+    `refused` - получатели, которых сервер отклоняет навсегда (550 на RCPT).
+    """
+
+    def __init__(self, *, data_failures: int = 0, refused: frozenset[str] = frozenset()) -> None:
+        self.data_failures = data_failures
+        self.refused = refused
+        self.delivered = []
+        self.connections = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        writer.write(b"220 fake ESMTP\r\n")
+        while line := await reader.readline():
+            command = line.decode().strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                writer.write(b"250-fake\r\n250-8BITMIME\r\n250 SMTPUTF8\r\n")
+            elif verb == "RCPT" and any(recipient in command for recipient in self.refused):
+                writer.write(b"550 No such user\r\n")
+            elif verb == "DATA":
+                writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                await writer.drain()
+                data = b""
+                while (chunk := await reader.readline()) != b".\r\n":
+                    data += chunk
+                if self.data_failures:
+                    self.data_failures -= 1
+                    writer.write(b"451 Temporary local problem\r\n")
+                else:
+                    self.delivered.append(message_from_bytes(data, policy=policy.default))
+                    writer.write(b"250 Queued\r\n")
+            elif verb == "QUIT":
+                writer.write(b"221 Bye\r\n")
+                await writer.drain()
+                break
+            else:
+                writer.write(b"250 OK\r\n")
+            await writer.drain()
+
+        writer.close()
+
+
+@pytest.fixture
+def outbox(monkeypatch):
+    """Письма в outbox и журнал вызовов EmailOutboxDAO вместо таблицы."""
+    state = SimpleNamespace(messages=[], claimed_limits=[], sent=[], failed=[])
+
+    async def claim_batch(*, limit, lease):
+        state.claimed_limits.append(limit)
+        batch, state.messages = state.messages[:limit], state.messages[limit:]
+        return batch
+
+    async def mark_sent(ids):
+        state.sent.extend(ids)
+
+    async def mark_failed(message_id, *, error, retry_at):
+        state.failed.append((message_id, retry_at))
+
+    monkeypatch.setattr(EmailOutboxDAO, "claim_batch", claim_batch)
+    monkeypatch.setattr(EmailOutboxDAO, "mark_sent", mark_sent)
+    monkeypatch.setattr(EmailOutboxDAO, "mark_failed", mark_failed)
+    return state
+
+
+def _message(message_id, recipient, *, attempts=1):
+    return SimpleNamespace(
+        id=message_id,
+        recipient=recipient,
+        subject="Подтверждение регистрации Glass Shop",
+        html_body=f"<p>Код: {message_id}</p>",
+        attempts=attempts,
+    )
+
+
+def _send_pending(server: FakeSMTPServer, monkeypatch, *, rounds: int = 1) -> list[int]:
+    async def scenario():
+        smtp = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+        monkeypatch.setattr(settings, "SMTP_HOST", "127.0.0.1")
+        monkeypatch.setattr(settings, "SMTP_PORT", smtp.sockets[0].getsockname()[1])
+        monkeypatch.setattr(settings, "SMTP_STARTTLS", False)
+        monkeypatch.setattr(settings, "SMTP_SSL_TLS", False)
+        monkeypatch.setattr(settings, "USE_CREDENTIALS", False)
+
+        sender = EmailOutboxSender()
+        sender._pool = SMTPConnectionPool(size=2)
+        try:
+            return [await sender.send_pending() for _ in range(rounds)]
+        finally:
+            await sender._pool.close()
+            smtp.close()
+            await smtp.wait_closed()
+
+    return asyncio.run(scenario())
+
+
+def test_batch_is_sent_over_pooled_connections(outbox, monkeypatch):
+    monkeypatch.setattr(settings, "EMAIL_OUTBOX_BATCH_SIZE", 3)
+    outbox.messages = [_message(message_id, f"user{message_id}@example.com") for message_id in range(1, 6)]
+    server = FakeSMTPServer()
+
+    assert _send_pending(server, monkeypatch, rounds=3) == [3, 2, 0]
+
+    assert outbox.claimed_limits == [3, 3, 3]
+    assert outbox.sent == [1, 2, 3, 4, 5]
+    assert outbox.failed == []
+    assert sorted(message["To"] for message in server.delivered) == [
+        f"user{message_id}@example.com" for message_id in range(1, 6)
+    ]
+    assert server.delivered[0]["Subject"] == "Подтверждение регистрации Glass Shop"
+    # Соединения пула переиспользуются между письмами и пачками.
+    assert server.connections <= 2
+
+
+def test_transient_smtp_error_is_retried_later(outbox, monkeypatch):
+    outbox.messages = [_message(1, "user1@example.com", attempts=2)]
+    server = FakeSMTPServer(data_failures=1)
+
+    before = service.utc_now()
+    _send_pending(server, monkeypatch)
+
+    assert outbox.sent == []
+    [(message_id, retry_at)] = outbox.failed
+    assert message_id == 1
+    assert retry_at > before
+
+    outbox.messages = [_message(1, "user1@example.com", attempts=3)]
+    _send_pending(server, monkeypatch)
+    assert outbox.sent == [1]
+    assert [message["To"] for message in server.delivered] == ["user1@example.com"]
+
+
+def test_refused_recipient_fails_permanently(outbox, monkeypatch):
+    outbox.messages = [_message(1, "ghost@example.com"), _message(2, "user2@example.com")]
+    server = FakeSMTPServer(refused=frozenset({"ghost@example.com"}))
+
+    _send_pending(server, monkeypatch)
+
+    assert outbox.failed == [(1, None)]
+    assert outbox.sent == [2]
+
+
+def test_last_attempt_is_not_retried(outbox, monkeypatch):
+    outbox.messages = [_message(1, "user1@example.com", attempts=settings.EMAIL_OUTBOX_MAX_ATTEMPTS)]
+
+    _send_pending(FakeSMTPServer(data_failures=1), monkeypatch)
+
+    assert outbox.failed == [(1, None)]
+    assert outbox.sent == []
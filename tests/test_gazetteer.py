@@ -0,0 +1,44 @@
+import pytest
+
+from app.cart import service
+from app.cart.gazetteer import SAMPLE_EXTRACT_PATH, Gazetteer, parse_osm_extract
+
+
+@pytest.fixture(scope="module")
+def gazetteer():
+    return Gazetteer(parse_osm_extract(SAMPLE_EXTRACT_PATH), normalize=service._normalize_geocoder_text)
+
+
+def _names(entries):
+    return [entry.display_name for entry in entries]
+
+
+@pytest.mark.parametrize(
+    "query",
+    ["Пушкина", "ул. Пушк", "ул Пушк", "Майкоп, ул. Пуш", "улица Пушкина, Майкоп"],
+)
+def test_street_queries_find_the_street(gazetteer, query):
+    assert _names(gazetteer.search(query, limit=10)) == ["улица Пушкина, Майкоп"]
+
+
+def test_street_type_after_the_name_matches_abbreviation(gazetteer):
+    assert "Красная улица, Краснодар" in _names(gazetteer.search("ул. Красн", limit=10))
+
+
+def test_city_and_street_are_filtered_by_settlement(gazetteer):
+    assert _names(gazetteer.search("Майкоп, ул. Лен", limit=10)) == ["улица Ленина, Майкоп"]
+    assert gazetteer.search("Краснодар, ул. Пуш", limit=10) == []
+
+
+def test_settlement_prefix(gazetteer):
+    assert _names(gazetteer.search("Майк", limit=10)) == ["Майкоп"]
+
+
+def test_malformed_extract_does_not_break_loading(monkeypatch, tmp_path):
+    extract = tmp_path / "broken.osm"
+    extract.write_text(SAMPLE_EXTRACT_PATH.read_text(encoding="utf-8")[:200], encoding="utf-8")
+    monkeypatch.setattr(service.settings, "GEOCODER_GAZETTEER_PATH", str(extract))
+    monkeypatch.setattr(service, "_GAZETTEER", None)
+    monkeypatch.setattr(service, "_GAZETTEER_LOADED", False)
+
+    assert service.load_gazetteer() is None
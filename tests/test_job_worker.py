@@ -0,0 +1,77 @@
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.config import settings
+from app.jobs import service
+from app.jobs.service import JobsDAO, JobWorker
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    """Одна задача в очереди и журнал вызовов JobsDAO; `lease_held` решает, удается ли продлить аренду."""
+    state = SimpleNamespace(calls=[], lease_held=True)
+    job = SimpleNamespace(
+        id=1,
+        kind="tests.slow",
+        payload={},
+        attempts=1,
+        max_attempts=3,
+        started_at=datetime(2026, 10, 19, tzinfo=timezone.utc),
+    )
+
+    async def claim(*, lease):
+        return job
+
+    async def extend_lease(job_id, *, started_at, lease):
+        state.calls.append("extend_lease")
+        return state.lease_held
+
+    async def mark_done(job_id, *, started_at):
+        state.calls.append("mark_done")
+        return True
+
+    async def mark_failed(job_id, *, started_at, error, retry_at):
+        state.calls.append("mark_failed")
+        return True
+
+    for name, fake in {
+        "claim": claim,
+        "extend_lease": extend_lease,
+        "mark_done": mark_done,
+        "mark_failed": mark_failed,
+    }.items():
+        monkeypatch.setattr(JobsDAO, name, fake)
+    monkeypatch.setattr(settings, "JOBS_LEASE_SECONDS", 0.03)
+    return state
+
+
+@pytest.fixture
+def slow_handler(monkeypatch):
+    finished = []
+
+    async def handler(payload):
+        await asyncio.sleep(0.1)
+        finished.append(True)
+
+    monkeypatch.setitem(service._HANDLERS, "tests.slow", handler)
+    return finished
+
+
+def test_heartbeat_keeps_lease_until_done(jobs, slow_handler):
+    assert asyncio.run(JobWorker().run_once()) is True
+
+    assert slow_handler == [True]
+    assert "extend_lease" in jobs.calls
+    assert jobs.calls[-1] == "mark_done"
+
+
+def test_lost_lease_cancels_handler_and_skips_mark_done(jobs, slow_handler):
+    jobs.lease_held = False
+
+    assert asyncio.run(JobWorker().run_once()) is True
+
+    assert slow_handler == []
+    assert jobs.calls == ["extend_lease"]
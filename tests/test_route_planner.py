@@ -0,0 +1,30 @@
+from app.payments.route_planner import Stop, plan_routes, share_fleet
+
+
+def _plan(depot, count):
+    stops = [
+        Stop(order_id, f"Адрес {order_id}", depot[0] + order_id * 0.01, depot[1], area_m2=5.0, weight_kg=100.0)
+        for order_id in range(count)
+    ]
+    return plan_routes(depot, stops, vehicles=count, capacity_area_m2=30.0, capacity_weight_kg=1500.0)
+
+
+def test_fleet_is_shared_between_origins():
+    maikop = _plan((44.6, 40.1), 20)
+    krasnodar = _plan((45.0, 39.0), 7)
+
+    kept = share_fleet([maikop, krasnodar], vehicles=4)
+
+    routes = [route for origin_routes in kept for route in origin_routes]
+    assert len(routes) == 4
+    assert sorted(route.vehicle for route in routes) == [1, 2, 3, 4]
+    assert [len(route.stops) for route in kept[0]] == [6, 6, 6]
+    assert [len(route.stops) for route in kept[1]] == [6]
+
+
+def test_fleet_larger_than_needed_keeps_every_route():
+    plans = [_plan((44.6, 40.1), 3), _plan((45.0, 39.0), 2)]
+
+    kept = share_fleet(plans, vehicles=10)
+
+    assert [len(routes) for routes in kept] == [1, 1]
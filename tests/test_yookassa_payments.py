@@ -0,0 +1,153 @@
+import asyncio
+from datetime import timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.payments import router, service
+from app.payments.service import YooKassaPaymentRejected
+from app.resilience import CircuitBreaker
+
+PAYMENT = {
+    "id": "2d5e0a55-000f-5000-8000-1b3c1f8a4c61",
+    "status": "pending",
+    "confirmation": {"type": "redirect", "confirmation_url": "https://yoomoney.ru/checkout/payments/v2/contract"},
+}
+
+
+@pytest.fixture
+def yookassa(monkeypatch):
+    """Подменяет транспорт ЮKassa: ответы берутся из `responses` по очереди, запросы копятся в `requests`."""
+    stand_in = SimpleNamespace(requests=[], responses=[])
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        stand_in.requests.append(request)
+        response = stand_in.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(
+        service.yookassa_http_client,
+        "_client",
+        httpx.AsyncClient(base_url=settings.YOOKASSA_API_BASE_URL, transport=httpx.MockTransport(handle)),
+    )
+    monkeypatch.setattr(
+        service,
+        "_YOOKASSA_BREAKER",
+        CircuitBreaker(
+            "yookassa-test",
+            failure_exceptions=(httpx.TransportError, service.YooKassaServerError),
+            window=settings.CIRCUIT_BREAKER_WINDOW,
+            min_calls=settings.CIRCUIT_BREAKER_MIN_CALLS,
+            failure_rate=settings.CIRCUIT_BREAKER_FAILURE_RATE,
+            slow_call_seconds=settings.YOOKASSA_SLOW_CALL_SECONDS,
+            open_seconds=settings.CIRCUIT_BREAKER_OPEN_SECONDS,
+        ),
+    )
+    monkeypatch.setattr(settings, "YOOKASSA_RETRY_BACKOFF_SECONDS", 0)
+    return stand_in
+
+
+@pytest.fixture
+def order_updates(monkeypatch):
+    updates = []
+
+    async def update(filter_by, **values):
+        updates.append((filter_by, values))
+
+    monkeypatch.setattr(router.OrdersDAO, "update", update)
+    return updates
+
+
+def _order(**values):
+    return SimpleNamespace(
+        **{
+            "id": 42,
+            "total_price": Decimal("1500.00"),
+            "delivery_price": Decimal("300.00"),
+            "delivery_address": "Москва, Тверская 1",
+            "delivery_normalized_address": "Россия, Москва, Тверская улица, 1",
+            "items_payload": [{"product_id": 1, "quantity": 2}],
+            "yookassa_idempotence_key": "c1a7d5c2-5d3e-4b8f-9d3a-0e6f7b1c2a90",
+            **values,
+        }
+    )
+
+
+def test_timeout_then_success_reuses_idempotence_key(yookassa, order_updates):
+    order = _order()
+    yookassa.responses = [httpx.ReadTimeout("timed out"), httpx.Response(200, json=PAYMENT)]
+
+    payment = asyncio.run(router._start_yookassa_payment(order, user_id=7))
+
+    assert payment == PAYMENT
+    assert [request.headers["Idempotence-Key"] for request in yookassa.requests] == [
+        order.yookassa_idempotence_key,
+        order.yookassa_idempotence_key,
+    ]
+    assert order_updates == []
+
+
+def test_rejection_clears_idempotence_key(yookassa, order_updates):
+    yookassa.responses = [httpx.Response(400, json={"type": "error", "description": "Invalid amount"})]
+
+    with pytest.raises(YooKassaPaymentRejected):
+        asyncio.run(router._start_yookassa_payment(_order(), user_id=7))
+
+    assert len(yookassa.requests) == 1
+    [(filter_by, values)] = order_updates
+    assert filter_by == {"id": 42}
+    assert values["status"] == "failed"
+    assert values["yookassa_idempotence_key"] is None
+
+
+def test_network_failure_keeps_idempotence_key(yookassa, order_updates):
+    # Платеж мог создаться и после таймаута, поэтому ключ остается для повтора.
+    yookassa.responses = [httpx.ReadTimeout("timed out")] * settings.YOOKASSA_RETRY_ATTEMPTS
+
+    with pytest.raises(service.HTTPException) as raised:
+        asyncio.run(router._start_yookassa_payment(_order(), user_id=7))
+
+    assert not isinstance(raised.value, YooKassaPaymentRejected)
+    [(_, values)] = order_updates
+    assert values["status"] == "failed"
+    assert "yookassa_idempotence_key" not in values
+
+
+def test_identical_cart_within_key_ttl_reuses_order(monkeypatch):
+    existing = _order()
+    calls = []
+
+    async def unconfirmed_yookassa_orders(*, user_id, since, limit=5):
+        calls.append((user_id, since))
+        return [_order(id=41, items_payload=[{"product_id": 3, "quantity": 1}]), existing]
+
+    monkeypatch.setattr(router.OrdersDAO, "unconfirmed_yookassa_orders", unconfirmed_yookassa_orders)
+    quote = {
+        "total_price": existing.total_price,
+        "delivery_price": existing.delivery_price,
+        "address": existing.delivery_address,
+        "normalized_address": existing.delivery_normalized_address,
+    }
+
+    found = asyncio.run(
+        router._find_retried_order(user_id=7, delivery_quote=quote, items_payload=existing.items_payload)
+    )
+    changed = asyncio.run(
+        router._find_retried_order(
+            user_id=7,
+            delivery_quote={**quote, "total_price": Decimal("1800.00")},
+            items_payload=existing.items_payload,
+        )
+    )
+
+    assert found is existing
+    assert changed is None
+    user_id, since = calls[0]
+    assert user_id == 7
+    expected_since = service.utc_now() - timedelta(hours=settings.YOOKASSA_IDEMPOTENCE_KEY_TTL_HOURS)
+    assert abs(since - expected_since) < timedelta(minutes=1)